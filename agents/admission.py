@@ -0,0 +1,431 @@
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+from .feedback_summarizer import estimate_tokens
+from .telemetry import set_attributes
+
+# Provider errors that mean "slow down" rather than "this request is bad".
+RATE_LIMIT_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+# Output tokens reserved per call before the real usage is known.
+EXPECTED_OUTPUT_TOKENS = 1024
+
+# How long a caller waits for admission before giving up.
+ADMISSION_MAX_WAIT = 120
+
+# A waiter that stops polling for this long loses its place in the queue.
+WAITER_STALE_SECONDS = 5
+FAIRNESS_POLL_SECONDS = 0.1
+
+# After a rate limit error the allowed rate is halved (never below MIN_SCALE)
+# and grows back to the full rate over SCALE_RECOVERY_SECONDS.
+MIN_SCALE = 0.1
+SCALE_RECOVERY_SECONDS = 300
+DEFAULT_THROTTLE_PAUSE = 10
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    """
+    Provider quota for one model, shared by every worker.
+    """
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+MODEL_LIMITS = {
+    'gemini-1.5-pro': ModelLimits(requests_per_minute=1000, tokens_per_minute=4_000_000),
+    'gemini-1.5-flash': ModelLimits(requests_per_minute=2000, tokens_per_minute=4_000_000),
+}
+DEFAULT_MODEL_LIMITS = ModelLimits(requests_per_minute=360, tokens_per_minute=1_000_000)
+
+
+class AdmissionTimeout(TimeoutError):
+    pass
+
+
+class AdmissionCancelled(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class AdmissionDecision:
+    allowed: bool
+    retry_after: float
+    requests_available: int
+    tokens_available: int
+
+
+def model_key(model_name):
+    return model_name.split('/')[-1]
+
+
+def limits_for(model_name):
+    return MODEL_LIMITS.get(model_key(model_name), DEFAULT_MODEL_LIMITS)
+
+
+# KEYS: bucket hash, waiting zset (score: member's last grant), heartbeat zset, last grant hash
+# ARGV: now_ms, requests_per_minute, tokens_per_minute, cost, member, stale_ms, recover_per_ms, poll_ms
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local member = ARGV[5]
+local stale = tonumber(ARGV[6])
+local recover = tonumber(ARGV[7])
+local poll = tonumber(ARGV[8])
+
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts', 'scale', 'scale_ts', 'paused_until')
+local scale = tonumber(state[4]) or 1
+scale = math.min(1, scale + math.max(0, now - (tonumber(state[5]) or now)) * recover)
+local request_capacity = math.max(1, rpm * scale)
+local token_capacity = math.max(1, tpm * scale)
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local requests = math.min(request_capacity, (tonumber(state[1]) or request_capacity) + elapsed * request_capacity / 60000)
+local tokens = math.min(token_capacity, (tonumber(state[2]) or token_capacity) + elapsed * token_capacity / 60000)
+local paused_until = tonumber(state[6]) or 0
+cost = math.min(cost, token_capacity)
+
+local gone = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - stale)
+for _, name in ipairs(gone) do
+    redis.call('ZREM', KEYS[2], name)
+    redis.call('ZREM', KEYS[3], name)
+end
+
+local served = tonumber(redis.call('HGET', KEYS[4], member)) or 0
+local head = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+local behind = head[1] ~= nil and head[1] ~= member and tonumber(head[2]) < served
+
+local allowed = 0
+local retry = 0
+if now < paused_until then
+    retry = paused_until - now
+elseif requests >= 1 and tokens >= cost and not behind then
+    allowed = 1
+    requests = requests - 1
+    tokens = tokens - cost
+else
+    retry = math.max((1 - requests) * 60000 / request_capacity, (cost - tokens) * 60000 / token_capacity, 0)
+    if behind then
+        retry = math.max(retry, poll)
+    end
+end
+
+if allowed == 1 then
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('ZREM', KEYS[3], member)
+    redis.call('HSET', KEYS[4], member, now)
+    redis.call('PEXPIRE', KEYS[4], 600000)
+else
+    redis.call('ZADD', KEYS[2], served, member)
+    redis.call('ZADD', KEYS[3], now, member)
+    redis.call('PEXPIRE', KEYS[2], stale * 4)
+    redis.call('PEXPIRE', KEYS[3], stale * 4)
+end
+
+redis.call('HSET', KEYS[1], 'requests', tostring(requests), 'tokens', tostring(tokens), 'ts', now,
+    'scale', tostring(scale), 'scale_ts', now)
+redis.call('PEXPIRE', KEYS[1], 600000)
+return {allowed, math.ceil(retry), math.floor(requests), math.floor(tokens)}
+"""
+
+# KEYS: bucket hash
+# ARGV: now_ms, pause_ms, recover_per_ms, min_scale
+THROTTLED_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'scale', 'scale_ts', 'paused_until')
+local scale = tonumber(state[1]) or 1
+scale = math.min(1, scale + math.max(0, now - (tonumber(state[2]) or now)) * tonumber(ARGV[3]))
+scale = math.max(tonumber(ARGV[4]), scale / 2)
+local paused_until = math.max(tonumber(state[3]) or 0, now + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'scale', tostring(scale), 'scale_ts', now, 'paused_until', paused_until)
+redis.call('PEXPIRE', KEYS[1], 600000)
+return tostring(scale)
+"""
+
+
+def _keys(model_name):
+    prefix = f"llm-admission:{model_key(model_name)}"
+    return [f"{prefix}:bucket", f"{prefix}:waiting", f"{prefix}:heartbeat", f"{prefix}:served"]
+
+
+def _recover_per_ms():
+    return 1 / (SCALE_RECOVERY_SECONDS * 1000)
+
+
+def _utilization(limits, scale, requests, tokens, waiting):
+    request_capacity = max(1, limits.requests_per_minute * scale)
+    token_capacity = max(1, limits.tokens_per_minute * scale)
+    return {
+        'requests_per_minute': limits.requests_per_minute,
+        'tokens_per_minute': limits.tokens_per_minute,
+        'scale': round(scale, 3),
+        'requests_available': math.floor(requests),
+        'tokens_available': math.floor(tokens),
+        'waiting': waiting,
+        'utilization': round(max(1 - requests / request_capacity, 1 - tokens / token_capacity, 0), 3),
+    }
+
+
+class RedisAdmissionBackend:
+    """
+    Keeps one token bucket per model in Redis; the Lua scripts make every
+    check and update atomic across all workers.
+    """
+    def __init__(self, client=None):
+        if client is None:
+            from django_redis import get_redis_connection
+            client = get_redis_connection('default')
+        self.client = client
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._throttled = client.register_script(THROTTLED_SCRIPT)
+
+    def acquire(self, model_name, cost, member, now=None):
+        now_ms = int((time.time() if now is None else now) * 1000)
+        limits = limits_for(model_name)
+        allowed, retry, requests, tokens = self._acquire(
+            keys=_keys(model_name),
+            args=[
+                now_ms, limits.requests_per_minute, limits.tokens_per_minute, cost, member,
+                WAITER_STALE_SECONDS * 1000, _recover_per_ms(), int(FAIRNESS_POLL_SECONDS * 1000),
+            ],
+        )
+        return AdmissionDecision(bool(allowed), retry / 1000, requests, tokens)
+
+    def throttled(self, model_name, pause, now=None):
+        now_ms = int((time.time() if now is None else now) * 1000)
+        return float(self._throttled(
+            keys=_keys(model_name)[:1], args=[now_ms, int(pause * 1000), _recover_per_ms(), MIN_SCALE],
+        ))
+
+    def settle(self, model_name, difference):
+        bucket = _keys(model_name)[0]
+        if self.client.exists(bucket):
+            self.client.hincrbyfloat(bucket, 'tokens', difference)
+
+    def utilization(self, model_name, now=None):
+        now_ms = int((time.time() if now is None else now) * 1000)
+        limits = limits_for(model_name)
+        bucket, waiting = _keys(model_name)[:2]
+        state = [float(value) if value is not None else None for value in self.client.hmget(
+            bucket, 'requests', 'tokens', 'ts', 'scale', 'scale_ts',
+        )]
+        requests, tokens, updated, scale, scale_updated = state
+        scale = min(1, (1 if scale is None else scale) + max(0, now_ms - (scale_updated or now_ms)) * _recover_per_ms())
+        elapsed = max(0, now_ms - (updated or now_ms))
+        request_capacity = max(1, limits.requests_per_minute * scale)
+        token_capacity = max(1, limits.tokens_per_minute * scale)
+        requests = min(request_capacity, (request_capacity if requests is None else requests) + elapsed * request_capacity / 60000)
+        tokens = min(token_capacity, (token_capacity if tokens is None else tokens) + elapsed * token_capacity / 60000)
+        return _utilization(limits, scale, requests, tokens, self.client.zcard(waiting))
+
+
+class LocalAdmissionBackend:
+    """
+    Same algorithm in process memory, for local runs without Redis.
+    Limits are only enforced per process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._waiting = {}
+        self._served = {}
+
+    def _state(self, model_name, now):
+        limits = limits_for(model_name)
+        requests, tokens, updated, scale, scale_updated, paused_until = self._buckets.get(
+            model_key(model_name), (None, None, now, 1, now, 0),
+        )
+        scale = min(1, scale + max(0, now - scale_updated) / SCALE_RECOVERY_SECONDS)
+        request_capacity = max(1, limits.requests_per_minute * scale)
+        token_capacity = max(1, limits.tokens_per_minute * scale)
+        elapsed = max(0, now - updated)
+        requests = min(request_capacity, (request_capacity if requests is None else requests) + elapsed * request_capacity / 60)
+        tokens = min(token_capacity, (token_capacity if tokens is None else tokens) + elapsed * token_capacity / 60)
+        return limits, requests, tokens, scale, paused_until, request_capacity, token_capacity
+
+    def acquire(self, model_name, cost, member, now=None):
+        now = time.time() if now is None else now
+        key = model_key(model_name)
+        with self._lock:
+            limits, requests, tokens, scale, paused_until, request_capacity, token_capacity = self._state(model_name, now)
+            cost = min(cost, token_capacity)
+            waiting = self._waiting.setdefault(key, {})
+            for name, seen in list(waiting.items()):
+                if seen[1] <= now - WAITER_STALE_SECONDS:
+                    del waiting[name]
+            served = self._served.get((key, member), 0)
+            behind = any(name != member and last < served for name, (last, seen) in waiting.items())
+
+            allowed, retry = False, 0
+            if now < paused_until:
+                retry = paused_until - now
+            elif requests >= 1 and tokens >= cost and not behind:
+                allowed = True
+                requests -= 1
+                tokens -= cost
+            else:
+                retry = max((1 - requests) * 60 / request_capacity, (cost - tokens) * 60 / token_capacity, 0)
+                if behind:
+                    retry = max(retry, FAIRNESS_POLL_SECONDS)
+
+            if allowed:
+                waiting.pop(member, None)
+                self._served[(key, member)] = now
+            else:
+                waiting[member] = (served, now)
+            self._buckets[key] = (requests, tokens, now, scale, now, paused_until)
+        return AdmissionDecision(allowed, retry, math.floor(requests), math.floor(tokens))
+
+    def throttled(self, model_name, pause, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            limits, requests, tokens, scale, paused_until, *_ = self._state(model_name, now)
+            scale = max(MIN_SCALE, scale / 2)
+            self._buckets[model_key(model_name)] = (requests, tokens, now, scale, now, max(paused_until, now + pause))
+        return scale
+
+    def settle(self, model_name, difference):
+        key = model_key(model_name)
+        with self._lock:
+            if key in self._buckets:
+                requests, tokens, *rest = self._buckets[key]
+                self._buckets[key] = (requests, tokens + difference, *rest)
+
+    def utilization(self, model_name, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            limits, requests, tokens, scale, *_ = self._state(model_name, now)
+            waiting = len(self._waiting.get(model_key(model_name), {}))
+        return _utilization(limits, scale, requests, tokens, waiting)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_admission_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+                _backend = RedisAdmissionBackend()
+            else:
+                _backend = LocalAdmissionBackend()
+        return _backend
+
+
+def acquire(model_name, tokens, project_id=None, max_wait=ADMISSION_MAX_WAIT, cancelled=None):
+    """
+    Blocks until the model's shared budget admits a call of `tokens`
+    tokens. While several projects are waiting, the one served least
+    recently goes first, so one large build cannot starve the others.
+    With `max_wait=0` the call is only admitted if there is capacity now.
+
+    Raises:
+        AdmissionTimeout: If the call was not admitted within `max_wait` seconds.
+        AdmissionCancelled: If the `cancelled` event was set while waiting.
+    """
+    backend = get_admission_backend()
+    member = str(project_id) if project_id else 'shared'
+    deadline = time.monotonic() + max_wait
+    while True:
+        if cancelled is not None and cancelled.is_set():
+            raise AdmissionCancelled(f"Gave up waiting for {model_key(model_name)}.")
+        decision = backend.acquire(model_name, tokens, member)
+        if decision.allowed:
+            return decision
+        if time.monotonic() + decision.retry_after > deadline:
+            raise AdmissionTimeout(f"No capacity for {model_key(model_name)} within {max_wait}s.")
+        # Jitter keeps waiting workers from polling in lockstep.
+        delay = decision.retry_after * random.uniform(1, 1.2)
+        if cancelled is not None:
+            cancelled.wait(delay)
+        else:
+            time.sleep(delay)
+
+
+def retry_after_from(error):
+    """
+    Reads the provider's suggested delay from a rate limit error, if any.
+    """
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None and getattr(delay, 'seconds', None):
+            return float(delay.seconds)
+    return DEFAULT_THROTTLE_PAUSE
+
+
+def report_throttled(model_name, pause=DEFAULT_THROTTLE_PAUSE):
+    """
+    Halves the model's admitted rate and pauses admissions for every worker.
+    """
+    scale = get_admission_backend().throttled(model_name, pause)
+    print(f"Rate limited by {model_key(model_name)}: pausing {pause:.0f}s, admitting {scale:.0%} of the quota.")
+
+
+def response_tokens(response):
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', None) or None
+
+
+def generate_with_admission(
+    model, contents, project_id=None, estimated_tokens=None, max_wait=ADMISSION_MAX_WAIT,
+    cancelled=None, on_admitted=None, deadline=None, **kwargs,
+):
+    """
+    Calls `model.generate_content` once it is admitted, then corrects the
+    token budget with the real usage. Rate limit errors are reported to the
+    controller and re-raised.
+
+    Args:
+        max_wait: Seconds to wait for admission; see acquire().
+        cancelled (threading.Event): Once set, a call that has not reached
+            the model yet is dropped and its tokens returned.
+        on_admitted (callable): Called just before the request is sent.
+        deadline (float): time.monotonic() by which the call must be done.
+            Admission waits no longer than that, and the request is sent
+            with the time left as its timeout.
+    """
+    model_name = model.model_name
+    if estimated_tokens is None:
+        estimated_tokens = estimate_tokens(contents if isinstance(contents, str) else str(contents)) + EXPECTED_OUTPUT_TOKENS
+    waiting_since = time.monotonic()
+    if deadline is not None:
+        max_wait = max(0, min(max_wait, deadline - waiting_since))
+    acquire(model_name, estimated_tokens, project_id=project_id, max_wait=max_wait, cancelled=cancelled)
+    set_attributes(admission_wait_ms=round((time.monotonic() - waiting_since) * 1000, 1))
+    if cancelled is not None and cancelled.is_set():
+        get_admission_backend().settle(model_name, estimated_tokens)
+        raise AdmissionCancelled(f"Dropped a {model_key(model_name)} call that is no longer needed.")
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            get_admission_backend().settle(model_name, estimated_tokens)
+            raise AdmissionTimeout(f"No time left for {model_key(model_name)} after admission.")
+        kwargs['request_options'] = {**(kwargs.get('request_options') or {}), 'timeout': remaining}
+    if on_admitted is not None:
+        on_admitted()
+    try:
+        response = model.generate_content(contents, **kwargs)
+    except RATE_LIMIT_ERRORS as e:
+        set_attributes(throttled=True)
+        report_throttled(model_name, retry_after_from(e))
+        raise
+    used = response_tokens(response)
+    if used is not None:
+        get_admission_backend().settle(model_name, estimated_tokens - used)
+    return response
+
+
+def utilization(model_names=None):
+    """
+    Returns the current state of each model's bucket, keyed by model.
+    """
+    backend = get_admission_backend()
+    return {model_key(name): backend.utilization(name) for name in (model_names or MODEL_LIMITS)}
@@ -0,0 +1,36 @@
+package com.applaude.app.data.model
+
+data class User(
+    val id: String,
+    val displayName: String? = null,
+)
+
+data class SurveyQuestion(
+    val id: String,
+    val question: String,
+    val type: String, // "text", "radio", "scale" or "nps"
+    val options: List<String> = emptyList(),
+    val min: Int? = null,
+    val max: Int? = null,
+    val labels: List<String> = emptyList(),
+)
+
+data class SurveyResponse(
+    val project: String,
+    val user_identifier: String,
+    val survey_type: String, // "UX" or "PMF"
+    val responses: Map<String, Any>,
+)
+
+data class AppRating(
+    val project: String,
+    val user_identifier: String,
+    val rating: Int, // 1-5
+    val comment: String? = null,
+)
+
+data class UserFeedback(
+    val project: String,
+    val user_identifier: String,
+    val feedback_text: String,
+)
@@ -0,0 +1,25 @@
+package com.applaude.app.data.repository
+
+import com.applaude.app.data.model.AppRating
+import com.applaude.app.data.model.SurveyResponse
+import com.applaude.app.data.model.UserFeedback
+import com.applaude.app.network.AppApiService
+
+class AppRepository(
+    private val api: AppApiService = AppApiService.create(),
+) {
+    suspend fun submitSurvey(userId: String, surveyType: String, responses: Map<String, Any>): Boolean =
+        runCatching {
+            api.submitSurveyResponse(SurveyResponse(AppApiService.PROJECT_ID, userId, surveyType, responses)).isSuccessful
+        }.getOrDefault(false)
+
+    suspend fun submitRating(userId: String, rating: Int, comment: String? = null): Boolean =
+        runCatching {
+            api.submitAppRating(AppRating(AppApiService.PROJECT_ID, userId, rating, comment)).isSuccessful
+        }.getOrDefault(false)
+
+    suspend fun submitFeedback(userId: String, text: String): Boolean =
+        runCatching {
+            api.submitUserFeedback(UserFeedback(AppApiService.PROJECT_ID, userId, text)).isSuccessful
+        }.getOrDefault(false)
+}
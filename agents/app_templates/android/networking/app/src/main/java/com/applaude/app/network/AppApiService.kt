@@ -0,0 +1,32 @@
+package com.applaude.app.network
+
+import com.applaude.app.data.model.AppRating
+import com.applaude.app.data.model.SurveyResponse
+import com.applaude.app.data.model.UserFeedback
+import retrofit2.Response
+import retrofit2.Retrofit
+import retrofit2.converter.gson.GsonConverterFactory
+import retrofit2.http.Body
+import retrofit2.http.POST
+
+interface AppApiService {
+    @POST("api/surveys/submit/survey/")
+    suspend fun submitSurveyResponse(@Body response: SurveyResponse): Response<Unit>
+
+    @POST("api/surveys/submit/rating/")
+    suspend fun submitAppRating(@Body rating: AppRating): Response<Unit>
+
+    @POST("api/surveys/submit/feedback/")
+    suspend fun submitUserFeedback(@Body feedback: UserFeedback): Response<Unit>
+
+    companion object {
+        const val BASE_URL = "{{ api_base_url }}"
+        const val PROJECT_ID = "{{ project_id }}"
+
+        fun create(): AppApiService = Retrofit.Builder()
+            .baseUrl(BASE_URL)
+            .addConverterFactory(GsonConverterFactory.create())
+            .build()
+            .create(AppApiService::class.java)
+    }
+}
@@ -0,0 +1,103 @@
+package com.applaude.app.ui.feedback
+
+import androidx.compose.foundation.background
+import androidx.compose.foundation.layout.*
+import androidx.compose.foundation.rememberScrollState
+import androidx.compose.foundation.verticalScroll
+import androidx.compose.material3.*
+import androidx.compose.runtime.*
+import androidx.compose.ui.Alignment
+import androidx.compose.ui.Modifier
+import androidx.compose.ui.unit.dp
+import com.applaude.app.data.model.SurveyQuestion
+import com.applaude.app.ui.theme.BackgroundColor
+import com.applaude.app.ui.theme.PrimaryColor
+import com.applaude.app.ui.theme.TextDark
+import com.applaude.app.ui.theme.TextLight
+import com.applaude.app.util.AnalyticsLogger
+
+/**
+ * Full-screen survey overlay in the app's brand colors, with a prominent Skip button.
+ */
+@Composable
+fun SurveyOverlay(
+    surveyType: String,
+    userId: String,
+    onSubmit: (Map<String, Any>) -> Unit,
+    onDismiss: () -> Unit,
+) {
+    val questions = SurveyQuestions.surveys[surveyType].orEmpty()
+    val answers = remember { mutableStateMapOf<String, Any>() }
+
+    LaunchedEffect(surveyType) {
+        AnalyticsLogger.logSurveyEvent(AnalyticsLogger.SURVEY_IMPRESSION, surveyType, userId)
+    }
+
+    Column(
+        modifier = Modifier
+            .fillMaxSize()
+            .background(BackgroundColor)
+            .padding(24.dp)
+            .verticalScroll(rememberScrollState()),
+        verticalArrangement = Arrangement.spacedBy(16.dp),
+    ) {
+        Row(modifier = Modifier.fillMaxWidth(), horizontalArrangement = Arrangement.End) {
+            TextButton(onClick = {
+                AnalyticsLogger.logSurveyEvent(AnalyticsLogger.SURVEY_DISMISSED, surveyType, userId)
+                onDismiss()
+            }) {
+                Text("Skip", color = PrimaryColor)
+            }
+        }
+        Text("Help us improve {{ app_name }}", style = MaterialTheme.typography.headlineSmall, color = TextDark)
+        questions.forEach { question ->
+            QuestionView(question, answers[question.id]) { answers[question.id] = it }
+        }
+        Button(
+            onClick = {
+                AnalyticsLogger.logSurveyEvent(AnalyticsLogger.SURVEY_COMPLETED, surveyType, userId, answers.toMap())
+                onSubmit(answers.toMap())
+            },
+            colors = ButtonDefaults.buttonColors(containerColor = PrimaryColor, contentColor = TextLight),
+            modifier = Modifier.fillMaxWidth(),
+        ) {
+            Text("Submit")
+        }
+    }
+}
+
+@Composable
+private fun QuestionView(question: SurveyQuestion, answer: Any?, onAnswer: (Any) -> Unit) {
+    Column(verticalArrangement = Arrangement.spacedBy(8.dp)) {
+        Text(question.question.replace("[App Name]", "{{ app_name }}"), color = TextDark)
+        when (question.type) {
+            "radio" -> question.options.forEach { option ->
+                Row(verticalAlignment = Alignment.CenterVertically) {
+                    RadioButton(selected = answer == option, onClick = { onAnswer(option) })
+                    Text(option, color = TextDark)
+                }
+            }
+            "scale", "nps" -> {
+                val min = question.min ?: 0
+                val max = question.max ?: 10
+                Slider(
+                    value = ((answer as? Int) ?: min).toFloat(),
+                    onValueChange = { onAnswer(it.toInt()) },
+                    valueRange = min.toFloat()..max.toFloat(),
+                    steps = (max - min - 1).coerceAtLeast(0),
+                )
+                if (question.labels.size == 2) {
+                    Row(modifier = Modifier.fillMaxWidth(), horizontalArrangement = Arrangement.SpaceBetween) {
+                        Text(question.labels[0], color = TextDark)
+                        Text(question.labels[1], color = TextDark)
+                    }
+                }
+            }
+            else -> OutlinedTextField(
+                value = (answer as? String).orEmpty(),
+                onValueChange = { onAnswer(it) },
+                modifier = Modifier.fillMaxWidth(),
+            )
+        }
+    }
+}
@@ -0,0 +1,14 @@
+package com.applaude.app.ui.feedback
+
+import com.applaude.app.data.model.SurveyQuestion
+
+object SurveyQuestions {
+    const val UX_ENABLED = {{ enable_ux_survey|yesno:"true,false" }}
+    const val PMF_ENABLED = {{ enable_pmf_survey|yesno:"true,false" }}
+
+    val surveys: Map<String, List<SurveyQuestion>> = mapOf({% for survey in surveys %}
+        "{{ survey.type }}" to listOf({% for q in survey.questions %}
+            SurveyQuestion(id = {{ q.id }}, question = {{ q.question }}, type = {{ q.type }}, options = listOf({{ q.options }}), min = {{ q.min }}, max = {{ q.max }}, labels = listOf({{ q.labels }})),{% endfor %}
+        ),{% endfor %}
+    )
+}
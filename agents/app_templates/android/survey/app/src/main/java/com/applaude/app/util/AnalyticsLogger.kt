@@ -0,0 +1,16 @@
+package com.applaude.app.util
+
+import android.util.Log
+
+object AnalyticsLogger {
+    private const val TAG = "AppAnalytics"
+
+    const val SURVEY_IMPRESSION = "survey_impression"
+    const val SURVEY_DISMISSED = "survey_dismissed"
+    const val SURVEY_COMPLETED = "survey_completed"
+
+    fun logSurveyEvent(eventId: String, surveyType: String, userId: String, details: Map<String, Any>? = null) {
+        val message = "Event: $eventId, Survey: $surveyType, User: $userId"
+        Log.d(TAG, if (details != null) "$message, Details: $details" else message)
+    }
+}
@@ -0,0 +1,38 @@
+package com.applaude.app.util
+
+import android.content.Context
+
+/**
+ * Shows each survey once per user, after the app has been opened a few times
+ * or a week after install. State is kept in SharedPreferences.
+ */
+class SurveyScheduler(context: Context) {
+    private val prefs = context.getSharedPreferences("applaude_surveys", Context.MODE_PRIVATE)
+
+    fun recordAppOpen() {
+        if (!prefs.contains(KEY_INSTALLED_AT)) {
+            prefs.edit().putLong(KEY_INSTALLED_AT, System.currentTimeMillis()).apply()
+        }
+        prefs.edit().putInt(KEY_OPEN_COUNT, prefs.getInt(KEY_OPEN_COUNT, 0) + 1).apply()
+    }
+
+    fun shouldShow(surveyType: String): Boolean {
+        if (prefs.getBoolean(shownKey(surveyType), false)) return false
+        val installedAt = prefs.getLong(KEY_INSTALLED_AT, System.currentTimeMillis())
+        val weekPassed = System.currentTimeMillis() - installedAt >= WEEK_MILLIS
+        return prefs.getInt(KEY_OPEN_COUNT, 0) >= MIN_OPENS || weekPassed
+    }
+
+    fun markShown(surveyType: String) {
+        prefs.edit().putBoolean(shownKey(surveyType), true).apply()
+    }
+
+    private fun shownKey(surveyType: String) = "has_shown_${surveyType.lowercase()}_survey"
+
+    companion object {
+        private const val KEY_OPEN_COUNT = "open_count"
+        private const val KEY_INSTALLED_AT = "installed_at"
+        private const val MIN_OPENS = 5
+        private const val WEEK_MILLIS = 7L * 24 * 60 * 60 * 1000
+    }
+}
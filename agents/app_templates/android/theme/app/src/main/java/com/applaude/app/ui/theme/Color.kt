@@ -0,0 +1,10 @@
+// Generated by Applaude from the {{ app_name }} brand palette.
+package com.applaude.app.ui.theme
+
+import androidx.compose.ui.graphics.Color
+
+val PrimaryColor = Color(0x{{ colors.primary.argb }})
+val SecondaryColor = Color(0x{{ colors.secondary.argb }})
+val TextLight = Color(0x{{ colors.text_light.argb }})
+val TextDark = Color(0x{{ colors.text_dark.argb }})
+val BackgroundColor = Color(0x{{ colors.background.argb }})
@@ -0,0 +1,42 @@
+package com.applaude.app.ui.theme
+
+import androidx.compose.foundation.isSystemInDarkTheme
+import androidx.compose.material3.MaterialTheme
+import androidx.compose.material3.Typography
+import androidx.compose.material3.darkColorScheme
+import androidx.compose.material3.lightColorScheme
+import androidx.compose.runtime.Composable
+
+private val DarkColorScheme = darkColorScheme(
+    primary = PrimaryColor,
+    secondary = SecondaryColor,
+    background = TextDark,
+    surface = TextDark,
+    onPrimary = TextLight,
+    onSecondary = TextLight,
+    onBackground = TextLight,
+    onSurface = TextLight,
+)
+
+private val LightColorScheme = lightColorScheme(
+    primary = PrimaryColor,
+    secondary = SecondaryColor,
+    background = BackgroundColor,
+    surface = BackgroundColor,
+    onPrimary = TextLight,
+    onSecondary = TextLight,
+    onBackground = TextDark,
+    onSurface = TextDark,
+)
+
+@Composable
+fun AppTheme(
+    darkTheme: Boolean = isSystemInDarkTheme(),
+    content: @Composable () -> Unit
+) {
+    MaterialTheme(
+        colorScheme = if (darkTheme) DarkColorScheme else LightColorScheme,
+        typography = Typography(),
+        content = content
+    )
+}
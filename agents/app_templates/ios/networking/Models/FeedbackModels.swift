@@ -0,0 +1,36 @@
+import Foundation
+
+struct User: Codable, Identifiable {
+    let id: String
+    var displayName: String?
+}
+
+struct SurveyQuestion: Codable, Identifiable {
+    let id: String
+    let question: String
+    let type: String // "text", "radio", "scale" or "nps"
+    var options: [String] = []
+    var min: Int? = nil
+    var max: Int? = nil
+    var labels: [String] = []
+}
+
+struct SurveyResponse: Encodable {
+    let project: String
+    let userIdentifier: String
+    let surveyType: String // "UX" or "PMF"
+    let responses: [String: String]
+}
+
+struct AppRating: Encodable {
+    let project: String
+    let userIdentifier: String
+    let rating: Int // 1-5
+    var comment: String? = nil
+}
+
+struct UserFeedback: Encodable {
+    let project: String
+    let userIdentifier: String
+    let feedbackText: String
+}
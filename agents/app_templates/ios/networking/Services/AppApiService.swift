@@ -0,0 +1,42 @@
+import Foundation
+
+/// Sends survey responses, ratings and feedback to the Applaude backend.
+final class AppApiService {
+    static let shared = AppApiService()
+    static let baseURL = URL(string: "{{ api_base_url }}")!
+    static let projectId = "{{ project_id }}"
+
+    private let session: URLSession
+    private let encoder: JSONEncoder = {
+        let encoder = JSONEncoder()
+        encoder.keyEncodingStrategy = .convertToSnakeCase
+        return encoder
+    }()
+
+    init(session: URLSession = .shared) {
+        self.session = session
+    }
+
+    func submitSurveyResponse(_ response: SurveyResponse) async throws {
+        try await post("api/surveys/submit/survey/", body: response)
+    }
+
+    func submitAppRating(_ rating: AppRating) async throws {
+        try await post("api/surveys/submit/rating/", body: rating)
+    }
+
+    func submitUserFeedback(_ feedback: UserFeedback) async throws {
+        try await post("api/surveys/submit/feedback/", body: feedback)
+    }
+
+    private func post<Body: Encodable>(_ path: String, body: Body) async throws {
+        var request = URLRequest(url: Self.baseURL.appendingPathComponent(path))
+        request.httpMethod = "POST"
+        request.setValue("application/json", forHTTPHeaderField: "Content-Type")
+        request.httpBody = try encoder.encode(body)
+        let (_, response) = try await session.data(for: request)
+        guard let http = response as? HTTPURLResponse, (200..<300).contains(http.statusCode) else {
+            throw URLError(.badServerResponse)
+        }
+    }
+}
@@ -0,0 +1,106 @@
+import SwiftUI
+
+/// Full-screen survey overlay in the app's brand colors, with a prominent Skip button.
+struct SurveyOverlayView: View {
+    let surveyType: String
+    let userId: String
+    var onSubmit: ([String: String]) -> Void
+    var onDismiss: () -> Void
+
+    @State private var answers: [String: String] = [:]
+
+    private var questions: [SurveyQuestion] {
+        SurveyQuestions.surveys[surveyType] ?? []
+    }
+
+    var body: some View {
+        ZStack {
+            Color.backgroundBrand.ignoresSafeArea()
+            ScrollView {
+                VStack(alignment: .leading, spacing: 20) {
+                    HStack {
+                        Spacer()
+                        Button("Skip") {
+                            AnalyticsService.logSurveyEvent(AnalyticsService.surveyDismissed, surveyType: surveyType, userId: userId)
+                            onDismiss()
+                        }
+                        .foregroundColor(.primaryBrand)
+                    }
+                    Text("Help us improve {{ app_name }}")
+                        .font(.title2.bold())
+                        .foregroundColor(.textDark)
+                    ForEach(questions) { question in
+                        QuestionView(question: question, answer: binding(for: question.id))
+                            .padding()
+                            .background(LiquidGlassView())
+                    }
+                    Button {
+                        AnalyticsService.logSurveyEvent(AnalyticsService.surveyCompleted, surveyType: surveyType, userId: userId, details: answers)
+                        onSubmit(answers)
+                    } label: {
+                        Text("Submit")
+                            .frame(maxWidth: .infinity)
+                            .padding()
+                            .background(Color.primaryBrand)
+                            .foregroundColor(.textLight)
+                            .clipShape(RoundedRectangle(cornerRadius: 14, style: .continuous))
+                    }
+                }
+                .padding(24)
+            }
+        }
+        .onAppear {
+            AnalyticsService.logSurveyEvent(AnalyticsService.surveyImpression, surveyType: surveyType, userId: userId)
+        }
+    }
+
+    private func binding(for id: String) -> Binding<String> {
+        Binding(get: { answers[id] ?? "" }, set: { answers[id] = $0 })
+    }
+}
+
+private struct QuestionView: View {
+    let question: SurveyQuestion
+    @Binding var answer: String
+
+    var body: some View {
+        VStack(alignment: .leading, spacing: 10) {
+            Text(question.question.replacingOccurrences(of: "[App Name]", with: "{{ app_name }}"))
+                .foregroundColor(.textDark)
+            switch question.type {
+            case "radio":
+                ForEach(question.options, id: \.self) { option in
+                    Button {
+                        answer = option
+                    } label: {
+                        HStack {
+                            Image(systemName: answer == option ? "largecircle.fill.circle" : "circle")
+                            Text(option)
+                        }
+                        .foregroundColor(.textDark)
+                    }
+                }
+            case "scale", "nps":
+                let range = Double(question.min ?? 0)...Double(question.max ?? 10)
+                Slider(
+                    value: Binding(get: { Double(answer) ?? range.lowerBound }, set: { answer = String(Int($0)) }),
+                    in: range,
+                    step: 1
+                )
+                .tint(.primaryBrand)
+                if question.labels.count == 2 {
+                    HStack {
+                        Text(question.labels[0])
+                        Spacer()
+                        Text(question.labels[1])
+                    }
+                    .font(.caption)
+                    .foregroundColor(.textDark)
+                }
+            default:
+                TextField("Your answer", text: $answer, axis: .vertical)
+                    .textFieldStyle(.roundedBorder)
+            }
+        }
+    }
+}
@@ -0,0 +1,12 @@
+import Foundation
+
+enum SurveyQuestions {
+    static let uxEnabled = {{ enable_ux_survey|yesno:"true,false" }}
+    static let pmfEnabled = {{ enable_pmf_survey|yesno:"true,false" }}
+
+    static let surveys: [String: [SurveyQuestion]] = [{% for survey in surveys %}
+        "{{ survey.type }}": [{% for q in survey.questions %}
+            SurveyQuestion(id: {{ q.id }}, question: {{ q.question }}, type: {{ q.type }}, options: [{{ q.options }}], min: {{ q.min }}, max: {{ q.max }}, labels: [{{ q.labels }}]),{% endfor %}
+        ],{% empty %}:{% endfor %}
+    ]
+}
@@ -0,0 +1,35 @@
+import Foundation
+
+/// Shows each survey once per user, after the app has been opened a few
+/// times or a week after install. State is kept in UserDefaults.
+struct SurveyScheduler {
+    private let defaults: UserDefaults
+    private let minOpens = 5
+    private let week: TimeInterval = 7 * 24 * 60 * 60
+
+    init(defaults: UserDefaults = .standard) {
+        self.defaults = defaults
+    }
+
+    func recordAppOpen() {
+        if defaults.object(forKey: "installed_at") == nil {
+            defaults.set(Date().timeIntervalSince1970, forKey: "installed_at")
+        }
+        defaults.set(defaults.integer(forKey: "open_count") + 1, forKey: "open_count")
+    }
+
+    func shouldShow(_ surveyType: String) -> Bool {
+        if defaults.bool(forKey: shownKey(surveyType)) { return false }
+        let installedAt = defaults.double(forKey: "installed_at")
+        let weekPassed = installedAt > 0 && Date().timeIntervalSince1970 - installedAt >= week
+        return defaults.integer(forKey: "open_count") >= minOpens || weekPassed
+    }
+
+    func markShown(_ surveyType: String) {
+        defaults.set(true, forKey: shownKey(surveyType))
+    }
+
+    private func shownKey(_ surveyType: String) -> String {
+        "has_shown_\(surveyType.lowercased())_survey"
+    }
+}
@@ -0,0 +1,14 @@
+import Foundation
+import os
+
+enum AnalyticsService {
+    static let surveyImpression = "survey_impression"
+    static let surveyDismissed = "survey_dismissed"
+    static let surveyCompleted = "survey_completed"
+
+    private static let logger = Logger(subsystem: "ApplaudeApp", category: "AppAnalytics")
+
+    static func logSurveyEvent(_ eventId: String, surveyType: String, userId: String, details: [String: String]? = nil) {
+        logger.debug("Event: \(eventId), Survey: \(surveyType), User: \(userId), Details: \(String(describing: details))")
+    }
+}
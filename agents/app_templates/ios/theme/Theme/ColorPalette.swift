@@ -0,0 +1,10 @@
+// Generated by Applaude from the {{ app_name }} brand palette.
+import SwiftUI
+
+extension Color {
+    static let primaryBrand = Color(red: {{ colors.primary.red }}, green: {{ colors.primary.green }}, blue: {{ colors.primary.blue }})
+    static let secondaryBrand = Color(red: {{ colors.secondary.red }}, green: {{ colors.secondary.green }}, blue: {{ colors.secondary.blue }})
+    static let textLight = Color(red: {{ colors.text_light.red }}, green: {{ colors.text_light.green }}, blue: {{ colors.text_light.blue }})
+    static let textDark = Color(red: {{ colors.text_dark.red }}, green: {{ colors.text_dark.green }}, blue: {{ colors.text_dark.blue }})
+    static let backgroundBrand = Color(red: {{ colors.background.red }}, green: {{ colors.background.green }}, blue: {{ colors.background.blue }})
+}
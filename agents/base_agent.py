@@ -1,11 +1,16 @@
 import google.generativeai as genai
 import os
 from abc import ABC, abstractmethod
+from .model_router import route_generate
+from .telemetry import span
 
 class BaseAgent(ABC):
     """
     Abstract Base Class for all AI Agents in the Applaude platform.
     """
+    # Model route (see agents.model_router.ROUTES) the agent's calls take.
+    route = 'default'
+
     def __init__(self, agent_name: str, agent_persona: str, goal: str):
         """
         Initializes the agent with its core attributes.
@@ -22,7 +27,6 @@ class BaseAgent(ABC):
         if not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
         genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
 
     @abstractmethod
     def execute(self, *args, **kwargs):
@@ -32,6 +36,13 @@ class BaseAgent(ABC):
         """
         pass
 
+    def generate(self, contents, project_id=None, **kwargs):
+        """
+        Calls the model along the agent's route, with hedging and fallback.
+        """
+        with span('agent.generate', agent=self.agent_name, project_id=project_id):
+            return route_generate(self.route, contents, project_id=project_id, **kwargs)
+
     def _generate_prompt(self, task_description: str) -> str:
         """
         Constructs the final prompt to be sent to the Gemini API.
@@ -0,0 +1,191 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from celery.contrib.testing.worker import start_worker
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from applaude_api.celery import app as celery_app
+from apps.projects.models import PipelineRun, Project, StageRun
+from . import admission
+from .pipeline import BUILD_TARGET, PROJECT_PIPELINE, start_pipelines
+from .telemetry import percentile
+
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+SITE_PAGE = (
+    '<html><head><title>Benchmark Store</title><meta name="description" content="Everything, delivered">'
+    '<link rel="stylesheet" href="/site.css"></head>'
+    '<body><h1>Everything, delivered</h1><p>Order online and track your delivery.</p></body></html>'
+)
+SITE_CSS = 'a { color: #1A73E8; } button { background: #F9AB00; color: #FFFFFF; } body { background: #F8F9FA; color: #202124; }'
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """
+    Serves the same small site under every path, so each project gets its
+    own analysis without network access.
+    """
+    def do_GET(self):
+        content_type, body = ('text/css', SITE_CSS) if self.path.endswith('.css') else ('text/html; charset=utf-8', SITE_PAGE)
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def fixture_site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class QueryCounter:
+    """
+    Counts the queries run on every database connection opened by threads
+    other than the one that created the counter.
+    """
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._main_thread = threading.get_ident()
+
+    def __call__(self, execute, sql, params, many, context):
+        if threading.get_ident() != self._main_thread:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def attach(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def _reset_celery_connections():
+    """
+    Drops the broker pool and result backend the app built from its
+    previous settings, so the next task uses the current ones.
+    """
+    celery_app._pool = None
+    if 'amqp' in celery_app.__dict__:
+        celery_app.amqp._producer_pool = None
+    celery_app._backend_cache = None
+    celery_app._local.__dict__.pop('backend', None)
+
+
+@contextmanager
+def offline_celery(concurrency):
+    """
+    Runs tasks on an in-process worker fed by an in-memory broker.
+    """
+    # The app reads its settings with the CELERY_ namespace. Short polling
+    # intervals keep the hand-off between tasks out of the stage timings.
+    overrides = {
+        'CELERY_BROKER_URL': 'memory://',
+        'CELERY_BROKER_TRANSPORT_OPTIONS': {'polling_interval': 0.01},
+        'CELERY_RESULT_BACKEND': 'cache+memory://',
+        'CELERY_RESULT_CHORD_RETRY_INTERVAL': 0.05,
+        'CELERY_TASK_ALWAYS_EAGER': False,
+    }
+    previous = {key: celery_app.conf.get(key) for key in overrides}
+    celery_app.conf.update(overrides)
+    _reset_celery_connections()
+    try:
+        with start_worker(celery_app, pool='threads', concurrency=concurrency, perform_ping_check=False, shutdown_timeout=30):
+            yield
+    finally:
+        celery_app.conf.update(previous)
+        _reset_celery_connections()
+
+
+def run_benchmark(projects=10, concurrency=4, mode='fake', latency=(0.5, 2), fixture_path=None, timeout=600, keep=False):
+    """
+    Drives `projects` new projects from market analysis to deployment at
+    once, with model calls faked or replayed, and measures the run.
+    Worker threads write concurrently, so use PostgreSQL; on SQLite only
+    `concurrency=1` avoids lock errors.
+
+    Returns:
+        A dict with the wall time, throughput, per-stage p50/p95/p99
+        seconds, failed runs and database queries per project.
+    """
+    settings_overrides = {
+        'LLM_MODE': mode, 'LLM_FAKE_LATENCY': tuple(latency), 'CACHES': BENCHMARK_CACHES,
+        # The fixture site is served on loopback.
+        'SITE_FETCH_ALLOW_PRIVATE': True,
+    }
+    if fixture_path:
+        settings_overrides['LLM_FIXTURE_PATH'] = fixture_path
+    counter = QueryCounter()
+    user = None
+
+    with ExitStack() as stack:
+        scratch = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(override_settings(MEDIA_ROOT=scratch, SITE_CACHE_DIR=scratch, **settings_overrides))
+        if 'GEMINI_API_KEY' not in os.environ:
+            os.environ['GEMINI_API_KEY'] = 'offline-benchmark'
+            stack.callback(os.environ.pop, 'GEMINI_API_KEY', None)
+        # Rate limits and latency stats stay in this process, next to the worker.
+        previous_backend, admission._backend = admission._backend, admission.LocalAdmissionBackend()
+        stack.callback(setattr, admission, '_backend', previous_backend)
+        site_url = stack.enter_context(fixture_site())
+        connection_created.connect(counter.attach)
+        stack.callback(connection_created.disconnect, counter.attach)
+        stack.enter_context(offline_celery(concurrency))
+
+        batch = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(email=f"benchmark-{batch}@applaude.ai", password=uuid.uuid4().hex)
+        project_ids = [
+            Project.objects.create(owner=user, name=f"Benchmark {batch} #{index}", source_url=f"{site_url}/store-{index}/").id
+            for index in range(projects)
+        ]
+        try:
+            started = time.monotonic()
+            runs = start_pipelines(project_ids, target=BUILD_TARGET, resume=False)
+            run_ids = [run.id for run in runs]
+            finished_states = (PipelineRun.RunStatus.COMPLETE, PipelineRun.RunStatus.FAILED)
+            while PipelineRun.objects.filter(id__in=run_ids).exclude(status__in=finished_states).exists():
+                if time.monotonic() - started > timeout:
+                    raise TimeoutError(f"The benchmark runs did not finish within {timeout}s.")
+                time.sleep(0.2)
+            elapsed = time.monotonic() - started
+
+            durations = {name: [] for name in PROJECT_PIPELINE.order}
+            for stage_run in StageRun.objects.filter(run_id__in=run_ids, status=StageRun.StageStatus.COMPLETE):
+                if stage_run.duration is not None:
+                    durations[stage_run.stage].append(stage_run.duration.total_seconds())
+            failed = PipelineRun.objects.filter(id__in=run_ids, status=PipelineRun.RunStatus.FAILED).count()
+        finally:
+            if not keep:
+                Project.objects.filter(id__in=project_ids).delete()
+                user.delete()
+
+    return {
+        'projects': projects,
+        'failed': failed,
+        'seconds': round(elapsed, 2),
+        'projects_per_minute': round(projects / elapsed * 60, 2),
+        'queries_per_project': round(counter.count / projects, 1),
+        'stages': {
+            name: {
+                'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99),
+                'count': len(values),
+            }
+            for name, values in durations.items()
+        },
+    }
@@ -0,0 +1,44 @@
+import hashlib
+import json
+from apps.projects.models import StepCheckpoint
+from .telemetry import span
+
+
+def input_hash(inputs):
+    """
+    Hashes a step's inputs; anything JSON can't encode is hashed as its string.
+    """
+    payload = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StepCheckpoints:
+    """
+    Checkpoints the steps of one stage for one project. A retry of the stage
+    gets the stored output of every step whose inputs are unchanged, so only
+    the step that failed (and those after it) run again.
+    """
+    def __init__(self, project_id, stage):
+        self.project_id = project_id
+        self.stage = stage
+
+    def run(self, step, inputs, compute):
+        """
+        Returns the checkpointed output of `step` if it was computed from the
+        same inputs, otherwise calls `compute()` and checkpoints its result.
+        The result must be JSON-serializable.
+        """
+        key = input_hash(inputs)
+        with span('step', project_id=self.project_id, stage=self.stage, step=step) as step_span:
+            checkpoint = StepCheckpoint.objects.filter(project_id=self.project_id, stage=self.stage, step=step).first()
+            if checkpoint is not None and checkpoint.input_hash == key:
+                print(f"Reusing the checkpointed {self.stage}/{step} step for project {self.project_id}.")
+                step_span.set(cache_hit=True)
+                return checkpoint.output
+
+            output = compute()
+            StepCheckpoint.objects.update_or_create(
+                project_id=self.project_id, stage=self.stage, step=step,
+                defaults={'input_hash': key, 'output': output},
+            )
+            return output
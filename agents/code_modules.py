@@ -0,0 +1,218 @@
+import hashlib
+import io
+import json
+import posixpath
+import re
+import zipfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Independent slices of an app that can be generated at the same time.
+# Each one is told the names the others expose, so they fit together when merged.
+CODE_MODULES = {
+    'theme': "the theme/styling layer: colors from the Brand Palette, typography and shared UI components such as the glass card.",
+    'networking': "the data and networking layer: data models (User, SurveyQuestion, SurveyResponse, AppRating, UserFeedback), the AppApiService client and the repository that wraps it.",
+    'survey': "the feedback engine: survey overlay, question views, the display rules kept in local storage and the AnalyticsLogger events.",
+    'screens': "the app entry point, navigation and every screen (auth, home, detail, profile/settings), using the theme, networking and survey modules.",
+}
+
+# Project fields each module is generated from. A module is rebuilt only
+# when one of these (or its platform, or GENERATOR_VERSION) changes.
+MODULE_INPUTS = {
+    'theme': ('name', 'brand_palette'),
+    'networking': (),
+    'survey': ('name', 'enable_ux_survey', 'ux_survey_questions', 'enable_pmf_survey', 'pmf_survey_questions'),
+    'screens': ('user_persona_document', 'source_url', 'enable_ux_survey', 'enable_pmf_survey'),
+}
+
+# Bump when prompts or the module contracts change, so every module is rebuilt.
+GENERATOR_VERSION = 2
+
+PLATFORMS = {
+    'ANDROID': {
+        'language': 'Kotlin with Jetpack Compose',
+        'contract': (
+            "Sources live in `app/src/main/java/com/applaude/app/` (package `com.applaude.app`); write full paths from "
+            "the project root. Theme: `ui/theme/Color.kt` (PrimaryColor, SecondaryColor, TextLight, TextDark, "
+            "BackgroundColor) and `AppTheme` in `ui/theme/Theme.kt`. Networking: `network/AppApiService.kt` and "
+            "`AppRepository` in `data/repository/` (submitSurvey, submitRating, submitFeedback). Survey: "
+            "`SurveyOverlay(surveyType, userId, onSubmit, onDismiss)` in `ui/feedback/`, `SurveyQuestions.surveys`, "
+            "`util/SurveyScheduler.kt` (recordAppOpen, shouldShow, markShown) and `util/AnalyticsLogger.kt`. "
+            "Screens live in `ui/screens/`, with `MainActivity.kt` as the entry point."
+        ),
+    },
+    'IOS': {
+        'language': 'Swift with SwiftUI',
+        'contract': (
+            "Target `ApplaudeApp`. Theme: `Theme/ColorPalette.swift` (Color.primaryBrand, .secondaryBrand, .textLight, "
+            ".textDark, .backgroundBrand) and `Components/LiquidGlassView.swift`. Networking: `AppApiService.shared` in "
+            "`Services/AppApiService.swift` and the models in `Models/`. Survey: `SurveyOverlayView(surveyType:userId:"
+            "onSubmit:onDismiss:)` in `Feedback/`, `SurveyQuestions.surveys`, `SurveyScheduler` (recordAppOpen, "
+            "shouldShow, markShown) and `Services/AnalyticsService.swift`. "
+            "Screens live in `Views/`, with `ApplaudeApp.swift` as the entry point."
+        ),
+    },
+}
+
+CODE_BLOCK = re.compile(r'```[^\n]*\n(.*?)```', re.DOTALL)
+FILE_HEADER = re.compile(r'^\s*(?://|#|<!--)\s*File:\s*(\S+?)\s*(?:-->)?\s*$')
+
+
+def target_platforms(app_type):
+    """
+    Returns the native platforms an app type is built for.
+    """
+    if app_type == 'BOTH':
+        return ['ANDROID', 'IOS']
+    if app_type not in PLATFORMS:
+        raise ValueError(f"Unsupported app type: {app_type}")
+    return [app_type]
+
+
+def plan_code_generation(app_type):
+    """
+    Splits a build into (platform, module) subtasks that do not depend on
+    each other's output.
+    """
+    return [(platform, module) for platform in target_platforms(app_type) for module in CODE_MODULES]
+
+
+def describe_scope(platform, module):
+    return (
+        f"**Scope of this response:** Generate ONLY {CODE_MODULES[module]}\n"
+        f"Target platform: {platform} ({PLATFORMS[platform]['language']}). Other modules are generated separately; "
+        f"reference them by these names and do not redefine them: {PLATFORMS[platform]['contract']}"
+    )
+
+
+def module_input_hash(project, platform, module):
+    """
+    Hashes everything a module's files are generated from.
+    """
+    inputs = {
+        'version': GENERATOR_VERSION,
+        'platform': platform,
+        'module': module,
+        'fields': {name: getattr(project, name) for name in MODULE_INPUTS[module]},
+    }
+    payload = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _safe_path(path):
+    path = posixpath.normpath(path.strip().lstrip('/'))
+    if path in ('', '.') or path.startswith('..'):
+        return None
+    return path
+
+
+def parse_code_files(text):
+    """
+    Collects the files from a response made of fenced code blocks, each
+    starting with a `// File: path` comment.
+
+    Returns:
+        A dict mapping relative paths to file contents.
+    """
+    files = {}
+    for block in CODE_BLOCK.findall(text or ''):
+        lines = block.split('\n')
+        for index, line in enumerate(lines):
+            if not line.strip():
+                continue
+            match = FILE_HEADER.match(line)
+            path = _safe_path(match.group(1)) if match else None
+            if path:
+                files[path] = '\n'.join(lines[index + 1:]).strip('\n') + '\n'
+            break
+    return files
+
+
+def artifact_path(project_id):
+    return f"generated_code/{project_id}/source_code.zip"
+
+
+def load_artifact_parts(name):
+    """
+    Reads the modules back out of a previously built artifact.
+
+    Returns:
+        A dict mapping (platform, module) to a part dict with `platform`,
+        `module`, `input_hash` and `files` keys. Empty if there is no
+        readable artifact.
+    """
+    if not name or not default_storage.exists(name):
+        return {}
+    try:
+        with default_storage.open(name, 'rb') as artifact, zipfile.ZipFile(artifact) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+            parts = {}
+            for entry in manifest.get('modules', []):
+                prefix = f"{entry['platform'].lower()}/"
+                parts[(entry['platform'], entry['module'])] = {
+                    'platform': entry['platform'],
+                    'module': entry['module'],
+                    'input_hash': entry.get('input_hash'),
+                    'files': {path[len(prefix):]: archive.read(path).decode('utf-8') for path in entry['files']},
+                }
+            return parts
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"Could not read the previous artifact {name}: {e}")
+        return {}
+
+
+def split_reusable_modules(project, plan, previous_parts):
+    """
+    Separates the modules whose inputs are unchanged since the previous
+    build from the ones that must be regenerated.
+
+    Returns:
+        A (reused, changed) tuple of (platform, module) lists.
+    """
+    reused, changed = [], []
+    for platform, module in plan:
+        previous = previous_parts.get((platform, module))
+        if previous and previous['files'] and previous['input_hash'] == module_input_hash(project, platform, module):
+            reused.append((platform, module))
+        else:
+            changed.append((platform, module))
+    return reused, changed
+
+
+def build_artifact(project_id, parts):
+    """
+    Merges the generated modules into one zip in default storage, with one
+    top-level folder per platform and a manifest recording the files and
+    input hash of each module.
+
+    Args:
+        project_id: The project the code belongs to.
+        parts (list): Dicts with `platform`, `module`, `input_hash` and `files` keys.
+
+    Returns:
+        The storage name of the saved artifact.
+    """
+    manifest = {'project_id': str(project_id), 'generator_version': GENERATOR_VERSION, 'modules': []}
+    written = set()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for part in sorted(parts, key=lambda part: (part['platform'], list(CODE_MODULES).index(part['module']))):
+            paths = []
+            for path, content in sorted(part['files'].items()):
+                name = f"{part['platform'].lower()}/{path}"
+                if name in written:
+                    print(f"Skipping {name} from the {part['module']} module; another module already wrote it.")
+                    continue
+                archive.writestr(name, content)
+                written.add(name)
+                paths.append(name)
+            manifest['modules'].append({
+                'platform': part['platform'], 'module': part['module'],
+                'input_hash': part.get('input_hash'), 'files': paths,
+            })
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+
+    name = artifact_path(project_id)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
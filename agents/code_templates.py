@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.template import Context, Engine
+from .code_generation_agent import DEFAULT_PMF_SURVEY_QUESTIONS, DEFAULT_UX_SURVEY_QUESTIONS
+from .palette import FALLBACKS, PALETTE_KEYS, hex_to_rgb
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'app_templates'
+
+# Modules rendered from templates; only the remaining ones go to the model.
+TEMPLATED_MODULES = ('theme', 'networking', 'survey')
+
+DEFAULT_COLORS = {'primary': '#6200EE', 'secondary': '#03DAC6', **FALLBACKS}
+
+# Standalone engine for source code rather than HTML, so nothing is autoescaped.
+# The cached loader keeps every template compiled after first use.
+_engine = Engine(
+    dirs=[str(TEMPLATE_DIR)],
+    autoescape=False,
+    loaders=[('django.template.loaders.cached.Loader', ['django.template.loaders.filesystem.Loader'])],
+)
+
+
+def template_names(platform, module):
+    """
+    Lists a module's templates; each path below the module folder is the
+    path of the file it renders.
+    """
+    root = TEMPLATE_DIR / platform.lower() / module
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob('*') if path.is_file())
+
+
+def string_literal(value, platform):
+    """
+    Quotes a value as a Kotlin or Swift string literal.
+    """
+    literal = json.dumps(str(value), ensure_ascii=False)
+    if platform == 'ANDROID':
+        literal = literal.replace('$', '\\$')
+    return literal
+
+
+def _color_context(palette):
+    colors = {}
+    for key in PALETTE_KEYS:
+        value = (palette or {}).get(key) or DEFAULT_COLORS[key]
+        red, green, blue = hex_to_rgb(value)
+        colors[key] = {
+            'argb': f"FF{value.lstrip('#').upper()}",
+            'red': f"{red / 255:.3f}",
+            'green': f"{green / 255:.3f}",
+            'blue': f"{blue / 255:.3f}",
+        }
+    return colors
+
+
+def _question_context(question, platform):
+    def quote(value):
+        return string_literal(value, platform)
+
+    null = 'null' if platform == 'ANDROID' else 'nil'
+    minimum, maximum = question.get('min'), question.get('max')
+    if question.get('scale'):
+        minimum, maximum = question['scale']
+    return {
+        'id': quote(question.get('id', '')),
+        'question': quote(question.get('question', '')),
+        'type': quote(question.get('type', 'text')),
+        'options': ', '.join(quote(option) for option in question.get('options', [])),
+        'min': null if minimum is None else int(minimum),
+        'max': null if maximum is None else int(maximum),
+        'labels': ', '.join(quote(label) for label in question.get('labels', [])),
+    }
+
+
+def template_context(project, platform):
+    surveys = []
+    if project.enable_ux_survey:
+        surveys.append(('UX', project.ux_survey_questions or DEFAULT_UX_SURVEY_QUESTIONS))
+    if project.enable_pmf_survey:
+        surveys.append(('PMF', project.pmf_survey_questions or DEFAULT_PMF_SURVEY_QUESTIONS))
+    return {
+        # Placed inside string literals by the templates.
+        'app_name': string_literal(project.name, platform)[1:-1],
+        'project_id': str(project.id),
+        'api_base_url': settings.GENERATED_APP_API_BASE_URL,
+        'colors': _color_context(project.brand_palette),
+        'enable_ux_survey': project.enable_ux_survey,
+        'enable_pmf_survey': project.enable_pmf_survey,
+        'surveys': [
+            {'type': survey_type, 'questions': [_question_context(question, platform) for question in questions]}
+            for survey_type, questions in surveys
+        ],
+    }
+
+
+def render_module(project, platform, module):
+    """
+    Renders a templated module for one platform from the project's data,
+    without a model call.
+
+    Returns:
+        A dict mapping relative file paths to contents.
+    """
+    context = Context(template_context(project, platform), autoescape=False)
+    prefix = f"{platform.lower()}/{module}/"
+    return {
+        name: _engine.get_template(prefix + name).render(context)
+        for name in template_names(platform, module)
+    }
@@ -1,6 +1,5 @@
 from .base_agent import BaseAgent
 from apps.projects.models import Project
-from django.db import transaction
 from .prompts.super_prompts import CYBERSECURITY_AGENT_PERSONA, CYBERSECURITY_AGENT_GOAL
 
 class CybersecurityAgent(BaseAgent):
@@ -13,17 +12,14 @@ class CybersecurityAgent(BaseAgent):
 
     def execute(self, project_id: int):
         print(f"Executing Cybersecurity Agent for project {project_id}...")
-        project = Project.objects.get(id=project_id)
-        project.status = "SECURITY_SCAN_PENDING"
-        project.save()
+        # The scan runs in parallel with QA, which owns the project status,
+        # so only the message is updated here.
+        Project.objects.filter(id=project_id).update(status_message="Running security scan...")
 
         # In a real scenario, this would perform a security scan
         # For now, we simulate a successful security scan
         security_report = "No security vulnerabilities found. The codebase is secure."
 
-        with transaction.atomic():
-            project.status = "SECURITY_SCAN_COMPLETE"
-            project.status_message = "Security scan passed successfully."
-            project.save()
+        Project.objects.filter(id=project_id).update(status_message="Security scan passed successfully.")
         print(f"Security scan complete for project {project_id}.")
         return security_report
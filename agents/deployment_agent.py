@@ -2,7 +2,6 @@ from .base_agent import BaseAgent
 from .prompts.super_prompts import DEVOPS_AGENT_PERSONA, DEVOPS_AGENT_GOAL
 from apps.projects.models import Project
 from django.db import transaction
-import google.generativeai as genai
 
 class DeploymentAgent(BaseAgent):
     """
@@ -14,7 +13,6 @@ class DeploymentAgent(BaseAgent):
             agent_persona=DEVOPS_AGENT_PERSONA,
             goal=DEVOPS_AGENT_GOAL
         )
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
 
     def execute(self, project_id: int):
         """
@@ -60,7 +58,7 @@ class DeploymentAgent(BaseAgent):
 
         full_prompt = self._generate_prompt(task_description)
         # In a real application, you would make the API call:
-        # response = self.model.generate_content(full_prompt)
+        # response = self.generate(full_prompt, project_id=project_id)
         # deployment_report = response.text
 
         # For this simulation, we will create a representative report.
@@ -1,21 +1,23 @@
 
 from .base_agent import BaseAgent
+from .palette import resolve_brand_palette
+from .site_crawler import get_site_extract, fetch_bytes
 from apps.projects.models import Project
 from django.db import transaction
-import google.generativeai as genai
 import os
 
 class DesignAgent(BaseAgent):
     """
     Analyzes a user's website to extract a brand-consistent color palette.
     """
+    route = 'design'
+
     def __init__(self):
         super().__init__(
             agent_name="Design",
             agent_persona="You are the 'Digital Design Agent,' an AI with a masterful eye for aesthetics and brand identity. You can look at any website and instantly identify its core color palette, understanding the role each color plays in the brand's visual language (e.g., primary, secondary, accent). Your output will be a precise JSON object containing hex codes.",
             goal="To extract the primary, secondary, text (light/dark), and background branding colors from a user's website to ensure perfect brand consistency in the generated mobile app. If a specific color type cannot be confidently identified, provide a sensible fallback hex code (e.g., #FFFFFF for white, #000000 for black, #CCCCCC for gray). The output must be PURE JSON, with no introductory or concluding text."
         )
-        self.model = genai.GenerativeModel('gemini-1.5-pro') # Using a more capable model for prompt engineering
 
     def execute(self, project_id: int):
         """
@@ -55,13 +57,13 @@ class DesignAgent(BaseAgent):
         * DO NOT include any text outside the JSON object (no introductory phrases like "Here is the JSON," no concluding remarks).
         * Here is an example of the desired JSON structure:
             ```json
-            {
+            {{
               "primary": "#4A90E2",
               "secondary": "#F5A623",
               "text_light": "#FFFFFF",
               "text_dark": "#333333",
               "background": "#F8F9FA"
-            }
+            }}
             ```
         
         Begin your Chain of Thought and then output the final JSON.
@@ -70,42 +72,15 @@ class DesignAgent(BaseAgent):
         full_prompt = self._generate_prompt(task_description)
 
         try:
-            # Simulate API call with a robust prompt
-            # In a real scenario, this would involve web scraping/color analysis
-            # response = self.model.generate_content(full_prompt)
-            # generated_json_text = response.text
-            # parsed_palette = json.loads(generated_json_text)
-
-            # For demonstration, use a placeholder that adheres to the new prompt's structure
-            # A real response would be generated by Gemini based on the URL analysis
-            simulated_response = """
-            **Chain of Thought:**
-            1.  **Understand Website Purpose:** The website `uplas.me` (assuming this is the backend for `uplas.me`) seems to be a modern, tech-focused platform, likely for services or portfolios, given its general nature. It aims for a clean, professional, and slightly futuristic impression.
-            2.  **Identify Primary Color:** Based on common tech website aesthetics, a strong, vibrant blue or purple is often used. Let's assume a deep blue.
-            3.  **Identify Secondary Color:** A complementary orange or pink could be used for accents.
-            4.  **Identify Light Text Color:** For dark backgrounds, white or off-white is standard.
-            5.  **Identify Dark Text Color:** For light backgrounds, a dark gray or black is typical.
-            6.  **Identify Background Color:** A subtle, dark background like a near-black or deep grey is common for modern tech UIs.
-
-            **Final JSON Output:**
-            ```json
-            {
-              "primary": "#007BFF",
-              "secondary": "#FF6B81",
-              "text_light": "#F0F0F0",
-              "text_dark": "#2C3E50",
-              "background": "#1A1A2E"
-            }
-            ```
-            """
-            
-            # Extract the JSON block from the simulated response
-            import re
-            json_match = re.search(r'```json\n({.*?})\n```', simulated_response, re.DOTALL)
-            if json_match:
-                parsed_palette = json.loads(json_match.group(1))
-            else:
-                raise ValueError("Could not extract JSON from simulated response.")
+            # The palette is read from the site's CSS and images; the model is only
+            # consulted (with the locally found candidates) when that is inconclusive.
+            parsed_palette = resolve_brand_palette(
+                get_site_extract(project),
+                ask_model=lambda palette_prompt, generation_config: self.generate(
+                    f"{full_prompt}\n\n{palette_prompt}", project_id=project_id, generation_config=generation_config,
+                ).text,
+                fetch_image=fetch_bytes,
+            )
 
             with transaction.atomic():
                 project = Project.objects.select_for_update().get(id=project_id)
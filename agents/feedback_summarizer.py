@@ -0,0 +1,201 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from apps.surveys.models import UserFeedback, AppRating, FeedbackSummary, FeedbackDigest
+
+# Token budget for the feedback text packed into a single map prompt.
+BATCH_TOKEN_BUDGET = 6000
+# A single entry never takes more than this share of a batch.
+MAX_ENTRY_TOKENS = 1000
+# Number of same-level summaries merged into one summary of the next level.
+REDUCE_FAN_IN = 8
+# A partially filled batch is only summarized once its oldest entry is this old.
+PARTIAL_BATCH_MAX_WAIT = timedelta(hours=1)
+
+MAP_PROMPT = """
+Summarize the following user feedback for the mobile app "{app_name}".
+Group it into recurring themes, note the overall sentiment, and list concrete bug reports and feature requests.
+Keep the summary under 200 words. Return plain text only.
+
+Feedback:
+{entries}
+"""
+
+REDUCE_PROMPT = """
+Merge the following summaries of user feedback for the mobile app "{app_name}" into a single summary.
+Combine overlapping themes, keep the most frequent issues first, and preserve concrete bug reports and feature requests.
+Keep the merged summary under 300 words. Return plain text only.
+
+Summaries:
+{summaries}
+"""
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token) used for batch packing.
+    """
+    return len(text) // 4 + 1
+
+
+def _pending_entries(project):
+    """
+    Yields (model, entry, text) for every feedback entry and rating comment
+    not yet covered by a level-0 summary, oldest first.
+    """
+    feedback = (
+        UserFeedback.objects.filter(project=project, summary_batch__isnull=True)
+        .order_by('created_at', 'id')
+        .only('id', 'feedback_text', 'created_at')
+    )
+    ratings = (
+        AppRating.objects.filter(project=project, summary_batch__isnull=True)
+        .exclude(comment__isnull=True).exclude(comment='')
+        .order_by('created_at', 'id')
+        .only('id', 'rating', 'comment', 'created_at')
+    )
+    entries = [(UserFeedback, entry, entry.feedback_text) for entry in feedback.iterator()]
+    entries += [(AppRating, entry, f"[{entry.rating}/5 stars] {entry.comment}") for entry in ratings.iterator()]
+    entries.sort(key=lambda item: item[1].created_at)
+    return entries
+
+
+def build_batches(entries, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Greedily packs entries into batches that fit within the token budget.
+
+    Returns:
+        A list of (batch, tokens) tuples where batch is a list of entries.
+    """
+    batches = []
+    batch, tokens = [], 0
+    for model, entry, text in entries:
+        text = text[:MAX_ENTRY_TOKENS * 4]
+        cost = estimate_tokens(text)
+        if batch and tokens + cost > token_budget:
+            batches.append((batch, tokens))
+            batch, tokens = [], 0
+        batch.append((model, entry, text))
+        tokens += cost
+    if batch:
+        batches.append((batch, tokens))
+    return batches
+
+
+def _batch_is_ready(batch, tokens, token_budget, now):
+    oldest = batch[0][1].created_at
+    return tokens >= token_budget // 2 or now - oldest >= PARTIAL_BATCH_MAX_WAIT
+
+
+def summarize_new_batches(project, summarize, force=False, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Map step: summarizes each new batch of feedback exactly once.
+
+    Args:
+        project: The project whose new feedback should be summarized.
+        summarize (callable): Takes a prompt and returns the model's text.
+        force (bool): Also summarize a trailing batch that is not yet full.
+
+    Returns:
+        The number of level-0 summaries created.
+    """
+    now = timezone.now()
+    created = 0
+    for batch, tokens in build_batches(_pending_entries(project), token_budget):
+        if not force and not _batch_is_ready(batch, tokens, token_budget, now):
+            # Only the trailing batch can be under-filled; wait for more feedback.
+            break
+        prompt = MAP_PROMPT.format(
+            app_name=project.name,
+            entries='\n'.join(f"- {text}" for _, _, text in batch),
+        )
+        summary_text = summarize(prompt)
+        with transaction.atomic():
+            summary = FeedbackSummary.objects.create(
+                project=project, level=0, summary=summary_text,
+                item_count=len(batch), token_estimate=tokens,
+            )
+            for model in (UserFeedback, AppRating):
+                ids = [entry.id for entry_model, entry, _ in batch if entry_model is model]
+                if ids:
+                    model.objects.filter(id__in=ids).update(summary_batch=summary)
+        created += 1
+    return created
+
+
+def reduce_summaries(project, summarize, fan_in=REDUCE_FAN_IN):
+    """
+    Reduce step: whenever a level holds `fan_in` unmerged summaries they are
+    merged into one summary of the next level, like carries in a counter.
+    Each summary is therefore merged at most O(log n) times.
+
+    Returns:
+        The number of merged summaries created.
+    """
+    created = 0
+    level = 0
+    while True:
+        open_summaries = list(
+            FeedbackSummary.objects.filter(project=project, level=level, merged_into__isnull=True)
+            .order_by('created_at', 'id')
+        )
+        if not open_summaries:
+            if not FeedbackSummary.objects.filter(project=project, level__gt=level).exists():
+                return created
+            level += 1
+            continue
+        while len(open_summaries) >= fan_in:
+            group, open_summaries = open_summaries[:fan_in], open_summaries[fan_in:]
+            merged_text = summarize(REDUCE_PROMPT.format(
+                app_name=project.name,
+                summaries='\n\n'.join(f"Summary {i + 1}:\n{s.summary}" for i, s in enumerate(group)),
+            ))
+            with transaction.atomic():
+                merged = FeedbackSummary.objects.create(
+                    project=project, level=level + 1, summary=merged_text,
+                    item_count=sum(s.item_count for s in group),
+                    token_estimate=estimate_tokens(merged_text),
+                )
+                FeedbackSummary.objects.filter(id__in=[s.id for s in group]).update(merged_into=merged)
+            created += 1
+        level += 1
+
+
+def refresh_digest(project, summarize):
+    """
+    Rebuilds the project's rolling digest from the unmerged summaries, which
+    number at most (fan_in - 1) per level.
+    """
+    roots = list(
+        FeedbackSummary.objects.filter(project=project, merged_into__isnull=True)
+        .order_by('-level', 'created_at')
+    )
+    digest, _ = FeedbackDigest.objects.get_or_create(project=project)
+    if not roots:
+        return digest
+    if len(roots) == 1:
+        digest.summary = roots[0].summary
+    else:
+        digest.summary = summarize(REDUCE_PROMPT.format(
+            app_name=project.name,
+            summaries='\n\n'.join(f"Summary {i + 1}:\n{s.summary}" for i, s in enumerate(roots)),
+        ))
+    digest.item_count = sum(s.item_count for s in roots)
+    digest.save()
+    return digest
+
+
+def update_feedback_digest(project, summarize, force=False, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Runs one incremental map-reduce pass. Only the feedback that arrived since
+    the last pass is sent to the model.
+
+    Returns:
+        A dict describing the work done.
+    """
+    mapped = summarize_new_batches(project, summarize, force=force, token_budget=token_budget)
+    if not mapped:
+        return {'batches': 0, 'merges': 0, 'digest_updated': False}
+    merges = reduce_summaries(project, summarize)
+    refresh_digest(project, summarize)
+    return {'batches': mapped, 'merges': merges, 'digest_updated': True}
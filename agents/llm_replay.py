@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from django.conf import settings
+from .admission import model_key
+from .feedback_summarizer import estimate_tokens
+
+# live: call the provider. record: call it and keep every prompt/response pair.
+# replay: answer from the recorded pairs only. fake: answer with FakeModel.
+MODES = ('live', 'record', 'replay', 'fake')
+
+
+class FixtureMissing(LookupError):
+    pass
+
+
+def prompt_text(contents):
+    return contents if isinstance(contents, str) else json.dumps(contents, sort_keys=True, default=str)
+
+
+def fixture_key(model_name, contents):
+    payload = json.dumps([model_key(model_name), prompt_text(contents)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def model_response(text, total_tokens=None):
+    """
+    A response with the attributes callers read from a provider response.
+    """
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(total_token_count=total_tokens))
+
+
+class FixtureStore:
+    """
+    Prompt/response pairs in a gzipped JSON Lines file. Recording appends a
+    gzip member per pair, so an interrupted run keeps what it recorded.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                with gzip.open(self.path, 'rt', encoding='utf-8') as fixtures:
+                    for line in fixtures:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry['key']] = entry
+        return self._entries
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def add(self, model_name, contents, text, total_tokens=None):
+        entry = {
+            'key': fixture_key(model_name, contents),
+            'model': model_key(model_name),
+            'prompt': prompt_text(contents),
+            'text': text,
+            'total_tokens': total_tokens,
+        }
+        with self._lock:
+            self._load()[entry['key']] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, 'at', encoding='utf-8') as fixtures:
+                fixtures.write(json.dumps(entry) + '\n')
+        return entry
+
+
+class RecordingModel:
+    def __init__(self, model, store):
+        self.model = model
+        self.model_name = model.model_name
+        self.store = store
+
+    def generate_content(self, contents, **kwargs):
+        response = self.model.generate_content(contents, **kwargs)
+        usage = getattr(response, 'usage_metadata', None)
+        self.store.add(self.model_name, contents, response.text, getattr(usage, 'total_token_count', None))
+        return response
+
+
+class ReplayModel:
+    def __init__(self, model_name, store):
+        self.model_name = model_name
+        self.store = store
+
+    def generate_content(self, contents, **kwargs):
+        entry = self.store.get(fixture_key(self.model_name, contents))
+        if entry is None:
+            raise FixtureMissing(f"No recorded {model_key(self.model_name)} response for this prompt in {self.store.path}.")
+        return model_response(entry['text'], entry.get('total_tokens'))
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    Log-normal latency with the given median and 95th percentile, in seconds.
+    """
+    p50: float
+    p95: float
+
+    def sample(self, rng):
+        if self.p95 <= self.p50:
+            return self.p50
+        sigma = math.log(self.p95 / self.p50) / 1.645
+        return rng.lognormvariate(math.log(self.p50), sigma)
+
+
+def _code_files(platform):
+    if platform == 'IOS':
+        return {
+            'Sources/ApplaudeApp.swift': 'import SwiftUI\n\n@main\nstruct ApplaudeApp: App {\n    var body: some Scene { WindowGroup { HomeView() } }\n}\n',
+            'Sources/Views/HomeView.swift': 'import SwiftUI\n\nstruct HomeView: View {\n    var body: some View { Text("Home") }\n}\n',
+        }
+    return {
+        'app/src/main/java/com/applaude/app/MainActivity.kt': 'package com.applaude.app\n\nclass MainActivity\n',
+        'app/src/main/java/com/applaude/app/ui/screens/HomeScreen.kt': 'package com.applaude.app.ui.screens\n\nfun HomeScreen() {}\n',
+    }
+
+
+def canned_response(contents):
+    """
+    A plausible answer for each kind of prompt the agents send.
+    """
+    prompt = prompt_text(contents)
+    scope = re.search(r'Target platform: (ANDROID|IOS)', prompt)
+    if scope:
+        return '\n\n'.join(f"```\n// File: {path}\n{code}```" for path, code in _code_files(scope.group(1)).items())
+    if 'text_light' in prompt and 'background' in prompt:
+        return json.dumps({
+            'primary': '#1A73E8', 'secondary': '#F9AB00', 'text_light': '#FFFFFF',
+            'text_dark': '#202124', 'background': '#F8F9FA',
+        })
+    if 'Persona' in prompt:
+        return "## Persona: Benchmark Ben\n\n**Goals:** Get things done quickly on mobile.\n\n**Pain points:** Slow, cluttered websites."
+    return "Summary: users are broadly satisfied and ask for faster load times."
+
+
+class FakeModel:
+    """
+    Deterministic stand-in for a GenerativeModel: the same prompt gets the
+    same answer, after a latency drawn from `latency`. Repeats of a prompt
+    (such as hedged requests) draw new latencies.
+    """
+    _occurrences = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name, latency=LatencyDistribution(0, 0), respond=canned_response, seed=0):
+        self.model_name = model_name
+        self.latency = latency
+        self.respond = respond
+        self.seed = seed
+
+    def generate_content(self, contents, **kwargs):
+        key = fixture_key(self.model_name, contents)
+        with self._lock:
+            occurrence = self._occurrences[key] = self._occurrences.get(key, 0) + 1
+        time.sleep(self.latency.sample(random.Random(f"{self.seed}:{key}:{occurrence}")))
+        text = self.respond(contents)
+        return model_response(text, estimate_tokens(prompt_text(contents)) + estimate_tokens(text))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_fixture_store(path=None):
+    path = str(path or settings.LLM_FIXTURE_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FixtureStore(path)
+        return _stores[path]
+
+
+def prepare_model(build_model, model_name):
+    """
+    Returns the model a call should use under settings.LLM_MODE. In replay
+    and fake modes nothing is built, so no provider is contacted.
+    """
+    mode = settings.LLM_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM_MODE '{mode}'; expected one of {', '.join(MODES)}.")
+    if mode == 'fake':
+        return FakeModel(model_name, latency=LatencyDistribution(*settings.LLM_FAKE_LATENCY))
+    if mode == 'replay':
+        return ReplayModel(model_name, get_fixture_store())
+    model = build_model(model_name)
+    if mode == 'record':
+        return RecordingModel(model, get_fixture_store())
+    return model
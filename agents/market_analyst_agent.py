@@ -3,20 +3,20 @@ from .base_agent import BaseAgent
 from .prompts.super_prompts import MARKET_ANALYST_PERSONA, MARKET_ANALYST_GOAL
 from apps.projects.models import Project
 from django.db import transaction
-import google.generativeai as genai
 import os
 
 class MarketAnalystAgent(BaseAgent):
     """
     Analyzes a user's website to generate a detailed user persona.
     """
+    route = 'market_analysis'
+
     def __init__(self):
         super().__init__(
             agent_name="Market Analyst",
             agent_persona=MARKET_ANALYST_PERSONA,
             goal=MARKET_ANALYST_GOAL
         )
-        self.model = genai.GenerativeModel('gemini-1.5-pro') # Using a more capable model for prompt engineering
 
     def execute(self, project_id: int):
         """
@@ -60,7 +60,7 @@ class MarketAnalystAgent(BaseAgent):
             # In a final production version, this would be an actual API call,
             # potentially integrated with web scraping tools or simulated data inputs
             # based on real-world analysis.
-            # response = self.model.generate_content(full_prompt)
+            # response = self.generate(full_prompt, project_id=project_id)
             # persona_document = response.text
             
             # For now, we use a more detailed placeholder response that reflects
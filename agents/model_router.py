@@ -0,0 +1,200 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+import google.generativeai as genai
+from django.core.cache import cache
+from .admission import ADMISSION_MAX_WAIT, generate_with_admission, model_key
+from .llm_replay import prepare_model
+from .telemetry import record_model_usage, span
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    How one kind of call picks its model.
+
+    models: tiers in order of preference; later ones are faster or cheaper
+        and only used when the earlier ones time out or fail.
+    timeout: seconds each tier gets, hedge included.
+    hedge_delay: seconds before a duplicate request is sent, used until a
+        model has enough latency samples to hedge at its p95.
+    """
+    name: str
+    models: tuple
+    timeout: float
+    hedge_delay: float
+    hedge: bool = True
+
+
+ROUTES = {route.name: route for route in [
+    Route('market_analysis', ('gemini-1.5-pro', 'gemini-1.5-flash'), timeout=90, hedge_delay=30),
+    Route('design', ('gemini-1.5-flash', 'gemini-1.5-pro'), timeout=30, hedge_delay=8),
+    # Module responses are long, and a hedge would double the largest calls we make.
+    Route('code_generation', ('gemini-1.5-pro', 'gemini-1.5-flash'), timeout=240, hedge_delay=120, hedge=False),
+    Route('summarize', ('gemini-1.5-flash',), timeout=60, hedge_delay=15),
+    Route('feedback', ('gemini-1.5-flash', 'gemini-1.5-pro'), timeout=60, hedge_delay=15),
+    Route('default', ('gemini-1.5-pro', 'gemini-1.5-flash'), timeout=90, hedge_delay=30),
+]}
+
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+LATENCY_TTL = 60 * 60 * 24
+MIN_HEDGE_DELAY = 1
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='model-router')
+
+
+class ModelRouteExhausted(RuntimeError):
+    pass
+
+
+def get_route(route):
+    if isinstance(route, Route):
+        return route
+    return ROUTES.get(route, ROUTES['default'])
+
+
+def _latency_key(model_name):
+    return f"model-latency:{model_key(model_name)}"
+
+
+def record_latency(model_name, seconds):
+    """
+    Keeps the most recent latencies of a model for its p95.
+    """
+    key = _latency_key(model_name)
+    samples = cache.get(key) or []
+    samples = (samples + [round(seconds, 3)])[-LATENCY_SAMPLES:]
+    cache.set(key, samples, timeout=LATENCY_TTL)
+
+
+def latency_percentile(model_name, percentile=0.95):
+    """
+    Returns the model's latency at `percentile`, or None without enough samples.
+    """
+    samples = sorted(cache.get(_latency_key(model_name)) or [])
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return None
+    return samples[int(percentile * (len(samples) - 1))]
+
+
+def hedge_delay(route, model_name):
+    p95 = latency_percentile(model_name)
+    delay = route.hedge_delay if p95 is None else p95
+    return min(max(delay, MIN_HEDGE_DELAY), route.timeout / 2)
+
+
+def _call(build_model, model_name, contents, project_id, estimated_tokens, kwargs, attributes, admission):
+    """
+    Makes one routed request. Its latency is timed from admission, so time
+    spent queueing for capacity does not inflate the model's p95. The
+    request times out at the tier's deadline, so an abandoned call frees
+    its executor thread instead of holding it until the provider answers.
+    """
+    sent = []
+
+    def admitted():
+        sent.append(time.monotonic())
+        if admission.get('admitted'):
+            admission['admitted'].set()
+
+    with span('llm.call', model=model_key(model_name), project_id=project_id, **attributes):
+        response = generate_with_admission(
+            prepare_model(build_model, model_name), contents, project_id=project_id, estimated_tokens=estimated_tokens,
+            max_wait=admission['max_wait'], cancelled=admission['cancelled'], on_admitted=admitted,
+            deadline=admission['deadline'], **kwargs,
+        )
+        record_model_usage(model_key(model_name), contents, response)
+    return response, time.monotonic() - sent[0]
+
+
+def _first_result(futures, timeout):
+    """
+    Waits for the first call that succeeds. Returns (label, response,
+    latency), or raises the last error (TimeoutError if none finished).
+    """
+    deadline = time.monotonic() + timeout
+    pending, error = set(futures), None
+    while pending:
+        done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            try:
+                response, latency = future.result()
+                return futures[future], response, latency
+            except Exception as e:
+                error = e
+    raise error or TimeoutError("No response before the deadline.")
+
+
+def route_generate(route, contents, project_id=None, estimated_tokens=None, build_model=genai.GenerativeModel, **kwargs):
+    """
+    Sends a model call along a route. Each tier gets one request, plus a
+    hedged duplicate if the first has not answered by the model's p95
+    latency; the first response wins. A tier that times out or fails hands
+    over to the next one.
+
+    The hedge is only sent once the primary has been admitted, and only if
+    there is capacity for it right away. Requests a tier no longer needs
+    are dropped before they reach the model; one already sent times out at
+    the tier's deadline and its response is discarded.
+
+    Args:
+        route: A Route or the name of one in ROUTES.
+        build_model (callable): Returns a model for a model name, e.g. to
+            attach a cached prompt prefix.
+
+    Returns:
+        The winning response.
+    """
+    route = get_route(route)
+    started = time.monotonic()
+    errors = []
+    with span('llm.route', route=route.name, project_id=project_id) as route_span:
+        for tier, model_name in enumerate(route.models):
+            tier_deadline = time.monotonic() + route.timeout
+            cancelled = threading.Event()
+
+            def call(label, max_wait=ADMISSION_MAX_WAIT, admitted=None):
+                # Each request runs in its own copy of the caller's context, so its span nests under this route.
+                return _executor.submit(
+                    contextvars.copy_context().run, _call, build_model, model_name, contents, project_id,
+                    estimated_tokens, kwargs, {'route': route.name, 'tier': tier, 'request': label},
+                    {'max_wait': max_wait, 'cancelled': cancelled, 'admitted': admitted, 'deadline': tier_deadline},
+                )
+
+            admitted = threading.Event()
+            primary = call('primary', admitted=admitted)
+            futures = {primary: 'primary'}
+            try:
+                if route.hedge:
+                    # A primary still queued for capacity is not slow, and a
+                    # duplicate would only queue behind it.
+                    primary.add_done_callback(lambda future: admitted.set())
+                    admitted.wait(timeout=max(0, tier_deadline - time.monotonic()))
+                    if not primary.done():
+                        delay = min(hedge_delay(route, model_name), max(0, tier_deadline - time.monotonic()))
+                        done, _ = wait(futures, timeout=delay)
+                        if not done and time.monotonic() < tier_deadline:
+                            futures[call('hedge', max_wait=0)] = 'hedge'
+                label, response, latency = _first_result(futures, tier_deadline - time.monotonic())
+            except Exception as e:
+                print(f"Model route {route.name}: {model_key(model_name)} failed after {time.monotonic() - started:.1f}s ({e!r}).")
+                errors.append(f"{model_key(model_name)}: {e!r}")
+                continue
+            finally:
+                cancelled.set()
+                for future in futures:
+                    future.cancel()
+            record_latency(model_name, latency)
+            route_span.set(model=model_key(model_name), tier=tier, hedged=len(futures) > 1, winner=label)
+            print(
+                f"Model route {route.name}: {model_key(model_name)} ({label}"
+                f"{', fallback tier ' + str(tier) if tier else ''}) answered in {latency:.1f}s, "
+                f"{time.monotonic() - started:.1f}s in total."
+            )
+            return response
+        raise ModelRouteExhausted(f"Every model on route {route.name} failed: {'; '.join(errors)}")
@@ -0,0 +1,405 @@
+import colorsys
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from PIL import Image
+from .structured_output import json_generation_config, parse_structured
+
+PALETTE_KEYS = ('primary', 'secondary', 'text_light', 'text_dark', 'background')
+HEX_PATTERN = re.compile(r'^#[0-9A-F]{6}$')
+
+# What the model is asked for; validate_palette normalizes short and lower-case hex.
+PALETTE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        key: {'type': 'string', 'description': 'A #RRGGBB hex color.', 'pattern': r'^#([0-9A-Fa-f]{3}|[0-9A-Fa-f]{6})$'}
+        for key in PALETTE_KEYS
+    },
+    'required': list(PALETTE_KEYS),
+    'additionalProperties': False,
+}
+
+# Below this confidence the palette engine defers to the model.
+MIN_CONFIDENCE = 0.6
+IMAGE_SAMPLE_SIZE = 48
+KMEANS_CLUSTERS = 5
+KMEANS_ITERATIONS = 12
+
+# Custom property names that reveal a color's role, e.g. `--brand-primary`. Names are
+# matched word by word, so `--bs-body-color` matches 'body-color' but `--darkmode` is not 'dark'.
+ROLE_HINTS = {
+    'primary': ('primary', 'brand', 'main'),
+    'secondary': ('secondary', 'accent', 'highlight'),
+    'background': ('background', 'bg', 'surface'),
+    'text_dark': ('text', 'foreground', 'fg', 'dark', 'body-color'),
+    'text_light': ('light', 'inverse', 'on-primary', 'white'),
+}
+
+# Other words in a matching name that rule it out, e.g. `--primary-bg` is not the primary color,
+# `--bs-body-fg` is not the background and `--primary-dark` is a shade of the primary, not text.
+BRAND_WORDS = ('primary', 'secondary', 'brand', 'main', 'accent', 'highlight')
+ROLE_EXCLUSIONS = {
+    'primary': ('bg', 'background', 'text'),
+    'secondary': ('bg', 'background', 'text'),
+    'background': ('text', 'fg', 'foreground'),
+    'text_dark': ('bg', 'background', 'light', 'inverse', 'white') + BRAND_WORDS,
+    'text_light': ('bg', 'background', 'dark') + BRAND_WORDS,
+}
+
+FALLBACKS = {
+    'text_light': '#FFFFFF',
+    'text_dark': '#212121',
+    'background': '#FFFFFF',
+}
+
+
+# --- Color math ---
+
+def hex_to_rgb(color):
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def rgb_to_hex(rgb):
+    return '#' + ''.join(f'{max(0, min(255, round(channel))):02X}' for channel in rgb)
+
+
+def relative_luminance(color):
+    """
+    WCAG 2.x relative luminance of a hex color.
+    """
+    def channel(value):
+        value /= 255
+        return value / 12.92 if value <= 0.03928 else ((value + 0.055) / 1.055) ** 2.4
+    red, green, blue = (channel(value) for value in hex_to_rgb(color))
+    return 0.2126 * red + 0.7152 * green + 0.0722 * blue
+
+
+def contrast_ratio(first, second):
+    lighter, darker = sorted((relative_luminance(first), relative_luminance(second)), reverse=True)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _hls(color):
+    return colorsys.rgb_to_hls(*(value / 255 for value in hex_to_rgb(color)))
+
+
+def saturation(color):
+    _, lightness, sat = _hls(color)
+    # Near-black and near-white colors read as neutral whatever their saturation.
+    return sat if 0.08 < lightness < 0.94 else 0.0
+
+
+def hue_distance(first, second):
+    distance = abs(_hls(first)[0] - _hls(second)[0])
+    return min(distance, 1 - distance) * 360
+
+
+def shift_lightness(color, amount):
+    hue, lightness, sat = _hls(color)
+    red, green, blue = colorsys.hls_to_rgb(hue, min(1, max(0, lightness + amount)), sat)
+    return rgb_to_hex((red * 255, green * 255, blue * 255))
+
+
+# --- Image quantization ---
+
+def kmeans_colors(weighted_pixels, clusters=KMEANS_CLUSTERS, iterations=KMEANS_ITERATIONS):
+    """
+    Weighted k-means over (rgb, count) pairs.
+
+    Pixels are expected to be pre-bucketed, so this runs over a few hundred
+    distinct colors rather than every pixel. Initialisation is deterministic
+    (most frequent color, then farthest-point), so results are reproducible.
+
+    Returns:
+        A list of (hex_color, share) tuples, largest cluster first.
+    """
+    weighted_pixels = [(rgb, count) for rgb, count in weighted_pixels if count > 0]
+    if not weighted_pixels:
+        return []
+    total = sum(count for _, count in weighted_pixels)
+
+    def distance(a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+    centers = [max(weighted_pixels, key=lambda item: item[1])[0]]
+    while len(centers) < min(clusters, len(weighted_pixels)):
+        centers.append(max(
+            weighted_pixels,
+            key=lambda item: item[1] * min(distance(item[0], center) for center in centers),
+        )[0])
+
+    for _ in range(iterations):
+        sums = [[0.0, 0.0, 0.0, 0] for _ in centers]
+        for rgb, count in weighted_pixels:
+            nearest = min(range(len(centers)), key=lambda index: distance(rgb, centers[index]))
+            bucket = sums[nearest]
+            bucket[0] += rgb[0] * count
+            bucket[1] += rgb[1] * count
+            bucket[2] += rgb[2] * count
+            bucket[3] += count
+        new_centers = [
+            (bucket[0] / bucket[3], bucket[1] / bucket[3], bucket[2] / bucket[3]) if bucket[3] else center
+            for bucket, center in zip(sums, centers)
+        ]
+        if new_centers == centers:
+            break
+        centers = new_centers
+
+    weights = [bucket[3] for bucket in sums]
+    ranked = sorted(zip(centers, weights), key=lambda item: item[1], reverse=True)
+    return [(rgb_to_hex(center), weight / total) for center, weight in ranked if weight]
+
+
+def image_colors(image_bytes):
+    """
+    Dominant colors of an image, or [] when the image cannot be decoded.
+    Transparent pixels are ignored.
+    """
+    if not image_bytes:
+        return []
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.thumbnail((IMAGE_SAMPLE_SIZE, IMAGE_SAMPLE_SIZE))
+        pixels = image.convert('RGBA').getdata()
+    except Exception as e:
+        print(f"Could not decode image for palette extraction: {e}")
+        return []
+
+    buckets = {}
+    for red, green, blue, alpha in pixels:
+        if alpha < 128:
+            continue
+        # 5 bits per channel keeps the clustering input small.
+        key = (red & 0xF8 | 4, green & 0xF8 | 4, blue & 0xF8 | 4)
+        buckets[key] = buckets.get(key, 0) + 1
+    return kmeans_colors(buckets.items())
+
+
+# --- Role assignment ---
+
+@dataclass
+class PaletteResult:
+    palette: dict
+    confidence: float
+    sources: dict = field(default_factory=dict)
+    candidates: list = field(default_factory=list)
+
+    @property
+    def confident(self):
+        return self.confidence >= MIN_CONFIDENCE
+
+
+def _hinted(variables, role):
+    for name, color in variables.items():
+        words = re.findall(r'[a-z0-9]+', name.lower())
+        for hint in ROLE_HINTS[role]:
+            hint_words = hint.split('-')
+            starts = [i for i in range(len(words)) if words[i:i + len(hint_words)] == hint_words]
+            if not starts:
+                continue
+            # The words of the hint itself, e.g. 'primary' in `--on-primary`, never rule it out.
+            others = words[:starts[0]] + words[starts[0] + len(hint_words):]
+            if not any(word in others for word in ROLE_EXCLUSIONS[role]):
+                return color.upper()
+    return None
+
+
+def _weighted_candidates(site_extract, extra_colors=()):
+    """
+    Merges CSS frequencies, the theme color and image clusters into one
+    list of (hex, weight) sorted by weight.
+    """
+    weights = {}
+    css_colors = site_extract.get('css_colors') or []
+    total = sum(entry['count'] for entry in css_colors) or 1
+    for entry in css_colors:
+        color = entry['color'].upper()
+        weights[color] = weights.get(color, 0) + entry['count'] / total
+    if site_extract.get('theme_color'):
+        color = site_extract['theme_color'].upper()
+        weights[color] = weights.get(color, 0) + 0.5
+    for color, share in extra_colors:
+        weights[color] = weights.get(color, 0) + share * 0.5
+    return sorted(weights.items(), key=lambda item: item[1], reverse=True)
+
+
+def build_palette(site_extract, extra_colors=()):
+    """
+    Assigns palette roles from the site's CSS and (optionally) image colors.
+
+    Args:
+        site_extract (dict): The extract produced by the site crawler.
+        extra_colors (list): (hex, share) pairs, e.g. from image_colors().
+
+    Returns:
+        A PaletteResult whose confidence reflects how directly each role was observed.
+    """
+    site_extract = site_extract or {}
+    variables = site_extract.get('css_variables') or {}
+    candidates = _weighted_candidates(site_extract, extra_colors)
+    palette, sources, scores = {}, {}, {}
+
+    def assign(role, color, source, score):
+        palette[role] = color
+        sources[role] = source
+        scores[role] = score
+
+    # Brand colors: explicit variables, then the theme color, then the most used saturated color.
+    saturated = [color for color, _ in candidates if saturation(color) >= 0.25]
+    hinted = _hinted(variables, 'primary')
+    if hinted:
+        assign('primary', hinted, 'css_variable', 1.0)
+    elif site_extract.get('theme_color') and saturation(site_extract['theme_color']) >= 0.25:
+        assign('primary', site_extract['theme_color'].upper(), 'theme_color', 0.9)
+    elif saturated:
+        assign('primary', saturated[0], 'frequency', 0.7)
+
+    primary = palette.get('primary')
+    hinted = _hinted(variables, 'secondary')
+    distinct = [color for color in saturated if primary and hue_distance(color, primary) >= 30]
+    if hinted and hinted != primary:
+        assign('secondary', hinted, 'css_variable', 1.0)
+    elif distinct:
+        assign('secondary', distinct[0], 'frequency', 0.7)
+    elif primary:
+        assign('secondary', shift_lightness(primary, -0.15 if relative_luminance(primary) > 0.3 else 0.2), 'derived', 0.4)
+
+    # Background: the most used neutral, preferring light ones.
+    neutrals = [color for color, _ in candidates if saturation(color) < 0.25]
+    hinted = _hinted(variables, 'background')
+    light_neutrals = [color for color in neutrals if relative_luminance(color) > 0.8]
+    if hinted:
+        assign('background', hinted, 'css_variable', 1.0)
+    elif light_neutrals:
+        assign('background', light_neutrals[0], 'frequency', 0.8)
+    elif neutrals:
+        assign('background', neutrals[0], 'frequency', 0.6)
+    else:
+        assign('background', FALLBACKS['background'], 'fallback', 0.5)
+
+    background = palette['background']
+    dark_options = [color for color in neutrals if relative_luminance(color) < 0.2 and contrast_ratio(color, '#FFFFFF') >= 4.5]
+    hinted = _hinted(variables, 'text_dark')
+    if hinted and contrast_ratio(hinted, '#FFFFFF') >= 4.5:
+        assign('text_dark', hinted, 'css_variable', 1.0)
+    elif dark_options:
+        assign('text_dark', dark_options[0], 'frequency', 0.8)
+    else:
+        assign('text_dark', FALLBACKS['text_dark'], 'fallback', 0.7)
+
+    light_options = [color for color in neutrals if relative_luminance(color) > 0.85]
+    hinted = _hinted(variables, 'text_light')
+    if hinted and relative_luminance(hinted) > 0.6:
+        assign('text_light', hinted, 'css_variable', 1.0)
+    elif light_options:
+        assign('text_light', light_options[0], 'frequency', 0.8)
+    else:
+        assign('text_light', FALLBACKS['text_light'], 'fallback', 0.7)
+
+    # Contrast rules: body text must be readable on the background.
+    text_role = 'text_dark' if relative_luminance(background) > 0.18 else 'text_light'
+    if contrast_ratio(palette[text_role], background) < 4.5:
+        assign(text_role, '#000000' if text_role == 'text_dark' else '#FFFFFF', 'contrast_fix', scores[text_role] * 0.8)
+
+    if 'primary' not in palette:
+        return PaletteResult(palette={}, confidence=0.0, sources=sources, candidates=[c for c, _ in candidates])
+
+    # The brand colors carry the identity, so they dominate the confidence.
+    confidence = 0.4 * scores['primary'] + 0.3 * scores['secondary'] + 0.1 * (
+        scores['background'] + scores['text_dark'] + scores['text_light']
+    )
+    # Dark text that disappears into the background means a role was misread.
+    if contrast_ratio(palette['text_dark'], background) < 4.5:
+        confidence = min(confidence, MIN_CONFIDENCE / 2)
+    return PaletteResult(
+        palette=validate_palette(palette),
+        confidence=round(confidence, 3),
+        sources=sources,
+        candidates=[color for color, _ in candidates],
+    )
+
+
+# --- Validation ---
+
+def validate_palette(palette):
+    """
+    Checks that a palette has exactly the expected roles with #RRGGBB values.
+
+    Returns:
+        A normalized copy with upper-case hex values.
+
+    Raises:
+        ValueError: if a role is missing or a value is not a hex color.
+    """
+    if not isinstance(palette, dict):
+        raise ValueError("The palette must be a JSON object.")
+    normalized = {}
+    for key in PALETTE_KEYS:
+        value = palette.get(key)
+        if not isinstance(value, str):
+            raise ValueError(f"The palette is missing '{key}'.")
+        value = value.strip().upper()
+        if re.fullmatch(r'#[0-9A-F]{3}', value):
+            value = '#' + ''.join(char * 2 for char in value[1:])
+        if not HEX_PATTERN.match(value):
+            raise ValueError(f"'{key}' is not a hex color: {value}")
+        normalized[key] = value
+    return normalized
+
+
+def parse_palette_response(response):
+    """
+    Extracts and validates the palette JSON object from a model response
+    (its text, the response, or its streamed chunks).
+    """
+    return validate_palette(parse_structured(response, PALETTE_SCHEMA))
+
+
+def resolve_brand_palette(site_extract, ask_model=None, fetch_image=None):
+    """
+    Returns a validated palette dict, asking the model only when the local
+    engine is not confident.
+
+    Args:
+        site_extract (dict): The extract produced by the site crawler.
+        ask_model (callable): Takes a prompt built from the local candidates and
+            the generation config that constrains the answer to
+            PALETTE_SCHEMA, and returns the model's text. Optional.
+        fetch_image (callable): Takes an image URL and returns its bytes. Images
+            are only downloaded when the CSS alone is inconclusive.
+    """
+    result = build_palette(site_extract)
+    if not result.confident and fetch_image and site_extract:
+        image_urls = [site_extract.get('logo_url')] + list(site_extract.get('image_urls') or [])[:2]
+        extra = []
+        for url in filter(None, image_urls):
+            extra.extend(image_colors(fetch_image(url)))
+        if extra:
+            result = build_palette(site_extract, extra)
+    if result.confident or ask_model is None:
+        if not result.palette:
+            raise ValueError("No brand colors could be identified.")
+        return result.palette
+
+    prompt = PALETTE_PROMPT.format(
+        candidates=', '.join(result.candidates[:12]) or 'none found',
+        draft=json.dumps(result.palette, separators=(',', ':')) if result.palette else 'none',
+    )
+    try:
+        return parse_palette_response(ask_model(prompt, json_generation_config(PALETTE_SCHEMA)))
+    except ValueError as e:
+        if result.palette:
+            print(f"Model palette rejected ({e}); using the locally extracted palette.")
+            return result.palette
+        raise
+
+
+PALETTE_PROMPT = """
+Choose a mobile app brand palette for a website.
+Colors observed in the site's CSS and images, most used first: {candidates}
+Draft palette from automatic extraction (may be wrong): {draft}
+Return ONLY a JSON object with the keys "primary", "secondary", "text_light", "text_dark", "background",
+each a "#RRGGBB" hex color. "text_dark" must be readable on "background" and "text_light" on "primary".
+"""
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from celery import chain, group, signature
+from django.db import transaction
+from django.utils import timezone
+from apps.projects.models import PipelineRun, StageRun
+from .telemetry import record_span, trace_id_for
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A pipeline stage: a Celery task taking the project ID, and the stages
+    whose output it needs.
+    """
+    name: str
+    task: str
+    depends_on: tuple = ()
+
+
+class Pipeline:
+    """
+    A DAG of stages, declared once and compiled into a Celery canvas per run.
+    Stages on the same level have no dependency on each other and run in
+    parallel.
+    """
+    def __init__(self, name, stages):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name, path=()):
+            if name in done:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}' required by {path[-1] if path else self.name}.")
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline {self.name}: {' -> '.join(path + (name,))}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency, path + (name,))
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def required_stages(self, target):
+        """
+        The target and everything it depends on, in topological order.
+        """
+        needed, pending = set(), [target]
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].depends_on)
+        return [name for name in self.order if name in needed]
+
+    def stages_to_run(self, target, checkpoints):
+        """
+        Stages that must run: those without a checkpoint, and those whose
+        dependencies run again (their checkpoint would be stale).
+        """
+        to_run = []
+        for name in self.required_stages(target):
+            if name not in checkpoints or any(dependency in to_run for dependency in self.stages[name].depends_on):
+                to_run.append(name)
+        return to_run
+
+    def levels(self, names):
+        """
+        Groups stages into levels; each level only depends on earlier ones.
+        """
+        depth = {}
+        for name in self.order:
+            if name in names:
+                depth[name] = 1 + max((depth[dep] for dep in self.stages[name].depends_on if dep in depth), default=-1)
+        levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for name in self.order:
+            if name in depth:
+                levels[depth[name]].append(name)
+        return levels
+
+    def build_canvas(self, run_id, project_id, names, countdown=0):
+        """
+        Compiles the stages of a run into chained levels of parallel groups.
+        Every stage is wrapped in start/complete bookkeeping tasks, and its
+        task reports a final failure to the run.
+        """
+        run_id, project_id = str(run_id), str(project_id)
+        levels = self.levels(names)
+
+        def stage_chain(name):
+            started = signature('agents.tasks.pipeline_stage_started', args=(run_id, name), immutable=True)
+            if countdown and name in levels[0]:
+                started.set(countdown=countdown)
+            task = signature(self.stages[name].task, args=(project_id,), immutable=True)
+            task.link_error(signature('agents.tasks.pipeline_stage_failed', args=(run_id, name)))
+            return chain(
+                started,
+                task,
+                signature('agents.tasks.pipeline_stage_completed', args=(run_id, name)),
+            )
+
+        steps = [stage_chain(level[0]) if len(level) == 1 else group(stage_chain(name) for name in level) for level in levels]
+        steps.append(signature('agents.tasks.pipeline_run_completed', args=(run_id,), immutable=True))
+        return chain(*steps)
+
+
+PROJECT_PIPELINE = Pipeline('project', [
+    Stage('market_analysis', 'agents.tasks.run_market_analysis'),
+    Stage('design', 'agents.tasks.run_design_analysis', depends_on=('market_analysis',)),
+    Stage('code_generation', 'agents.tasks.run_code_generation', depends_on=('design',)),
+    Stage('qa', 'agents.tasks.run_qa_check', depends_on=('code_generation',)),
+    Stage('security_scan', 'agents.tasks.run_security_scan', depends_on=('code_generation',)),
+    Stage('deployment', 'agents.tasks.run_deployment', depends_on=('qa', 'security_scan')),
+])
+
+# Runs before payment, and the full build started once payment succeeds.
+ANALYSIS_TARGET = 'design'
+BUILD_TARGET = 'deployment'
+
+
+def latest_checkpoints(project_ids, pipeline=PROJECT_PIPELINE):
+    """
+    Returns {project_id: {stage: output}} for stages whose most recent
+    execution completed. A later failed or pending execution invalidates an
+    older checkpoint.
+    """
+    latest = {}
+    executions = (
+        StageRun.objects.filter(project_id__in=project_ids, stage__in=pipeline.stages)
+        .exclude(status=StageRun.StageStatus.SKIPPED)
+        .order_by('run__started_at')
+        .values_list('project_id', 'stage', 'status', 'output')
+    )
+    for project_id, stage, status, output in executions:
+        latest[(str(project_id), stage)] = (status, output)
+
+    checkpoints = {}
+    for (project_id, stage), (status, output) in latest.items():
+        if status == StageRun.StageStatus.COMPLETE:
+            checkpoints.setdefault(project_id, {})[stage] = output
+    return checkpoints
+
+
+def start_pipelines(project_ids, target=BUILD_TARGET, resume=True, countdowns=None, pipeline=PROJECT_PIPELINE):
+    """
+    Records a PipelineRun per project and dispatches all of them as one
+    Celery group. With `resume`, stages with a valid checkpoint are skipped,
+    so a failed run picks up at the stage that failed.
+
+    Args:
+        countdowns (list): Optional start delay in seconds per project.
+
+    Returns:
+        The created PipelineRun objects.
+    """
+    project_ids = [str(project_id) for project_id in project_ids]
+    countdowns = countdowns or [0] * len(project_ids)
+    checkpoints = latest_checkpoints(project_ids, pipeline) if resume else {}
+    now = timezone.now()
+
+    runs, stage_runs, canvases = [], [], []
+    with transaction.atomic():
+        for project_id, countdown in zip(project_ids, countdowns):
+            project_checkpoints = checkpoints.get(project_id, {})
+            to_run = pipeline.stages_to_run(target, project_checkpoints)
+            run = PipelineRun(project_id=project_id, pipeline=pipeline.name, target_stage=target)
+            if not to_run:
+                run.status = PipelineRun.RunStatus.COMPLETE
+                run.finished_at = now
+            runs.append(run)
+            for name in pipeline.required_stages(target):
+                skipped = name not in to_run
+                stage_runs.append(StageRun(
+                    run=run, project_id=project_id, stage=name,
+                    status=StageRun.StageStatus.SKIPPED if skipped else StageRun.StageStatus.PENDING,
+                    output=project_checkpoints.get(name) if skipped else None,
+                ))
+            if to_run:
+                canvases.append(pipeline.build_canvas(run.id, project_id, to_run, countdown))
+        PipelineRun.objects.bulk_create(runs)
+        StageRun.objects.bulk_create(stage_runs)
+
+    if canvases:
+        def dispatch():
+            if len(canvases) > 1:
+                group(canvases).apply_async()
+            else:
+                canvases[0].apply_async()
+
+        transaction.on_commit(dispatch)
+    return runs
+
+
+def start_pipeline(project_id, target=BUILD_TARGET, resume=True, countdown=0):
+    return start_pipelines([project_id], target=target, resume=resume, countdowns=[countdown])[0]
+
+
+# --- Bookkeeping, called by the tasks in agents.tasks ---
+
+def mark_stage_started(run_id, stage):
+    StageRun.objects.filter(run_id=run_id, stage=stage).update(
+        status=StageRun.StageStatus.RUNNING, started_at=timezone.now(), error='',
+    )
+
+
+def mark_stage_completed(run_id, stage, output):
+    StageRun.objects.filter(run_id=run_id, stage=stage).update(
+        status=StageRun.StageStatus.COMPLETE, output=output, finished_at=timezone.now(),
+    )
+    trace_stage(run_id, stage)
+
+
+def trace_stage(run_id, stage, error=None):
+    """
+    Exports a finished stage as a span. Its queue wait is the time between
+    the stage becoming ready (its dependencies done, or the run started)
+    and its first task starting.
+    """
+    stage_run = StageRun.objects.select_related('run').filter(run_id=run_id, stage=stage).first()
+    if stage_run is None or stage_run.started_at is None or stage_run.finished_at is None:
+        return
+    depends_on = PROJECT_PIPELINE.stages[stage].depends_on if stage in PROJECT_PIPELINE.stages else ()
+    ready_at = max(
+        StageRun.objects.filter(run_id=run_id, stage__in=depends_on, finished_at__isnull=False).values_list('finished_at', flat=True),
+        default=stage_run.run.started_at,
+    )
+    record_span(
+        'stage', stage_run.started_at, stage_run.finished_at, trace_id=trace_id_for(stage_run.project_id), error=error,
+        project_id=str(stage_run.project_id), run_id=str(run_id), stage=stage,
+        queue_wait_ms=round(max(0, (stage_run.started_at - ready_at).total_seconds()) * 1000, 1),
+    )
+
+
+def mark_run_completed(run_id):
+    run = PipelineRun.objects.get(id=run_id)
+    run.status = PipelineRun.RunStatus.COMPLETE
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'finished_at'])
+    timings = ', '.join(f"{stage}={seconds:.1f}s" for stage, seconds in run.timing_breakdown().items())
+    print(f"Pipeline run {run_id} for project {run.project_id} complete: {timings or 'all stages reused'}")
+    return run
+
+
+def mark_stage_failed(run_id, stage, error):
+    """
+    Marks the stage and its run as failed. Completed stages keep their
+    checkpoints, so the next run resumes at this stage.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        StageRun.objects.filter(run_id=run_id, stage=stage).update(
+            status=StageRun.StageStatus.FAILED, error=error, finished_at=now,
+        )
+        PipelineRun.objects.filter(id=run_id).update(
+            status=PipelineRun.RunStatus.FAILED, error=f"{stage}: {error}", finished_at=now,
+        )
+    trace_stage(run_id, stage, error=error)
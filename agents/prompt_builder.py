@@ -0,0 +1,218 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+import google.generativeai as genai
+from django.core.cache import cache
+from .feedback_summarizer import estimate_tokens
+from .telemetry import set_attributes
+
+# Providers only cache prompt prefixes above a minimum size.
+CONTEXT_CACHE_MIN_TOKENS = 32768
+CONTEXT_CACHE_TTL = timedelta(hours=1)
+SUMMARY_CACHE_TTL = 60 * 60 * 24 * 7
+
+SUMMARIZE_PROMPT = """
+Condense the following document to at most {max_words} words.
+Keep every concrete fact about the target user: demographics, goals, pain points, preferred features and platforms.
+Keep Markdown headings. Return only the condensed document.
+
+Document:
+{text}
+"""
+
+
+class PromptBudgetExceeded(ValueError):
+    pass
+
+
+def compact_json(value):
+    """
+    Serializes JSON without indentation or spaces after separators.
+    """
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def _normalize_line(line):
+    line = re.sub(r'^[\s>*#\-\d.)]+', '', line)
+    line = re.sub(r'[*_`]+', '', line)
+    return ' '.join(line.lower().split())
+
+
+def extractive_summary(text, max_tokens, count_tokens=estimate_tokens):
+    """
+    Shrinks a Markdown document without a model call: headings are always
+    kept, then lines in their original order until the budget is used.
+    """
+    lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    headings = {index for index, line in enumerate(lines) if line.lstrip().startswith('#')}
+    budget = max_tokens - sum(count_tokens(lines[index]) for index in headings)
+    kept = set(headings)
+    for index, line in enumerate(lines):
+        if index in kept:
+            continue
+        cost = count_tokens(line)
+        if cost > budget:
+            continue
+        kept.add(index)
+        budget -= cost
+    return '\n'.join(line for index, line in enumerate(lines) if index in kept)
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    static: bool = False
+    max_tokens: int = None
+    compressible: bool = False
+
+
+@dataclass
+class BuiltPrompt:
+    prefix: str
+    body: str
+    section_tokens: dict = field(default_factory=dict)
+    static_sections: list = field(default_factory=list)
+    dropped_duplicates: int = 0
+
+    @property
+    def text(self):
+        return f"{self.prefix}\n\n{self.body}" if self.prefix else self.body
+
+    @property
+    def total_tokens(self):
+        return sum(self.section_tokens.values())
+
+    @property
+    def prefix_tokens(self):
+        return sum(self.section_tokens.get(name, 0) for name in self.static_sections)
+
+    @property
+    def prefix_hash(self):
+        return hashlib.sha256(self.prefix.encode('utf-8')).hexdigest()
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from named sections under a token budget.
+
+    Static sections come first, in the order added, so every call shares
+    the same prefix and can use provider-side context caching. Repeated
+    instruction lines are dropped, and oversized compressible sections are
+    summarized before anything is sent.
+    """
+    def __init__(self, budget, count_tokens=estimate_tokens, summarize=None):
+        """
+        Args:
+            budget (int): Maximum tokens for the whole prompt.
+            count_tokens (callable): Token counter for a string.
+            summarize (callable): Optional model call used to condense
+                oversized sections; an extractive summary is used otherwise.
+        """
+        self.budget = budget
+        self.count_tokens = count_tokens
+        self.summarize = summarize
+        self.sections = []
+
+    def add(self, name, text, static=False, max_tokens=None, compressible=False):
+        if text is None or not str(text).strip():
+            return self
+        self.sections.append(PromptSection(name, str(text).strip(), static, max_tokens, compressible))
+        return self
+
+    def add_json(self, name, value, **kwargs):
+        return self.add(name, compact_json(value), **kwargs)
+
+    def _dedupe(self, sections):
+        seen = set()
+        dropped = 0
+        for section in sections:
+            lines = []
+            for line in section.text.splitlines():
+                key = _normalize_line(line)
+                # Short lines (headings, code, blank) are too generic to dedupe.
+                if len(key) >= 40:
+                    if key in seen:
+                        dropped += 1
+                        continue
+                    seen.add(key)
+                lines.append(line)
+            section.text = '\n'.join(lines)
+        return dropped
+
+    def _condense(self, section, max_tokens):
+        cache_key = f"prompt-summary:{hashlib.sha256(section.text.encode('utf-8')).hexdigest()}:{max_tokens}"
+        condensed = cache.get(cache_key)
+        if condensed is None:
+            if self.summarize is not None:
+                try:
+                    condensed = self.summarize(SUMMARIZE_PROMPT.format(max_words=int(max_tokens * 0.7), text=section.text))
+                except Exception as e:
+                    print(f"Summarizing prompt section '{section.name}' failed: {e}")
+            if not condensed or self.count_tokens(condensed) > max_tokens:
+                condensed = extractive_summary(condensed or section.text, max_tokens, self.count_tokens)
+            cache.set(cache_key, condensed, timeout=SUMMARY_CACHE_TTL)
+        section.text = condensed
+
+    def build(self):
+        static = [section for section in self.sections if section.static]
+        dynamic = [section for section in self.sections if not section.static]
+        ordered = static + dynamic
+        dropped = self._dedupe(ordered)
+
+        for section in ordered:
+            if section.max_tokens and self.count_tokens(section.text) > section.max_tokens:
+                self._condense(section, section.max_tokens)
+
+        counts = {section.name: self.count_tokens(section.text) for section in ordered}
+        overflow = sum(counts.values()) - self.budget
+        if overflow > 0:
+            # Shrink the largest compressible sections first.
+            for section in sorted((s for s in ordered if s.compressible), key=lambda s: counts[s.name], reverse=True):
+                target = max(1, counts[section.name] - overflow)
+                self._condense(section, target)
+                overflow -= counts[section.name] - self.count_tokens(section.text)
+                counts[section.name] = self.count_tokens(section.text)
+                if overflow <= 0:
+                    break
+        if overflow > 0:
+            raise PromptBudgetExceeded(f"Prompt needs {sum(counts.values())} tokens; the budget is {self.budget}.")
+
+        return BuiltPrompt(
+            prefix='\n\n'.join(section.text for section in static),
+            body='\n\n'.join(section.text for section in dynamic),
+            section_tokens=counts,
+            static_sections=[section.name for section in static],
+            dropped_duplicates=dropped,
+        )
+
+
+def get_model_for_prompt(model_name, prompt, **model_kwargs):
+    """
+    Returns a model whose system instruction is the prompt's static prefix,
+    served from a provider-side context cache when the prefix is large enough
+    to qualify. Only `prompt.body` then needs to be sent per call.
+    """
+    if not prompt.prefix:
+        return genai.GenerativeModel(model_name, **model_kwargs)
+    if prompt.prefix_tokens < CONTEXT_CACHE_MIN_TOKENS:
+        return genai.GenerativeModel(model_name, system_instruction=prompt.prefix, **model_kwargs)
+
+    cache_key = f"context-cache:{model_name}:{prompt.prefix_hash}"
+    cached_name = cache.get(cache_key)
+    try:
+        if cached_name:
+            cached_content = genai.caching.CachedContent.get(cached_name)
+            set_attributes(cache_hit=True)
+        else:
+            cached_content = genai.caching.CachedContent.create(
+                model=model_name, system_instruction=prompt.prefix, ttl=CONTEXT_CACHE_TTL,
+            )
+            cache.set(cache_key, cached_content.name, timeout=int(CONTEXT_CACHE_TTL.total_seconds()) - 60)
+        return genai.GenerativeModel.from_cached_content(cached_content, **model_kwargs)
+    except Exception as e:
+        print(f"Context cache unavailable for {model_name}: {e}")
+        cache.delete(cache_key)
+        return genai.GenerativeModel(model_name, system_instruction=prompt.prefix, **model_kwargs)
@@ -0,0 +1,458 @@
+import gzip
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from apps.projects.analysis import content_fingerprint
+
+FETCH_TIMEOUT = 15
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+MAX_STYLESHEETS = 5
+MAX_TEXT_CHARS = 20000
+MAX_COLORS = 24
+MAX_REDIRECTS = 5
+# How often each process evicts old entries from the HTTP cache, in seconds.
+CACHE_PRUNE_INTERVAL = 60 * 60
+USER_AGENT = 'ApplaudeBot/1.0 (+https://applaude.ai)'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide HTTP session, so every fetch reuses pooled
+    keep-alive connections instead of opening a new one.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=('GET', 'HEAD'))
+            adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+        return _session
+
+
+class BlockedAddress(requests.RequestException):
+    """
+    Raised for URLs that resolve to an address the crawler may not reach.
+    """
+
+
+def check_url(url):
+    """
+    Refuses URLs that are not http(s), or whose host resolves to a loopback,
+    private, link-local or otherwise non-public address, so that user
+    supplied URLs cannot reach internal services.
+
+    Raises:
+        BlockedAddress: If the URL may not be fetched.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise BlockedAddress(f"Refusing to fetch {url}: not an http(s) URL.")
+    if settings.SITE_FETCH_ALLOW_PRIVATE:
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or 80, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise BlockedAddress(f"Could not resolve {parts.hostname}: {e}") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise BlockedAddress(f"Refusing to fetch {url}: {parts.hostname} resolves to {ip}.")
+
+
+def safe_get(session, url, headers=None):
+    """
+    GETs a URL (streamed), following redirects one hop at a time so that
+    every target is checked with check_url before it is requested.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        response = session.get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False)
+        if not response.is_redirect:
+            return response
+        url = urljoin(url, response.headers['Location'])
+        response.close()
+    raise requests.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects.")
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache: a JSON metadata file and a gzipped body per URL.
+    Files are written through a temporary file and renamed, so concurrent
+    workers never read a half-written entry. Entries are evicted by age and
+    then by total size, oldest first.
+    """
+    _last_pruned = 0
+    _prune_lock = threading.Lock()
+
+    def __init__(self, directory=None, max_bytes=None, max_age=None):
+        self.directory = Path(directory or settings.SITE_CACHE_DIR)
+        self.max_bytes = settings.SITE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = settings.SITE_CACHE_MAX_AGE if max_age is None else max_age
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = self.directory / key[:2]
+        return folder / f'{key}.json', folder / f'{key}.gz'
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            with gzip.open(body_path, 'rb') as body_file:
+                body = body_file.read().decode(meta.get('encoding') or 'utf-8', errors='replace')
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def put(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        self._write_atomic(body_path, gzip.compress(body.encode(meta.get('encoding') or 'utf-8', errors='replace')))
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        self._prune_periodically()
+
+    def _prune_periodically(self):
+        with HttpCache._prune_lock:
+            if time.time() - HttpCache._last_pruned < CACHE_PRUNE_INTERVAL:
+                return
+            HttpCache._last_pruned = time.time()
+        self.prune()
+
+    def prune(self, now=None):
+        """
+        Deletes entries older than max_age, then the oldest entries until the
+        cache fits in max_bytes. Returns the number of entries deleted.
+        """
+        now = time.time() if now is None else now
+        entries = []
+        for meta_path in self.directory.glob('*/*.json'):
+            body_path = meta_path.with_suffix('.gz')
+            try:
+                size = meta_path.stat().st_size + (body_path.stat().st_size if body_path.exists() else 0)
+                entries.append((meta_path.stat().st_mtime, size, meta_path, body_path))
+            except OSError:
+                continue  # Removed by another worker.
+        entries.sort(key=lambda entry: entry[0])
+
+        total = sum(size for _, size, _, _ in entries)
+        deleted = 0
+        for modified, size, meta_path, body_path in entries:
+            if now - modified <= self.max_age and total <= self.max_bytes:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+            deleted += 1
+        return deleted
+
+
+@dataclass
+class FetchedResource:
+    url: str
+    body: str
+    from_cache: bool = False
+
+
+def fetch(url, cache=None, session=None):
+    """
+    GETs a URL through the pooled session. A cached copy is revalidated with
+    If-None-Match / If-Modified-Since, and a 304 reply is served from disk.
+
+    Raises:
+        BlockedAddress: If the URL, or a redirect, targets a non-public address.
+    """
+    cache = cache or HttpCache()
+    session = session or get_session()
+    meta, cached_body = cache.get(url)
+
+    headers = {}
+    if meta and cached_body is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    with safe_get(session, url, headers=headers) as response:
+        if response.status_code == 304 and cached_body is not None:
+            return FetchedResource(url=meta.get('final_url', url), body=cached_body, from_cache=True)
+        response.raise_for_status()
+        content = response.raw.read(MAX_RESPONSE_BYTES, decode_content=True)
+        encoding = response.encoding or 'utf-8'
+        body = content.decode(encoding, errors='replace')
+        cache.put(url, {
+            'final_url': response.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'encoding': encoding,
+            'fetched_at': time.time(),
+        }, body)
+        return FetchedResource(url=response.url, body=body)
+
+
+def fetch_bytes(url, max_bytes=MAX_RESPONSE_BYTES, session=None):
+    """
+    Downloads a binary resource such as a logo through the pooled session.
+    Returns None if it cannot be fetched.
+    """
+    session = session or get_session()
+    try:
+        with safe_get(session, url) as response:
+            response.raise_for_status()
+            return response.raw.read(max_bytes, decode_content=True)
+    except requests.RequestException as e:
+        print(f"Could not fetch {url}: {e}")
+        return None
+
+
+# --- Extraction ---
+
+HEX_COLOR = re.compile(r'#(?:[0-9a-fA-F]{8}|[0-9a-fA-F]{6}|[0-9a-fA-F]{3,4})\b')
+RGB_COLOR = re.compile(r'rgba?\(\s*(\d{1,3})[\s,]+(\d{1,3})[\s,]+(\d{1,3})(?:[\s,/]+([\d.]+%?))?\s*\)', re.IGNORECASE)
+CSS_DECLARATION = re.compile(r'([\w-]+)\s*:\s*([^;{}]+)')
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'svg', 'template'}
+
+
+def normalize_color(value):
+    """
+    Converts a CSS hex or rgb()/rgba() color to lowercase #rrggbb.
+    Returns None for anything else, including mostly transparent colors.
+    """
+    value = value.strip()
+    match = HEX_COLOR.fullmatch(value)
+    if match:
+        digits = value[1:]
+        if len(digits) in (3, 4):
+            if len(digits) == 4 and digits[3] in '0123':
+                return None
+            digits = ''.join(char * 2 for char in digits[:3])
+        elif len(digits) == 8:
+            if int(digits[6:], 16) < 64:
+                return None
+            digits = digits[:6]
+        return f'#{digits.lower()}'
+    match = RGB_COLOR.fullmatch(value)
+    if match:
+        red, green, blue, alpha = match.groups()
+        if alpha is not None:
+            opacity = float(alpha[:-1]) / 100 if alpha.endswith('%') else float(alpha)
+            if opacity < 0.25:
+                return None
+        channels = [min(255, int(channel)) for channel in (red, green, blue)]
+        return '#' + ''.join(f'{channel:02x}' for channel in channels)
+    return None
+
+
+def extract_css_colors(css_sources):
+    """
+    Counts every color literal in declaration values (so `#fab` id selectors
+    are not mistaken for colors) and collects color-valued custom properties.
+
+    Returns:
+        A (colors, variables) tuple: colors is a list of {'color', 'count'}
+        dicts, most frequent first; variables maps `--name` to #rrggbb.
+    """
+    counts = Counter()
+    variables = {}
+    for css in css_sources:
+        for name, value in CSS_DECLARATION.findall(css):
+            if name.startswith('--'):
+                color = normalize_color(value)
+                if color:
+                    variables.setdefault(name, color)
+            for match in HEX_COLOR.finditer(value):
+                color = normalize_color(match.group(0))
+                if color:
+                    counts[color] += 1
+            for match in RGB_COLOR.finditer(value):
+                color = normalize_color(match.group(0))
+                if color:
+                    counts[color] += 1
+    colors = [{'color': color, 'count': count} for color, count in counts.most_common(MAX_COLORS)]
+    return colors, variables
+
+
+class _PageParser(HTMLParser):
+    """
+    Single pass over the page collecting text, metadata, styles and images.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.description = ''
+        self.theme_color = None
+        self.og_image = None
+        self.icons = []
+        self.logo_images = []
+        self.images = []
+        self.stylesheets = []
+        self.styles = []
+        self.text = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or '' for name, value in attrs}
+        if attrs.get('style'):
+            self.styles.append(attrs['style'])
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            self._in_style = tag == 'style'
+        elif tag == 'title':
+            self._in_title = True
+        elif tag == 'meta':
+            name = (attrs.get('name') or attrs.get('property') or '').lower()
+            if name in ('description', 'og:description') and not self.description:
+                self.description = attrs.get('content', '')
+            elif name == 'theme-color':
+                self.theme_color = normalize_color(attrs.get('content', ''))
+            elif name == 'og:image':
+                self.og_image = attrs.get('content')
+        elif tag == 'link':
+            rel = attrs.get('rel', '').lower().split()
+            if 'stylesheet' in rel and attrs.get('href'):
+                self.stylesheets.append(attrs['href'])
+            elif ('icon' in rel or 'apple-touch-icon' in rel) and attrs.get('href'):
+                self.icons.append(attrs['href'])
+        elif tag == 'img' and attrs.get('src'):
+            self.images.append(attrs['src'])
+            hints = ' '.join(attrs.get(name, '') for name in ('src', 'alt', 'class', 'id')).lower()
+            if 'logo' in hints:
+                self.logo_images.append(attrs['src'])
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+            self._in_style = False
+        elif tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.styles.append(data)
+        elif self._in_title:
+            self.title += data
+        elif not self._skip_depth and data.strip():
+            self.text.append(data.strip())
+
+
+def parse_page(html):
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def extract_site(page, base_url, stylesheets=()):
+    """
+    Builds the structured extract shared by every downstream agent.
+
+    Args:
+        page (_PageParser): The parsed HTML page.
+        base_url (str): URL the page was served from, for resolving links.
+        stylesheets (iterable): Text of the linked stylesheets.
+    """
+    colors, variables = extract_css_colors(list(page.styles) + list(stylesheets))
+    logo_candidates = page.logo_images + page.icons + ([page.og_image] if page.og_image else [])
+    return {
+        'url': base_url,
+        'title': ' '.join(page.title.split()),
+        'description': ' '.join(page.description.split()),
+        'text': ' '.join(page.text)[:MAX_TEXT_CHARS],
+        'logo_url': urljoin(base_url, logo_candidates[0]) if logo_candidates else None,
+        'icon_urls': [urljoin(base_url, href) for href in page.icons[:5]],
+        'image_urls': [urljoin(base_url, src) for src in page.images[:10]],
+        'theme_color': page.theme_color,
+        'css_colors': colors,
+        'css_variables': variables,
+    }
+
+
+@dataclass
+class SiteSnapshot:
+    extract: dict
+    fingerprint: str
+    from_cache: bool = False
+    stylesheet_urls: list = field(default_factory=list)
+
+
+def fetch_site(url, cache=None, session=None):
+    """
+    Fetches a site's home page and its first stylesheets, and extracts text,
+    logo and CSS colors from them in one pass.
+
+    Returns:
+        A SiteSnapshot, or None if the page cannot be fetched.
+    """
+    cache = cache or HttpCache()
+    try:
+        page_resource = fetch(url, cache=cache, session=session)
+    except requests.RequestException as e:
+        print(f"Could not fetch {url}: {e}")
+        return None
+
+    page = parse_page(page_resource.body)
+    stylesheet_urls = [urljoin(page_resource.url, href) for href in page.stylesheets[:MAX_STYLESHEETS]]
+    stylesheets = []
+    for stylesheet_url in stylesheet_urls:
+        try:
+            stylesheets.append(fetch(stylesheet_url, cache=cache, session=session).body)
+        except requests.RequestException as e:
+            print(f"Skipping stylesheet {stylesheet_url}: {e}")
+
+    return SiteSnapshot(
+        extract=extract_site(page, page_resource.url, stylesheets),
+        fingerprint=content_fingerprint(page_resource.body),
+        from_cache=page_resource.from_cache,
+        stylesheet_urls=stylesheet_urls,
+    )
+
+
+def get_site_extract(project):
+    """
+    Returns the stored extract for a project's site, fetching it only if the
+    project's shared analysis does not hold one yet.
+    """
+    analysis = project.site_analysis
+    if analysis is not None and analysis.site_extract:
+        return analysis.site_extract
+    if not project.source_url:
+        return None
+    snapshot = fetch_site(project.source_url)
+    return snapshot.extract if snapshot else None
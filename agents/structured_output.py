@@ -0,0 +1,247 @@
+import json
+import re
+from jsonschema import Draft202012Validator
+from .telemetry import set_attributes
+
+# Schema keywords the provider's response_schema understands; the rest are
+# only checked locally.
+PROVIDER_SCHEMA_KEYS = ('type', 'format', 'description', 'nullable', 'enum', 'items', 'properties', 'required')
+
+# Characters that change the parser's state; everything else is skipped in bulk.
+_SIGNIFICANT = re.compile(r'[{}\[\]",\\]')
+_BARE_WORD = re.compile(r'[A-Za-z_#][\w#.+-]*')
+_LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def provider_schema(schema):
+    """
+    Reduces a JSON Schema to the subset the provider accepts as response_schema.
+    """
+    reduced = {key: value for key, value in schema.items() if key in PROVIDER_SCHEMA_KEYS}
+    if 'properties' in reduced:
+        reduced['properties'] = {name: provider_schema(value) for name, value in reduced['properties'].items()}
+    if 'items' in reduced:
+        reduced['items'] = provider_schema(reduced['items'])
+    return reduced
+
+
+def json_generation_config(schema):
+    """
+    Generation settings that make the model answer with JSON shaped by `schema`.
+    """
+    return {'response_mime_type': 'application/json', 'response_schema': provider_schema(schema)}
+
+
+def repair_json(text):
+    """
+    Fixes the mistakes models make when writing JSON by hand: single quotes,
+    unquoted keys and values, Python literals, trailing commas, and output
+    cut off before its closing quotes and brackets.
+
+    Raises:
+        json.JSONDecodeError: If the text is still not JSON afterwards.
+    """
+    out, closers = [], []
+    position, length = 0, len(text)
+
+    def drop_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ',':
+            out.pop()
+
+    while position < length:
+        char = text[position]
+        if char in '"\'':
+            end, parts = position + 1, []
+            while end < length and text[end] != char:
+                if text[end] == '\\' and end + 1 < length:
+                    parts.append("'" if text[end + 1] == "'" else text[end:end + 2])
+                    end += 2
+                    continue
+                parts.append('\\"' if text[end] == '"' else text[end])
+                end += 1
+            out.append('"' + ''.join(parts) + '"')
+            position = end + 1
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+            out.append(char)
+            position += 1
+        elif char in '}]':
+            drop_trailing_comma()
+            if closers and closers[-1] == char:
+                closers.pop()
+            out.append(char)
+            position += 1
+        elif char.isalpha() or char in '_#':
+            word = _BARE_WORD.match(text, position).group()
+            out.append(_LITERALS.get(word) or json.dumps(word))
+            position += len(word)
+        else:
+            out.append(char)
+            position += 1
+
+    drop_trailing_comma()
+    if out and out[-1] == ':':
+        out.append('null')
+    return json.loads(''.join(out) + ''.join(reversed(closers)))
+
+
+class IncrementalJsonParser:
+    """
+    Finds the first JSON object in text that arrives in chunks. Prose or
+    code fences around the object are skipped, and parsing stops as soon as
+    the object closes, so whatever the model writes after it is never read.
+
+    With a schema, each top-level member is validated as soon as it is
+    complete; `errors` collects the problems found so far. A candidate that
+    is not JSON even after repair is dropped in favour of the next one.
+    """
+    def __init__(self, schema=None):
+        self.validator = Draft202012Validator(schema) if schema else None
+        self.schema = schema or {}
+        self.value = None
+        self.complete = False
+        self.repaired = False
+        self.errors = []
+        self._text = ''
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._member_start = 0
+
+    def feed(self, chunk):
+        """
+        Parses the next chunk. Returns True once the object is complete.
+        """
+        if self.complete:
+            return True
+        if not self._text:
+            start = chunk.find('{')
+            if start < 0:
+                return False
+            chunk = chunk[start:]
+        self._text += chunk
+
+        while True:
+            match = _SIGNIFICANT.search(self._text, self._scan)
+            if match is None:
+                return False
+            char, self._scan = match.group(), match.end()
+            if self._in_string:
+                if char == '\\':
+                    self._scan += 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._scan
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._check_member(self._text[self._member_start:self._scan - 1])
+                    if self._accept(self._text[:self._scan]):
+                        return True
+                    self._restart()
+            elif char == ',' and self._depth == 1:
+                self._check_member(self._text[self._member_start:self._scan - 1])
+                self._member_start = self._scan
+
+    def _check_member(self, member):
+        if self.validator is None or not member.strip():
+            return
+        try:
+            (name, value), = json.loads('{' + member + '}').items()
+        except (ValueError, json.JSONDecodeError):
+            return  # Left to repair once the object is complete.
+        properties = self.schema.get('properties', {})
+        if name not in properties:
+            if self.schema.get('additionalProperties') is False:
+                self.errors.append(f"Unexpected property '{name}'.")
+            return
+        for error in Draft202012Validator(properties[name]).iter_errors(value):
+            self.errors.append(f"'{name}': {error.message}")
+
+    def _accept(self, candidate):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            try:
+                value, self.repaired = repair_json(candidate), True
+            except json.JSONDecodeError:
+                return False
+        if not isinstance(value, dict):
+            return False
+        self.value, self.complete = value, True
+        return True
+
+    def _restart(self):
+        self.errors, self.repaired = [], False
+        start = self._text.find('{', 1)
+        self._text = self._text[start:] if start > 0 else ''
+        self._scan, self._depth, self._in_string = 0, 0, False
+
+    def finish(self):
+        """
+        Returns the parsed object, repairing output that was cut off before
+        the object closed.
+
+        Raises:
+            StructuredOutputError: If there is no object, or it does not
+                match the schema.
+        """
+        if not self.complete and self._text:
+            try:
+                self.value, self.repaired = repair_json(self._text), True
+            except json.JSONDecodeError as e:
+                raise StructuredOutputError(f"The response is not valid JSON: {e}") from e
+            self.complete = isinstance(self.value, dict)
+        if not self.complete:
+            raise StructuredOutputError("No JSON object found in the model response.")
+        if self.validator is not None:
+            problems = sorted(self.validator.iter_errors(self.value), key=lambda error: list(error.path))
+            if problems:
+                raise StructuredOutputError('; '.join(error.message for error in problems))
+        return self.value
+
+
+def response_chunks(response):
+    """
+    The text of a response as it arrives: chunk by chunk for a streamed
+    response, or all at once.
+    """
+    if isinstance(response, str):
+        return [response]
+    if not hasattr(response, '__iter__'):
+        return [response.text or '']
+    return (getattr(chunk, 'text', chunk) or '' for chunk in response)
+
+
+def parse_structured(response, schema):
+    """
+    Parses the JSON object in a model response (a string, a response, or
+    an iterable of streamed chunks) and validates it against `schema`.
+    A stream is only read until the object is complete, or until a member
+    fails validation, since repair cannot fix a wrong value.
+
+    Raises:
+        StructuredOutputError: If no valid object can be recovered.
+    """
+    parser = IncrementalJsonParser(schema)
+    for chunk in response_chunks(response):
+        done = parser.feed(chunk)
+        if parser.errors:
+            raise StructuredOutputError('; '.join(parser.errors))
+        if done:
+            break
+    value = parser.finish()
+    if parser.repaired:
+        set_attributes(structured_output_repaired=True)
+    return value
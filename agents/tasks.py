@@ -1,22 +1,53 @@
 import google.generativeai as genai
+import inspect
 import os
-from celery import shared_task, atexit
+from celery import chord, group, shared_task
+from celery.exceptions import Retry
+from celery.signals import before_task_publish, task_prerun, task_postrun, worker_shutdown
 from apps.projects.models import Project
+from apps.projects.queries import testimonial_candidates
+from apps.projects.analysis import (
+    get_site_analysis, is_fresh, claim_site_analysis,
+    complete_site_analysis, fail_site_analysis, attach_site_analysis,
+)
+from apps.surveys.models import UserFeedback, AppRating
+from apps.testimonials.models import TestimonialRequestLog
+from django.core.cache import cache
 from django.db import transaction
 import time
 import random
 from django.utils import timezone
-from datetime import timedelta
-from django.core.mail import send_mail
+from datetime import datetime
+from django.core.mail import EmailMessage, get_connection
+from .feedback_summarizer import update_feedback_digest, PARTIAL_BATCH_MAX_WAIT
+from .design_agent import DesignAgent
+from .qa_agent import QAAgent
+from .cybersecurity_agent import CybersecurityAgent
+from .code_generation_agent import CodeGenAgent
+from .code_modules import (
+    plan_code_generation, build_artifact, load_artifact_parts,
+    split_reusable_modules, module_input_hash,
+)
+from .code_templates import TEMPLATED_MODULES, render_module
+from .model_router import route_generate
+from .checkpoints import StepCheckpoints
+from .pipeline import mark_stage_started, mark_stage_completed, mark_stage_failed, mark_run_completed
+from .site_crawler import fetch_site, fetch_bytes
+from .palette import resolve_brand_palette
+from .telemetry import span, start_span, finish_span, trace_id_for
 
 
 try:
     genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-    model = genai.GenerativeModel('gemini-1.5-pro-latest')
+    ai_configured = True
     print("AI Model configured successfully.")
 except Exception as e:
     print(f"Error configuring AI Model: {e}")
-    model = None
+    ai_configured = False
+
+# Polling for a site analysis that another worker is running: every 15s, up to 10 minutes.
+ANALYSIS_WAIT_INTERVAL = 15
+ANALYSIS_WAIT_RETRIES = 40
 
 # --- Helper Functions ---
 
@@ -36,114 +67,250 @@ def update_project_status(project_id, status, message=None):
         print(f"Error updating project status for {project_id}: {e}")
 
 
-def get_ai_response(prompt, retries=3, delay=5):
+def get_ai_response(prompt, retries=3, delay=5, project_id=None, route='default', **kwargs):
     """
     Calls the generative AI model with retry logic.
+    The call takes the models of `route` in turn (see agents.model_router),
+    and every request is admitted by the cluster-wide rate limiter first.
+    Extra keyword arguments (such as a generation_config) go to the model.
     Returns the generated text or raises an exception.
     """
-    if not model:
+    if not ai_configured:
         raise ConnectionError("Generative AI model is not configured.")
 
-    for attempt in range(retries):
-        try:
-            response = model.generate_content(prompt)
-            # Basic validation of response structure
-            if response and response.text:
-                return response.text
-            else:
-                raise ValueError("Received an empty or invalid response from the AI model.")
-        except Exception as e:
-            print(f"AI generation attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                raise  # Re-raise the final exception
+    with span('llm.request', route=route, project_id=project_id) as request_span:
+        for attempt in range(retries):
+            request_span.set(retries=attempt)
+            try:
+                response = route_generate(route, prompt, project_id=project_id, **kwargs)
+                # Basic validation of response structure
+                if response and response.text:
+                    return response.text
+                else:
+                    raise ValueError("Received an empty or invalid response from the AI model.")
+            except Exception as e:
+                print(f"AI generation attempt {attempt + 1} failed: {e}")
+                if attempt < retries - 1:
+                    time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1))
+                else:
+                    raise  # Re-raise the final exception
 
 # --- Core AI Agent Tasks ---
 
+def describe_site(site_extract, max_chars=4000):
+    """
+    Renders the fetched site extract as prompt context.
+    """
+    if not site_extract:
+        return "The website could not be fetched; rely on the URL alone."
+    colors = ', '.join(entry['color'] for entry in site_extract.get('css_colors', [])[:8])
+    return (
+        f"Title: {site_extract.get('title', '')}\n"
+        f"Description: {site_extract.get('description', '')}\n"
+        f"Most used CSS colors: {colors or 'none found'}\n"
+        f"Page text: {site_extract.get('text', '')[:max_chars]}"
+    )
+
+def generate_market_assets(source_url, site_extract=None, checkpoints=None, project_id=None):
+    """
+    Generates the user persona document and brand palette for a website.
+    With `checkpoints`, each of the two is stored as it finishes, so a retry
+    after a failed palette does not ask for the persona again.
+
+    Returns:
+        A (user_persona, brand_palette) tuple.
+    """
+    site_context = describe_site(site_extract)
+
+    # --- User Persona Generation ---
+    persona_prompt = f"""
+    Analyze the content from the URL: {source_url}.
+    Extracted website content:
+    {site_context}
+    Based on this analysis, create a detailed "User Persona" document for a potential mobile application.
+    The persona should include:
+    - A fictional name and demographic details (age, location, occupation).
+    - A brief biography.
+    - Goals and motivations for using an app related to the source content.
+    - Frustrations and pain points with existing solutions.
+    - Their preferred technology and social media platforms.
+    Format the output as a clean, readable text document.
+    """
+    def ask_model(prompt, generation_config=None):
+        return get_ai_response(prompt, project_id=project_id, route='market_analysis', generation_config=generation_config)
+
+    def generate_persona():
+        return ask_model(persona_prompt)
+
+    # --- Brand Palette Generation ---
+    # Read from the site's CSS and images; the model is only asked when that is inconclusive.
+    def generate_palette():
+        return resolve_brand_palette(site_extract, ask_model=ask_model, fetch_image=fetch_bytes)
+
+    if checkpoints is None:
+        return generate_persona(), generate_palette()
+    user_persona = checkpoints.run('persona', persona_prompt, generate_persona)
+    brand_palette = checkpoints.run('palette', site_extract, generate_palette)
+    return user_persona, brand_palette
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def run_market_analysis(self, project_id):
+def run_market_analysis(self, project_id, analysis_waits=0):
     """
     Analyzes the provided source URL to generate a user persona and brand identity.
+    Results are shared through SiteAnalysis, so projects for the same site reuse
+    a fresh analysis and concurrent requests wait for the one already running.
+    Waiting is counted in `analysis_waits`, so it does not use up the retries
+    for failures.
     """
     update_project_status(project_id, Project.ProjectStatus.ANALYSIS_PENDING, "Analyzing market and target user...")
+    analysis = None
     try:
         project = Project.objects.get(id=project_id)
+        if not project.source_url:
+            raise ValueError("Project has no source URL to analyze.")
+
+        analysis = get_site_analysis(project.source_url)
+        # Fetched once through the conditional HTTP cache; shared by every downstream agent
+        snapshot = fetch_site(project.source_url)
+        fingerprint = snapshot.fingerprint if snapshot else None
+        if is_fresh(analysis, fingerprint):
+            attach_site_analysis(project_id, analysis)
+            return project.id # Reused without any AI calls
+
+        if not claim_site_analysis(analysis):
+            # Another worker is analyzing this site; pick up its result shortly.
+            analysis = None
+            if analysis_waits >= ANALYSIS_WAIT_RETRIES:
+                raise TimeoutError("Timed out waiting for another analysis of this site.")
+            raise self.retry(
+                kwargs={'analysis_waits': analysis_waits + 1}, countdown=ANALYSIS_WAIT_INTERVAL, max_retries=None,
+            )
 
-        # --- User Persona Generation ---
-        persona_prompt = f"""
-        Analyze the content from the URL: {project.source_url}.
-        Based on this analysis, create a detailed "User Persona" document for a potential mobile application.
-        The persona should include:
-        - A fictional name and demographic details (age, location, occupation).
-        - A brief biography.
-        - Goals and motivations for using an app related to the source content.
-        - Frustrations and pain points with existing solutions.
-        - Their preferred technology and social media platforms.
-        Format the output as a clean, readable text document.
-        """
-        user_persona = get_ai_response(persona_prompt)
-
-        # --- Brand Palette Generation ---
-        palette_prompt = f"""
-        Based on the website at {project.source_url}, generate a JSON object for a brand color palette.
-        The JSON object must include the following keys with hex color values:
-        "primary", "secondary", "text_light", "text_dark", "background".
-        Example: {{"primary": "#0062FF", "secondary": "#FFC107", "text_light": "#FFFFFF", "text_dark": "#212121", "background": "#F5F5F5"}}
-        Return ONLY the raw JSON object.
-        """
-        brand_palette_str = get_ai_response(palette_prompt)
-
-        # Atomically update the project with the generated assets
-        with transaction.atomic():
-            project_to_update = Project.objects.select_for_update().get(id=project_id)
-            project_to_update.user_persona_document = user_persona
-            project_to_update.brand_palette = brand_palette_str # Storing as string, serializer will handle JSON
-            project_to_update.status = Project.ProjectStatus.ANALYSIS_COMPLETE
-            project_to_update.status_message = "Market analysis complete. Ready for design."
-            project_to_update.save()
+        site_extract = snapshot.extract if snapshot else None
+        user_persona, brand_palette = generate_market_assets(
+            project.source_url, site_extract, checkpoints=StepCheckpoints(project_id, 'market_analysis'), project_id=project_id,
+        )
+        complete_site_analysis(analysis, user_persona, brand_palette, fingerprint, site_extract)
+        attach_site_analysis(project_id, analysis)
 
         return project.id # Pass the project ID to the next task in the chain
+    except Retry:
+        raise
     except Exception as e:
+        if analysis is not None:
+            fail_site_analysis(analysis)
         update_project_status(project_id, Project.ProjectStatus.FAILED, f"Market Analysis Failed: {e}")
+        # request.retries also counts the waits above.
+        self.retry(exc=e, max_retries=self.max_retries + analysis_waits)
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def run_design_analysis(self, project_id):
+    """
+    Extracts the brand palette for the project with the Design Agent.
+    """
+    try:
+        DesignAgent().execute(project_id)
+        return project_id # Pass the project ID to the next task in the chain
+    except Exception as e:
+        update_project_status(project_id, Project.ProjectStatus.FAILED, f"Design Analysis Failed: {e}")
         self.retry(exc=e)
 
+def code_generation_workflow(project):
+    """
+    Fans code generation out into one task per platform and module, all
+    running at once, with a merge step that assembles a single artifact.
+    A BOTH build therefore takes about as long as a single-platform one.
+
+    Boilerplate modules are rendered from templates in the merge step, so
+    only the app-specific screens go to the model. Modules whose inputs are
+    unchanged since the last build are copied from the previous artifact.
+    """
+    project_id = str(project.id)
+    plan = plan_code_generation(project.app_type)
+    rendered = [(platform, module) for platform, module in plan if module in TEMPLATED_MODULES]
+    generated = [(platform, module) for platform, module in plan if module not in TEMPLATED_MODULES]
+    reused, changed = split_reusable_modules(project, generated, load_artifact_parts(project.generated_code_path))
+    print(
+        f"Code generation for project {project_id}: {len(changed)} module(s) to generate, "
+        f"{len(rendered)} rendered from templates, {len(reused)} reused."
+    )
+    merge = merge_generated_code.s(project_id, reused_modules=reused, rendered_modules=rendered)
+    if not changed:
+        return merge.clone(args=([],))
+    return chord(
+        (generate_code_module.si(project_id, platform, module) for platform, module in changed),
+        merge,
+    )
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def run_code_generation(self, project_id):
     """
     Generates the application code based on the project requirements.
-    This is a placeholder for a complex code generation process.
+    The task replaces itself with the parallel workflow, so the next task in
+    the chain starts once the merged artifact exists.
     """
     update_project_status(project_id, Project.ProjectStatus.CODE_GENERATION, "Generating application source code...")
     try:
         project = Project.objects.get(id=project_id)
+        workflow = code_generation_workflow(project)
+    except Exception as e:
+        update_project_status(project_id, Project.ProjectStatus.FAILED, f"Code Generation Failed: {e}")
+        raise self.retry(exc=e)
+    raise self.replace(workflow)
 
-        # In a real system, this would involve a complex series of prompts
-        # and interactions with a code-specialized AI model.
-        # Here, we simulate the process and success.
-
-        # Simulate generation time
-        time.sleep(random.randint(20, 40))
-
-        # Simulate storing the generated code and getting a path
-        # This path would point to an S3 bucket or similar storage.
-        generated_code_path = f"s3://applause-code-bucket/{project.owner.username}/{project.id}/source_code.zip"
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_code_module(self, project_id, platform, module):
+    """
+    Generates one module (theme, networking, survey or screens) for one platform.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+        input_hash = module_input_hash(project, platform, module)
+        # Modules that finished before a failed sibling are not generated again when the stage is retried.
+        files = StepCheckpoints(project_id, 'code_generation').run(
+            f"{platform}:{module}", input_hash, lambda: CodeGenAgent().generate_module(project, platform, module),
+        )
+        return {'platform': platform, 'module': module, 'input_hash': input_hash, 'files': files}
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            update_project_status(project_id, Project.ProjectStatus.FAILED, f"Code Generation Failed ({platform} {module}): {e}")
+        raise self.retry(exc=e)
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def merge_generated_code(self, parts, project_id, reused_modules=(), rendered_modules=()):
+    """
+    Assembles the generated modules, the reused ones from the previous
+    artifact and the template-rendered ones into one zip, and records its
+    location.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+        parts = list(parts)
+        if reused_modules:
+            previous_parts = load_artifact_parts(project.generated_code_path)
+            parts += [previous_parts[tuple(key)] for key in reused_modules]
+        for platform, module in rendered_modules:
+            parts.append({
+                'platform': platform, 'module': module,
+                'input_hash': module_input_hash(project, platform, module),
+                'files': render_module(project, platform, module),
+            })
+        generated_code_path = build_artifact(project_id, parts)
+        file_count = sum(len(part['files']) for part in parts)
         with transaction.atomic():
-            project_to_update = Project.objects.select_for_update().get(id=project_id)
-            project_to_update.generated_code_path = generated_code_path
-            project_to_update.status_message = "Code generation finished. Pending QA."
-            project_to_update.save()
-
-        return project.id # Pass ID to the next task
+            project = Project.objects.select_for_update().get(id=project_id)
+            project.generated_code_path = generated_code_path
+            project.status_message = f"Code generation finished ({file_count} files). Pending QA."
+            project.save()
+        return project_id # Pass ID to the next task
     except Exception as e:
         update_project_status(project_id, Project.ProjectStatus.FAILED, f"Code Generation Failed: {e}")
-        self.retry(exc=e)
+        raise self.retry(exc=e)
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def run_qa_check(self, project_id):
     """
-    Performs a simulated Quality Assurance check on the generated code.
+    Runs the QA Agent's audit of the generated code.
     """
     update_project_status(project_id, Project.ProjectStatus.QA_PENDING, "Performing automated QA checks...")
     try:
@@ -151,17 +318,30 @@ def run_qa_check(self, project_id):
         if not project.generated_code_path:
             raise ValueError("Generated code path not found. Cannot run QA.")
 
-        # Simulate QA process (e.g., running static analysis, linting, tests)
-        time.sleep(random.randint(15, 30))
-
-        # Simulate a successful QA outcome
-        update_project_status(project_id, Project.ProjectStatus.QA_COMPLETE, "QA checks passed. Ready for deployment.")
+        QAAgent().execute(project.id)
 
         return project.id # Pass ID to the next task
     except Exception as e:
         update_project_status(project_id, Project.ProjectStatus.FAILED, f"QA Check Failed: {e}")
         self.retry(exc=e)
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def run_security_scan(self, project_id):
+    """
+    Runs the Cybersecurity Agent's scan of the generated code, alongside QA.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+        if not project.generated_code_path:
+            raise ValueError("Generated code path not found. Cannot run the security scan.")
+
+        CybersecurityAgent().execute(project.id)
+
+        return project.id # Pass ID to the next task
+    except Exception as e:
+        update_project_status(project_id, Project.ProjectStatus.FAILED, f"Security Scan Failed: {e}")
+        self.retry(exc=e)
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def run_deployment(self, project_id):
     """
@@ -187,81 +367,210 @@ def run_deployment(self, project_id):
         update_project_status(project_id, Project.ProjectStatus.FAILED, f"Deployment Failed: {e}")
         self.retry(exc=e)
 
-@shared_task(name="send_testimonial_requests")
-def send_testimonial_requests():
+# --- Pipeline bookkeeping (see agents.pipeline) ---
+
+@shared_task
+def pipeline_stage_started(run_id, stage):
+    mark_stage_started(run_id, stage)
+
+@shared_task
+def pipeline_stage_completed(output, run_id, stage):
     """
-    A periodic Celery task that identifies users who are good candidates
-    for providing a testimonial and sends them a request.
+    Checkpoints the stage's output and passes it on unchanged.
     """
-    now = timezone.now()
-    frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:5173")
+    mark_stage_completed(run_id, stage, output)
+    return output
 
+@shared_task
+def pipeline_stage_failed(request, exc, traceback, run_id, stage):
+    """
+    Error callback for a stage task that has used up its retries.
+    """
+    mark_stage_failed(run_id, stage, str(exc))
 
-    # Define time windows for sending requests
-    one_day_ago = now - timedelta(days=1)
-    one_month_ago = now - timedelta(days=30)
-    three_months_ago = now - timedelta(days=90)
+@shared_task
+def pipeline_run_completed(run_id):
+    mark_run_completed(run_id)
+    return run_id
 
-    # Find projects that were completed recently
-    # We check for a small window to avoid sending emails every day for the same project
-    completed_recently = Project.objects.filter(
-        status=Project.ProjectStatus.COMPLETED,
-        updated_at__range=(one_day_ago - timedelta(hours=24), one_day_ago)
-    )
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def process_feedback_data(self, project_id, force=False):
+    """
+    Folds newly submitted feedback and rating comments into the project's
+    rolling digest. Only entries not yet covered by a batch summary are sent
+    to the model, so cost grows with new feedback rather than total feedback.
+    """
+    lock_key = f"feedback-digest-lock:{project_id}"
+    # A pass already running for this project will pick the new entries up.
+    if not cache.add(lock_key, True, timeout=15 * 60):
+        return None
+    try:
+        project = Project.objects.get(id=project_id)
+        return update_feedback_digest(project, lambda prompt: get_ai_response(prompt, project_id=project_id, route='feedback'), force=force)
+    except Project.DoesNotExist:
+        print(f"Project with ID {project_id} not found for feedback processing.")
+    except Exception as e:
+        print(f"Feedback summarization failed for project {project_id}: {e}")
+        self.retry(exc=e)
+    finally:
+        cache.delete(lock_key)
 
-    completed_one_month_ago = Project.objects.filter(
-        status=Project.ProjectStatus.COMPLETED,
-        updated_at__range=(one_month_ago - timedelta(hours=24), one_month_ago)
+@shared_task(name="summarize_stale_feedback")
+def summarize_stale_feedback():
+    """
+    A periodic Celery task that flushes partially filled feedback batches
+    which have been waiting longer than PARTIAL_BATCH_MAX_WAIT.
+    """
+    cutoff = timezone.now() - PARTIAL_BATCH_MAX_WAIT
+    project_ids = set(
+        UserFeedback.objects.filter(summary_batch__isnull=True, created_at__lt=cutoff)
+        .values_list('project_id', flat=True).distinct()
     )
-
-    completed_three_months_ago = Project.objects.filter(
-        status=Project.ProjectStatus.COMPLETED,
-        updated_at__range=(three_months_ago - timedelta(hours=24), three_months_ago)
+    project_ids |= set(
+        AppRating.objects.filter(summary_batch__isnull=True, created_at__lt=cutoff)
+        .exclude(comment__isnull=True).exclude(comment='')
+        .values_list('project_id', flat=True).distinct()
     )
+    for project_id in project_ids:
+        process_feedback_data.delay(str(project_id), force=True)
 
-    projects_to_notify = list(completed_recently) + list(completed_one_month_ago) + list(completed_three_months_ago)
+# Sent to each project owner, formatted per recipient.
+TESTIMONIAL_SUBJECT = "Share Your Experience with {project_name}"
+TESTIMONIAL_MESSAGE = """Hi {greeting},
 
-    for project in projects_to_notify:
-        user = project.owner
-        # You would ideally check if a testimonial already exists for this project/user
-        # from apps.testimonials.models import Testimonial
-        # if not Testimonial.objects.filter(user=user, project=project).exists():
+We hope you're enjoying your app, "{project_name}"!
 
-        # For this implementation, we'll assume sending the email is sufficient.
+Your feedback is incredibly valuable to us and to the Applause community. Would you be willing to share a short testimonial about your experience building with us?
 
-        subject = f"Share Your Experience with {project.name}"
-        message = f"""
-        Hi {user.username},
+It will only take a moment, and you can submit it directly here:
+{frontend_url}/submit-testimonial/{project_id}
 
-        We hope you're enjoying your app, "{project.name}"!
+Thank you for being a part of the Applause journey!
 
-        Your feedback is incredibly valuable to us and to the Applause community. Would you be willing to share a short testimonial about your experience building with us?
+Best,
+The Applause Team
+"""
+TESTIMONIAL_BATCH_SIZE = 100
 
-        It will only take a moment, and you can submit it directly here:
-        {frontend_url}/submit-testimonial/{project.id}
 
-        Thank you for being a part of the Applause journey!
+@shared_task(name="send_testimonial_requests")
+def send_testimonial_requests():
+    """
+    A periodic Celery task that identifies users who are good candidates
+    for providing a testimonial and sends them a request.
 
-        Best,
-        The Applause Team
-        """
+    The candidates are found in one query and logged before any email is
+    sent, so a later or overlapping run skips them; the emails themselves
+    go out in batches, each over a single mail connection.
+    """
+    candidates = testimonial_candidates().values_list('id', 'owner_id', 'delay_days')
+    requests = [
+        TestimonialRequestLog(project_id=project_id, user_id=owner_id, delay_days=delay_days)
+        for project_id, owner_id, delay_days in candidates
+    ]
+    if not requests:
+        return 0
+    TestimonialRequestLog.objects.bulk_create(requests, ignore_conflicts=True)
+
+    request_ids = [str(request.id) for request in requests]
+    batches = [request_ids[i:i + TESTIMONIAL_BATCH_SIZE] for i in range(0, len(request_ids), TESTIMONIAL_BATCH_SIZE)]
+    group(send_testimonial_batch.si(batch) for batch in batches).apply_async()
+    print(f"Queued {len(request_ids)} testimonial request(s) in {len(batches)} batch(es).")
+    return len(request_ids)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def send_testimonial_batch(self, request_ids):
+    """
+    Sends the logged testimonial requests that have not gone out yet, over
+    one mail connection, and marks them as sent.
+    """
+    requests = list(
+        TestimonialRequestLog.objects.filter(id__in=request_ids, sent_at__isnull=True).select_related('project', 'user')
+    )
+    if not requests:
+        return 0
+    frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:5173")
+    messages = [
+        EmailMessage(
+            TESTIMONIAL_SUBJECT.format(project_name=request.project.name),
+            TESTIMONIAL_MESSAGE.format(
+                greeting=request.user.first_name or request.user.email,
+                project_name=request.project.name,
+                frontend_url=frontend_url,
+                project_id=request.project_id,
+            ),
+            'noreply@applaude.ai',
+            [request.user.email],
+        )
+        for request in requests
+    ]
 
-        try:
-            send_mail(
-                subject,
-                message,
-                'noreply@applaude.ai',
-                [user.email],
-                fail_silently=False,
-            )
-            print(f"Sent testimonial request to {user.email} for project {project.name}")
-        except Exception as e:
-            print(f"Failed to send testimonial request email to {user.email}: {e}")
+    try:
+        with get_connection() as connection:
+            sent = connection.send_messages(messages)
+    except Exception as e:
+        print(f"Failed to send {len(messages)} testimonial request email(s): {e}")
+        raise self.retry(exc=e)
+
+    TestimonialRequestLog.objects.filter(id__in=[request.id for request in requests]).update(sent_at=timezone.now())
+    print(f"Sent {sent} testimonial request email(s).")
+    return sent
+
+
+# --- Telemetry ---
+
+# Bookkeeping tasks are recorded as the stages they wrap (see agents.pipeline).
+UNTRACED_TASKS = {
+    'agents.tasks.pipeline_stage_started', 'agents.tasks.pipeline_stage_completed',
+    'agents.tasks.pipeline_stage_failed', 'agents.tasks.pipeline_run_completed',
+}
+
+_task_spans = {}
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    """
+    Records when a task was sent, so the worker can tell how long it queued.
+    """
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+def _queue_wait_ms(request):
+    published_at = request.get('published_at')
+    if published_at is None:
+        return None
+    ready_at = published_at
+    if request.eta:
+        eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+        ready_at = max(ready_at, eta.timestamp())
+    return round(max(0, time.time() - ready_at) * 1000, 1)
+
+@task_prerun.connect
+def open_task_span(task_id=None, task=None, args=None, kwargs=None, **extra):
+    if not task.name.startswith('agents.tasks.') or task.name in UNTRACED_TASKS:
+        return
+    try:
+        project_id = inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {})).arguments.get('project_id')
+    except TypeError:
+        project_id = None
+    _task_spans[task_id] = start_span(
+        'task', trace_id=trace_id_for(project_id), task=task.name.rsplit('.', 1)[-1], project_id=project_id,
+        retries=task.request.retries, queue_wait_ms=_queue_wait_ms(task.request),
+    )
+
+@task_postrun.connect
+def close_task_span(task_id=None, retval=None, state=None, **extra):
+    opened = _task_spans.pop(task_id, None)
+    if opened is not None:
+        task_span, token = opened
+        task_span.set(state=state)
+        finish_span(task_span, token, retval if state == 'FAILURE' else None)
 
 
 # --- Cleanup ---
 
-@atexit.register
+@worker_shutdown.connect
 def cleanup_resources(*args, **kwargs):
     """
     A cleanup function to be executed when the Celery worker shuts down.
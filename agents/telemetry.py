@@ -0,0 +1,358 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from django.conf import settings
+from .feedback_summarizer import estimate_tokens
+
+# Attributes a span passes on to the spans opened inside it.
+INHERITED_ATTRIBUTES = ('project_id', 'stage', 'agent', 'task')
+
+# Spans read back by the summary: the most recent ones in the export file.
+SUMMARY_MAX_SPANS = 100_000
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """
+    List price in USD per million prompt and response tokens.
+    """
+    prompt: float
+    response: float
+
+
+MODEL_PRICES = {
+    'gemini-1.5-pro': ModelPrice(prompt=1.25, response=5.00),
+    'gemini-1.5-flash': ModelPrice(prompt=0.075, response=0.30),
+}
+
+
+def call_cost(model, prompt_tokens, response_tokens):
+    """
+    List-price cost of a call, with `model` as a key of MODEL_PRICES.
+    """
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        return None
+    return round(((prompt_tokens or 0) * price.prompt + (response_tokens or 0) * price.response) / 1_000_000, 6)
+
+
+@dataclass
+class Span:
+    """
+    One timed unit of work, in the shape of an OpenTelemetry span: spans
+    opened inside another share its trace and name it as their parent.
+    """
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str = None
+    attributes: dict = field(default_factory=dict)
+    start: float = field(default_factory=time.time)
+    duration_ms: float = None
+    status: str = 'ok'
+    error: str = ''
+    _started: float = field(default_factory=time.monotonic, repr=False)
+
+    def set(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def end(self, error=None):
+        if self.duration_ms is None:
+            self.duration_ms = round((time.monotonic() - self._started) * 1000, 1)
+        if error is not None:
+            self.status, self.error = 'error', error if isinstance(error, str) else repr(error)
+        export(self)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': datetime.fromtimestamp(self.start, dt_timezone.utc).isoformat(),
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+_current_span = ContextVar('telemetry_span', default=None)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def trace_id_for(project_id):
+    """
+    Every span about a project shares one trace, whichever worker ran it.
+    """
+    return str(project_id).replace('-', '') if project_id else None
+
+
+def start_span(name, trace_id=None, **attributes):
+    """
+    Opens a span under the current one and makes it current. Returns the
+    span and the token `finish_span` needs; prefer the `span` context
+    manager where the work fits in one block.
+    """
+    parent = _current_span.get()
+    inherited = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if parent and key in parent.attributes}
+    new_span = Span(
+        name=name,
+        trace_id=trace_id or (parent.trace_id if parent else uuid.uuid4().hex),
+        parent_id=parent.span_id if parent else None,
+    )
+    new_span.set(**inherited)
+    new_span.set(**attributes)
+    return new_span, _current_span.set(new_span)
+
+
+def finish_span(new_span, token, error=None):
+    _current_span.reset(token)
+    new_span.end(error)
+
+
+@contextmanager
+def span(name, trace_id=None, **attributes):
+    """
+    Times the block as a span named `name`. An exception leaving the block
+    marks the span as failed and is re-raised.
+    """
+    new_span, token = start_span(name, trace_id=trace_id, **attributes)
+    try:
+        yield new_span
+    except BaseException as e:
+        finish_span(new_span, token, e)
+        raise
+    finish_span(new_span, token)
+
+
+def record_span(name, started_at, finished_at, trace_id=None, error=None, **attributes):
+    """
+    Exports a span for work timed elsewhere, such as a pipeline stage that
+    runs across several tasks. `started_at` and `finished_at` are datetimes.
+    """
+    recorded = Span(name=name, trace_id=trace_id or uuid.uuid4().hex, start=started_at.timestamp())
+    recorded.duration_ms = round((finished_at - started_at).total_seconds() * 1000, 1)
+    recorded.set(**attributes)
+    recorded.end(error)
+    return recorded
+
+
+def set_attributes(**attributes):
+    """
+    Adds attributes to the current span, if there is one.
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def record_model_usage(model, contents, response):
+    """
+    Adds the token counts and cost of a model response to the current span.
+    Counts the provider doesn't report are estimated from the text.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    response_tokens = getattr(usage, 'candidates_token_count', None)
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(contents if isinstance(contents, str) else str(contents))
+    if response_tokens is None:
+        response_tokens = estimate_tokens(getattr(response, 'text', '') or '')
+    cached_tokens = getattr(usage, 'cached_content_token_count', None) or 0
+    set_attributes(
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+        cost_usd=call_cost(model, prompt_tokens, response_tokens),
+    )
+    if cached_tokens:
+        set_attributes(cache_hit=True, cached_tokens=cached_tokens)
+
+
+# --- Export ---
+
+class JsonlExporter:
+    """
+    Appends finished spans to a JSON Lines file, one line per span. Each
+    span is a single write, so worker processes can share the file. Once
+    the file reaches `max_bytes` it is moved aside to `<path>.1`, replacing
+    the previous one, so at most twice `max_bytes` is kept.
+    """
+    def __init__(self, path, max_bytes=None):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + '.1')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, finished_span):
+        line = json.dumps(finished_span.as_dict(), default=str) + '\n'
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as spans:
+                spans.write(line)
+                size = spans.tell()
+            if self.max_bytes and size >= self.max_bytes:
+                # Another process may have rotated the file already.
+                try:
+                    os.replace(self.path, self.rotated_path)
+                except FileNotFoundError:
+                    pass
+
+    def load(self, since=None, limit=SUMMARY_MAX_SPANS):
+        """
+        Returns the most recent exported spans, oldest first, optionally
+        only those started at or after the datetime `since`.
+        """
+        recent = deque(maxlen=limit)
+        for path in (self.rotated_path, self.path):
+            if path.exists():
+                with open(path, encoding='utf-8') as spans:
+                    recent.extend(line for line in spans if line.strip())
+        loaded = [json.loads(line) for line in recent]
+        if since is not None:
+            loaded = [entry for entry in loaded if datetime.fromisoformat(entry['start']) >= since]
+        return loaded
+
+
+_exporters = {}
+_exporters_lock = threading.Lock()
+
+
+def get_exporter():
+    """
+    The exporter for settings.TELEMETRY_EXPORT_PATH, or None when export is off.
+    """
+    path = settings.TELEMETRY_EXPORT_PATH
+    if not path:
+        return None
+    with _exporters_lock:
+        if str(path) not in _exporters:
+            _exporters[str(path)] = JsonlExporter(path, max_bytes=settings.TELEMETRY_EXPORT_MAX_BYTES)
+        return _exporters[str(path)]
+
+
+def export(finished_span):
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    try:
+        exporter.export(finished_span)
+    except OSError as e:
+        print(f"Could not export span {finished_span.name}: {e}")
+
+
+# --- Summary ---
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def _timings(group):
+    durations = [entry['duration_ms'] for entry in group if entry['duration_ms'] is not None]
+    waits = [entry['attributes']['queue_wait_ms'] for entry in group if 'queue_wait_ms' in entry['attributes']]
+    return {
+        'count': len(group),
+        'errors': sum(1 for entry in group if entry['status'] == 'error'),
+        'p50_ms': percentile(durations, 0.5),
+        'p95_ms': percentile(durations, 0.95),
+        'total_ms': round(sum(durations), 1),
+        'queue_wait_p95_ms': percentile(waits, 0.95),
+    }
+
+
+def _usage(group):
+    totals = {'prompt_tokens': 0, 'response_tokens': 0, 'cost_usd': 0.0}
+    for entry in group:
+        for key in totals:
+            totals[key] += entry['attributes'].get(key) or 0
+    totals['cost_usd'] = round(totals['cost_usd'], 6)
+    totals['cache_hits'] = sum(1 for entry in group if entry['attributes'].get('cache_hit'))
+    return totals
+
+
+def _group_by(entries, *attributes):
+    """
+    Groups spans by the first of `attributes` they have.
+    """
+    groups = {}
+    for entry in entries:
+        key = next((entry['attributes'][name] for name in attributes if entry['attributes'].get(name) is not None), None)
+        if key is not None:
+            groups.setdefault(str(key), []).append(entry)
+    return groups
+
+
+def summarize(spans):
+    """
+    Aggregates exported spans for operators: time and queue wait per stage
+    and per task, and latency, tokens and cost per agent and per model.
+    Model calls made outside an agent are counted under their task.
+    """
+    by_name = {}
+    for entry in spans:
+        by_name.setdefault(entry['name'], []).append(entry)
+    calls = by_name.get('llm.call', [])
+    stages = {name: _timings(group) for name, group in _group_by(by_name.get('stage', []), 'stage').items()}
+    return {
+        'spans': len(spans),
+        'stages': stages,
+        'slowest_stage': max(stages, key=lambda name: stages[name]['p95_ms'] or 0, default=None),
+        'tasks': {name: _timings(group) for name, group in _group_by(by_name.get('task', []), 'task').items()},
+        'agents': {name: {**_timings(group), **_usage(group)} for name, group in _group_by(calls, 'agent', 'task').items()},
+        'models': {name: {**_timings(group), **_usage(group)} for name, group in _group_by(calls, 'model').items()},
+        'total_cost_usd': _usage(calls)['cost_usd'],
+    }
+
+
+def _labels(**labels):
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"') for key, value in labels.items()}
+    return ','.join(f'{key}="{value}"' for key, value in escaped.items())
+
+
+def render_prometheus(summary):
+    """
+    Renders a summary in the Prometheus text exposition format.
+    """
+    lines = [
+        '# HELP applaude_stage_duration_seconds Time spent in each pipeline stage task.',
+        '# TYPE applaude_stage_duration_seconds summary',
+    ]
+    for stage, timings in sorted(summary['stages'].items()):
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms')):
+            if timings[key] is not None:
+                lines.append(f"applaude_stage_duration_seconds{{{_labels(stage=stage, quantile=quantile)}}} {timings[key] / 1000}")
+        lines.append(f"applaude_stage_duration_seconds_sum{{{_labels(stage=stage)}}} {timings['total_ms'] / 1000}")
+        lines.append(f"applaude_stage_duration_seconds_count{{{_labels(stage=stage)}}} {timings['count']}")
+
+    metrics = [
+        ('applaude_llm_calls_total', 'counter', 'Model calls made.', lambda usage: usage['count']),
+        ('applaude_llm_errors_total', 'counter', 'Model calls that failed.', lambda usage: usage['errors']),
+        ('applaude_llm_cache_hits_total', 'counter', 'Model calls served from a context cache.', lambda usage: usage['cache_hits']),
+        ('applaude_llm_cost_usd_total', 'counter', 'List-price cost of model calls.', lambda usage: usage['cost_usd']),
+    ]
+    for name, kind, help_text, value in metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{{{_labels(model=model)}}} {value(usage)}" for model, usage in sorted(summary['models'].items())]
+
+    lines += ['# HELP applaude_llm_tokens_total Tokens sent to and received from models.', '# TYPE applaude_llm_tokens_total counter']
+    for model, usage in sorted(summary['models'].items()):
+        lines.append(f"applaude_llm_tokens_total{{{_labels(model=model, direction='prompt')}}} {usage['prompt_tokens']}")
+        lines.append(f"applaude_llm_tokens_total{{{_labels(model=model, direction='response')}}} {usage['response_tokens']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,1160 @@
+import hashlib
+import io
+import socket
+import tempfile
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from google.api_core import exceptions as google_exceptions
+import os
+import zipfile
+from datetime import timedelta
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from PIL import Image
+from apps.projects.models import Project, PipelineRun, StageRun, StepCheckpoint
+from apps.surveys.models import UserFeedback, AppRating, FeedbackSummary, FeedbackDigest
+from apps.testimonials.models import TestimonialRequestLog
+from .feedback_summarizer import update_feedback_digest, build_batches
+from .code_generation_agent import CodeGenAgent
+from .code_modules import build_artifact, module_input_hash, parse_code_files, plan_code_generation
+from .palette import PALETTE_SCHEMA, build_palette, contrast_ratio, image_colors, kmeans_colors, parse_palette_response, resolve_brand_palette, validate_palette
+from .prompt_builder import PromptBudgetExceeded, PromptBuilder
+from .site_crawler import BlockedAddress, SiteSnapshot, HttpCache, check_url, fetch, fetch_bytes, fetch_site, extract_css_colors
+from .code_templates import render_module
+from .admission import LocalAdmissionBackend, ModelLimits, RedisAdmissionBackend, acquire as admission_acquire, generate_with_admission
+from .benchmark import run_benchmark
+from .checkpoints import StepCheckpoints
+from .llm_replay import FakeModel, FixtureMissing, LatencyDistribution, prepare_model
+from .model_router import ModelRouteExhausted, Route, hedge_delay, record_latency, route_generate
+from .pipeline import PROJECT_PIPELINE, Pipeline, Stage, start_pipeline, mark_stage_started, mark_stage_completed, mark_stage_failed, mark_run_completed
+from .structured_output import IncrementalJsonParser, StructuredOutputError, json_generation_config, parse_structured
+from .telemetry import get_exporter, render_prometheus, span, summarize
+from .tasks import (
+    run_market_analysis, code_generation_workflow, merge_generated_code, generate_market_assets,
+    send_testimonial_requests, send_testimonial_batch,
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+User = get_user_model()
+
+class FakeSummarizer:
+    """
+    Stands in for get_ai_response and records every prompt it receives.
+    """
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return f"summary {len(self.prompts)}"
+
+class FeedbackSummarizerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='Digest Project', source_url='https://example.com')
+        self.summarize = FakeSummarizer()
+
+    def add_feedback(self, count, length=400):
+        for i in range(count):
+            UserFeedback.objects.create(project=self.project, user_identifier=f'u{i}', feedback_text='x' * length)
+
+    def test_batches_respect_token_budget(self):
+        entries = [(UserFeedback, None, 'y' * 400)] * 10
+        batches = build_batches(entries, token_budget=300)
+        self.assertTrue(all(tokens <= 300 for _, tokens in batches))
+        self.assertEqual(sum(len(batch) for batch, _ in batches), 10)
+
+    def test_only_new_feedback_is_summarized(self):
+        """
+        Ensure a second pass with no new feedback makes no model calls and a
+        later pass only sends the delta.
+        """
+        self.add_feedback(30)
+        AppRating.objects.create(project=self.project, user_identifier='r', rating=2, comment='Too slow')
+        AppRating.objects.create(project=self.project, user_identifier='s', rating=5)
+
+        first = update_feedback_digest(self.project, self.summarize, force=True)
+        self.assertTrue(first['digest_updated'])
+        self.assertFalse(UserFeedback.objects.filter(summary_batch__isnull=True).exists())
+        self.assertTrue(any('[2/5 stars] Too slow' in prompt for prompt in self.summarize.prompts))
+        calls_after_first = len(self.summarize.prompts)
+
+        update_feedback_digest(self.project, self.summarize, force=True)
+        self.assertEqual(len(self.summarize.prompts), calls_after_first)
+
+        self.add_feedback(1)
+        update_feedback_digest(self.project, self.summarize, force=True)
+        new_prompts = self.summarize.prompts[calls_after_first:]
+        # One map call for the new entry plus one digest merge.
+        self.assertEqual(len(new_prompts), 2)
+        self.assertEqual(new_prompts[0].count('- x'), 1)
+
+    def test_partial_batch_waits_for_more_feedback(self):
+        self.add_feedback(1, length=40)
+        result = update_feedback_digest(self.project, self.summarize)
+        self.assertEqual(result['batches'], 0)
+        self.assertEqual(self.summarize.prompts, [])
+
+    def test_hierarchical_reduce(self):
+        """
+        Ensure full levels are merged upward and the digest covers every entry.
+        """
+        # Each entry fills a batch on its own, giving one level-0 summary per entry.
+        self.add_feedback(17, length=4000)
+        update_feedback_digest(self.project, self.summarize, force=True, token_budget=1000)
+
+        self.assertEqual(FeedbackSummary.objects.filter(level=0).count(), 17)
+        self.assertEqual(FeedbackSummary.objects.filter(level=1).count(), 2)
+        roots = FeedbackSummary.objects.filter(merged_into__isnull=True)
+        self.assertEqual(roots.count(), 3)
+        self.assertEqual(FeedbackDigest.objects.get(project=self.project).item_count, 17)
+
+
+class SharedMarketAnalysisTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='partner@applaude.ai', password='password123')
+
+    @patch('agents.tasks.fetch_site', return_value=SiteSnapshot(extract={'title': 'Example'}, fingerprint='f' * 64))
+    @patch('agents.tasks.generate_market_assets', return_value=('Persona', {'primary': '#0062FF'}))
+    def test_projects_for_the_same_site_reuse_one_analysis(self, mock_generate, mock_fetch):
+        """
+        Ensure a second project for the same site is analyzed without any AI calls.
+        """
+        first = Project.objects.create(owner=self.user, name='First', source_url='https://www.example.com/')
+        second = Project.objects.create(owner=self.user, name='Second', source_url='https://example.com')
+        run_market_analysis.apply(args=[first.id])
+        run_market_analysis.apply(args=[second.id])
+
+        self.assertEqual(mock_generate.call_count, 1)
+        second.refresh_from_db()
+        self.assertEqual(second.status, Project.ProjectStatus.ANALYSIS_COMPLETE)
+        self.assertEqual(second.user_persona_document, 'Persona')
+        first.refresh_from_db()
+        self.assertEqual(second.site_analysis_id, first.site_analysis_id)
+
+        # A content change makes the stored analysis stale.
+        mock_fetch.return_value = SiteSnapshot(extract={'title': 'Example'}, fingerprint='e' * 64)
+        third = Project.objects.create(owner=self.user, name='Third', source_url='https://example.com')
+        run_market_analysis.apply(args=[third.id])
+        self.assertEqual(mock_generate.call_count, 2)
+
+    @patch('agents.tasks.fetch_site', return_value=SiteSnapshot(extract={'title': 'Example'}, fingerprint='f' * 64))
+    @patch('agents.tasks.generate_market_assets', side_effect=ValueError('model unavailable'))
+    def test_waiting_for_another_analysis_keeps_the_failure_retries(self, mock_generate, mock_fetch):
+        """
+        Ensure a project that polled for another worker's analysis still gets every retry when its own analysis fails.
+        """
+        project = Project.objects.create(owner=self.user, name='Waited', source_url='https://example.com')
+        result = run_market_analysis.apply(args=[project.id], kwargs={'analysis_waits': 5}, retries=5)
+        self.assertIsInstance(result.result, ValueError)
+        self.assertEqual(mock_generate.call_count, 1 + run_market_analysis.max_retries)
+
+
+FIXTURE_PAGES = {
+    '/': (
+        'text/html; charset=utf-8',
+        '<html><head><title>Sunrise Bakery</title>'
+        '<meta name="description" content="Fresh bread daily">'
+        '<meta name="theme-color" content="#E4572E">'
+        '<link rel="stylesheet" href="/site.css"><link rel="icon" href="/favicon.ico">'
+        '<style>#fab { color: #222222; } :root { --brand-primary: #e4572e; }</style></head>'
+        '<body style="background: #FFFDF8"><img src="/img/logo.png" alt="Sunrise logo">'
+        '<h1>Fresh bread, every morning</h1><script>var nonce = "x1";</script></body></html>'
+    ),
+    '/site.css': (
+        'text/css',
+        'a { color: #E4572E; } a:hover { color: rgb(228, 87, 46); } .muted { color: #fff0; } '
+        'button { background: #29335C; border-color: #29335c; }'
+    ),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves FIXTURE_PAGES with ETags and records every request it receives.
+    """
+    requests_seen = []
+
+    def do_GET(self):
+        content_type, body = FIXTURE_PAGES[self.path]
+        etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+        self.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(SITE_FETCH_ALLOW_PRIVATE=True)
+class SiteCrawlerTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FixtureHandler.requests_seen = []
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = HttpCache(self.cache_dir.name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_extracts_text_logo_and_colors(self):
+        snapshot = fetch_site(self.base_url + '/', cache=self.cache)
+        extract = snapshot.extract
+        self.assertEqual(extract['title'], 'Sunrise Bakery')
+        self.assertEqual(extract['description'], 'Fresh bread daily')
+        self.assertIn('Fresh bread, every morning', extract['text'])
+        self.assertNotIn('nonce', extract['text'])
+        self.assertEqual(extract['logo_url'], self.base_url + '/img/logo.png')
+        self.assertEqual(extract['theme_color'], '#e4572e')
+        self.assertEqual(extract['css_variables'], {'--brand-primary': '#e4572e'})
+        colors = {entry['color']: entry['count'] for entry in extract['css_colors']}
+        # Three uses across inline CSS and the stylesheet, in hex and rgb() form.
+        self.assertEqual(colors['#e4572e'], 3)
+        self.assertEqual(colors['#29335c'], 2)
+        self.assertNotIn('#ffffff', colors) # Fully transparent
+
+    def test_revalidates_with_conditional_requests(self):
+        """
+        Ensure a second fetch sends If-None-Match and is served from the disk cache on 304.
+        """
+        first = fetch(self.base_url + '/', cache=self.cache)
+        second = fetch(self.base_url + '/', cache=self.cache)
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(first.body, second.body)
+        self.assertIsNone(FixtureHandler.requests_seen[0][1])
+        self.assertIsNotNone(FixtureHandler.requests_seen[1][1])
+
+        snapshot = fetch_site(self.base_url + '/', cache=self.cache)
+        self.assertTrue(snapshot.from_cache)
+
+    def test_id_selectors_are_not_colors(self):
+        colors, _ = extract_css_colors(['#add { color: #123456; }'])
+        self.assertEqual([entry['color'] for entry in colors], ['#123456'])
+
+    def test_cache_evicts_old_entries_then_the_oldest_beyond_its_size(self):
+        cache = HttpCache(self.cache_dir.name, max_bytes=3000, max_age=3600)
+        now = time.time()
+        for index, age in enumerate((7200, 60, 30)):
+            url = f'https://example.com/{index}'
+            cache.put(url, {'encoding': 'utf-8'}, os.urandom(2000).hex())
+            for path in cache._paths(url):
+                os.utime(path, (now - age, now - age))
+
+        self.assertEqual(cache.prune(now=now), 2)
+        self.assertEqual([cache.get(f'https://example.com/{index}')[1] is not None for index in range(3)], [False, False, True])
+
+
+class SiteFetchGuardTests(TestCase):
+
+    def test_non_public_addresses_are_refused(self):
+        for url in ('http://127.0.0.1:8000/', 'http://169.254.169.254/latest/meta-data/', 'http://10.0.0.5/', 'http://[::1]/', 'file:///etc/passwd'):
+            with self.subTest(url=url), self.assertRaises(BlockedAddress):
+                check_url(url)
+        self.assertIsNone(fetch_site('http://localhost/'))
+        self.assertIsNone(fetch_bytes('http://192.168.1.1/logo.png'))
+
+    def test_every_redirect_hop_is_checked(self):
+        """
+        Ensure a public page redirecting to an internal address is refused before the second request.
+        """
+        session = Mock()
+        session.get.return_value = Mock(is_redirect=True, headers={'Location': 'http://169.254.169.254/latest/meta-data/'})
+        resolve = socket.getaddrinfo
+        public = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('93.184.216.34', 80))]
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        with patch('agents.site_crawler.socket.getaddrinfo', lambda host, *args, **kwargs: public if host == 'shop.example.com' else resolve(host, *args, **kwargs)):
+            with self.assertRaises(BlockedAddress):
+                fetch('http://shop.example.com/', cache=HttpCache(cache_dir.name), session=session)
+        self.assertEqual(session.get.call_count, 1)
+
+
+class PaletteEngineTests(TestCase):
+
+    def test_roles_from_css_variables_and_frequency(self):
+        """
+        Ensure a site with clear CSS signals gets a confident palette without the model.
+        """
+        extract = {
+            'theme_color': '#e4572e',
+            'css_variables': {'--brand-primary': '#e4572e', '--surface-bg': '#fffdf8'},
+            'css_colors': [
+                {'color': '#e4572e', 'count': 12},
+                {'color': '#333333', 'count': 9},
+                {'color': '#29335c', 'count': 6},
+                {'color': '#fffdf8', 'count': 4},
+            ],
+        }
+        ask_model = FakeSummarizer()
+        palette = resolve_brand_palette(extract, ask_model=ask_model)
+        self.assertEqual(palette, {
+            'primary': '#E4572E',
+            'secondary': '#29335C',
+            'text_light': '#FFFDF8',
+            'text_dark': '#333333',
+            'background': '#FFFDF8',
+        })
+        self.assertEqual(ask_model.prompts, [])
+        self.assertGreaterEqual(contrast_ratio(palette['text_dark'], palette['background']), 4.5)
+
+    def test_body_text_variable_is_not_the_background(self):
+        """
+        Ensure Bootstrap's --bs-body-color is read as text, not background.
+        """
+        extract = {'css_variables': {'--bs-primary': '#0d6efd', '--bs-body-color': '#212529', '--bs-body-bg': '#ffffff'}}
+        result = build_palette(extract)
+        self.assertEqual((result.palette['background'], result.palette['text_dark']), ('#FFFFFF', '#212529'))
+
+    def test_role_hints_match_whole_words(self):
+        """
+        Ensure a shade like --primary-dark is not read as text, while --on-primary still is.
+        """
+        extract = {'css_variables': {
+            '--primary': '#0d6efd', '--primary-dark': '#0a58ca', '--on-primary': '#ffffff', '--darkmode-toggle': '#121212',
+        }}
+        palette = build_palette(extract).palette
+        self.assertEqual(palette['primary'], '#0D6EFD')
+        self.assertNotIn(palette['text_dark'], ('#0A58CA', '#121212'))
+        self.assertEqual(palette['text_light'], '#FFFFFF')
+
+    def test_logo_colors_fill_in_an_inconclusive_palette(self):
+        logo = Image.new('RGB', (32, 32), (228, 87, 46))
+        logo.paste((41, 51, 92), (0, 0, 32, 12))
+        buffer = io.BytesIO()
+        logo.save(buffer, format='PNG')
+        self.assertEqual(image_colors(buffer.getvalue())[0][0], '#E4542C')
+        self.assertEqual(image_colors(b'not an image'), [])
+
+        extract = {'logo_url': 'https://example.com/logo.png', 'css_colors': [{'color': '#ffffff', 'count': 1}]}
+        fetched = []
+        palette = resolve_brand_palette(extract, fetch_image=lambda url: fetched.append(url) or buffer.getvalue())
+        self.assertEqual(fetched, ['https://example.com/logo.png'])
+        self.assertEqual(palette['primary'], '#E4542C')
+
+    def test_unreadable_dark_text_is_not_confident(self):
+        extract = {
+            'theme_color': '#e4572e',
+            'css_variables': {'--brand-primary': '#e4572e', '--accent': '#29335c', '--page-bg': '#212529', '--text-color': '#212529'},
+        }
+        self.assertFalse(build_palette(extract).confident)
+
+    def test_low_confidence_asks_the_model_with_candidates(self):
+        extract = {'css_colors': [{'color': '#eeeeee', 'count': 3}]}
+        ask_model = lambda prompt, generation_config: (
+            'Here you go: {"primary": "#0062ff", "secondary": "#FFC107", "text_light": "#fff", '
+            '"text_dark": "#212121", "background": "#F5F5F5"}'
+        )
+        self.assertFalse(build_palette(extract).confident)
+        palette = resolve_brand_palette(extract, ask_model=ask_model)
+        self.assertEqual(palette['primary'], '#0062FF')
+        self.assertEqual(palette['text_light'], '#FFFFFF')
+
+    def test_invalid_model_output_falls_back_to_local_draft(self):
+        extract = {'css_colors': [{'color': '#3366cc', 'count': 2}]}
+        result = build_palette(extract)
+        self.assertFalse(result.confident)
+        palette = resolve_brand_palette(extract, ask_model=lambda prompt, generation_config: '{"primary": "blue"}')
+        self.assertEqual(palette, result.palette)
+
+    def test_validate_palette(self):
+        with self.assertRaises(ValueError):
+            validate_palette({'primary': '#000000'})
+        with self.assertRaises(ValueError):
+            parse_palette_response('no json here')
+
+    def test_kmeans_is_deterministic(self):
+        pixels = [((250, 80, 40), 60), ((245, 85, 45), 30), ((20, 30, 90), 40), ((255, 255, 255), 70)]
+        clusters = kmeans_colors(pixels, clusters=3)
+        self.assertEqual(clusters, kmeans_colors(list(reversed(pixels)), clusters=3))
+        # The two orange shades merge into the largest cluster.
+        self.assertEqual(clusters[0], ('#F8522A', 0.45))
+        self.assertAlmostEqual(sum(share for _, share in clusters), 1.0)
+
+
+class StructuredOutputTests(TestCase):
+    PALETTE = '{"primary": "#1A73E8", "secondary": "#F9AB00", "text_light": "#FFFFFF", "text_dark": "#202124", "background": "#F8F9FA"}'
+
+    def test_parser_stops_once_the_object_is_complete(self):
+        """
+        Ensure streamed chunks after the closing brace are never read.
+        """
+        text = 'Reasoning first.\n```json\n' + self.PALETTE + '\n```\nThe primary color {is} blue.'
+        chunks = [text[index:index + 7] for index in range(0, len(text), 7)]
+        consumed = []
+
+        def stream():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        palette = parse_structured(stream(), PALETTE_SCHEMA)
+        self.assertEqual(palette['primary'], '#1A73E8')
+        self.assertLess(len(consumed), len(chunks))
+
+    def test_members_are_validated_as_they_arrive(self):
+        parser = IncrementalJsonParser(PALETTE_SCHEMA)
+        self.assertFalse(parser.feed('{"primary": "blue", "secon'))
+        self.assertEqual(len(parser.errors), 1)
+        with self.assertRaises(StructuredOutputError):
+            parse_structured('{"primary": "blue", "secondary": "#FFFFFF"}', PALETTE_SCHEMA)
+
+    def test_malformed_output_is_repaired_locally(self):
+        repaired = parse_palette_response(
+            "```json\n{'primary': '#1a73e8', secondary: '#F9AB00', 'text_light': '#FFF', "
+            "'text_dark': '#202124', 'background': '#F8F9FA',}\n```"
+        )
+        self.assertEqual(repaired['primary'], '#1A73E8')
+        self.assertEqual(repaired['text_light'], '#FFFFFF')
+        # Output cut off mid-object keeps the members that arrived.
+        truncated = parse_structured('{"name": "Ada", "tags": ["a", "b"', {'type': 'object'})
+        self.assertEqual(truncated, {'name': 'Ada', 'tags': ['a', 'b']})
+
+    def test_generation_config_only_sends_what_the_provider_understands(self):
+        config = json_generation_config(PALETTE_SCHEMA)
+        self.assertEqual(config['response_mime_type'], 'application/json')
+        self.assertNotIn('additionalProperties', config['response_schema'])
+        self.assertEqual(config['response_schema']['properties']['primary'], {'type': 'string', 'description': 'A #RRGGBB hex color.'})
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PromptBuilderTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(email='builder@applaude.ai', password='password123')
+
+    def make_project(self, name, persona='# Persona\nBusy parents who shop on their phones.', **kwargs):
+        return Project.objects.create(
+            owner=self.user, name=name, source_url=f'https://{name.lower()}.example.com',
+            user_persona_document=persona,
+            brand_palette={'primary': '#0062FF', 'secondary': '#FFC107', 'text_light': '#FFFFFF',
+                           'text_dark': '#212121', 'background': '#F5F5F5'},
+            **kwargs
+        )
+
+    def make_agent(self):
+        with patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'}):
+            return CodeGenAgent()
+
+    def test_repeated_instruction_lines_are_dropped(self):
+        instruction = 'The code must be clean, scalable, and follow platform-specific best practices.'
+        prompt = (
+            PromptBuilder(budget=1000)
+            .add('rules', f'## Rules\n{instruction}', static=True)
+            .add('task', f'## Rules\n* {instruction}\nBuild the home screen.')
+            .build()
+        )
+        self.assertEqual(prompt.dropped_duplicates, 1)
+        self.assertEqual(prompt.text.count(instruction), 1)
+        # Short lines such as headings are kept.
+        self.assertEqual(prompt.text.count('## Rules'), 2)
+
+    def test_json_is_serialized_compactly(self):
+        prompt = PromptBuilder(budget=100).add_json('palette', {'primary': '#0062FF', 'sizes': [1, 2]}).build()
+        self.assertEqual(prompt.body, '{"primary":"#0062FF","sizes":[1,2]}')
+
+    def test_oversized_section_is_summarized_once(self):
+        calls = []
+        def summarize(prompt):
+            calls.append(prompt)
+            return '# Persona\nParents who shop on their phones.'
+        persona = '# Persona\n' + '\n'.join(f'Detail number {i} about the shopper.' for i in range(200))
+
+        for _ in range(2):
+            prompt = PromptBuilder(budget=5000, summarize=summarize).add('persona', persona, max_tokens=100).build()
+            self.assertEqual(prompt.body, '# Persona\nParents who shop on their phones.')
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_summary_falls_back_to_extract(self):
+        def summarize(prompt):
+            raise RuntimeError('model unavailable')
+        persona = '# Persona\n' + '\n'.join(f'Detail number {i} about the shopper.' for i in range(200))
+        prompt = PromptBuilder(budget=5000, summarize=summarize).add('persona', persona, max_tokens=100).build()
+        self.assertLessEqual(prompt.section_tokens['persona'], 100)
+        self.assertTrue(prompt.body.startswith('# Persona'))
+
+    def test_budget_is_enforced(self):
+        with self.assertRaises(PromptBudgetExceeded):
+            PromptBuilder(budget=10).add('rules', 'x' * 400, static=True).build()
+        prompt = (
+            PromptBuilder(budget=60)
+            .add('rules', 'x' * 100, static=True)
+            .add('persona', '\n'.join(f'line {i} ' + 'y' * 30 for i in range(20)), compressible=True)
+            .build()
+        )
+        self.assertLessEqual(prompt.total_tokens, 60)
+
+    def test_code_gen_prompt_shares_static_prefix(self):
+        agent = self.make_agent()
+        first = agent.build_prompt(self.make_project('Alpha', app_type=Project.AppType.IOS))
+        second = agent.build_prompt(self.make_project('Beta', enable_pmf_survey=True))
+        self.assertEqual(first.prefix_hash, second.prefix_hash)
+        self.assertIn('https://alpha.example.com', first.body)
+        self.assertNotIn('example.com', first.prefix)
+        # Question lists are only sent for enabled surveys.
+        self.assertNotIn('pmf_survey_questions', first.section_tokens)
+        self.assertIn('How would you feel if you could no longer use', second.body)
+        self.assertIn('"primary":"#0062FF"', first.body)
+        self.assertLessEqual(first.total_tokens, 12000)
+
+
+MODULE_RESPONSE = """
+Here are the files.
+
+```kotlin
+// File: ui/theme/Color.kt
+package com.applaude.app.ui.theme
+val PrimaryColor = Color(0xFF0062FF)
+```
+
+```kotlin
+// File: ../../etc/passwd
+nope
+```
+
+```swift
+// File: /Theme/ColorPalette.swift
+import SwiftUI
+```
+"""
+
+class ParallelCodeGenerationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='parallel@applaude.ai', password='password123')
+        self.project = Project.objects.create(
+            owner=self.user, name='Parallel', source_url='https://parallel.example.com',
+            app_type=Project.AppType.BOTH, brand_palette={'primary': '#0062FF'},
+        )
+
+    def test_both_fans_out_per_platform_and_module(self):
+        self.assertEqual(len(plan_code_generation('BOTH')), 8)
+        self.assertEqual({platform for platform, _ in plan_code_generation('IOS')}, {'IOS'})
+        workflow = code_generation_workflow(self.project)
+        # Only the screens go to the model; the rest is rendered from templates.
+        self.assertEqual(sorted(task.args[1:] for task in workflow.tasks), [('ANDROID', 'screens'), ('IOS', 'screens')])
+        self.assertEqual(workflow.body.name, merge_generated_code.name)
+        self.assertEqual(len(workflow.body.kwargs['rendered_modules']), 6)
+
+    def test_parse_code_files(self):
+        files = parse_code_files(MODULE_RESPONSE)
+        self.assertEqual(set(files), {'ui/theme/Color.kt', 'Theme/ColorPalette.swift'})
+        self.assertTrue(files['ui/theme/Color.kt'].startswith('package com.applaude.app.ui.theme'))
+
+    def test_module_prompt_is_scoped(self):
+        with patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'}), override_settings(CACHES=LOCMEM_CACHE):
+            prompt = CodeGenAgent().build_prompt(self.project, platform='IOS', module='survey')
+        self.assertIn('Generate ONLY the feedback engine:', prompt.body)
+        self.assertIn('Swift with SwiftUI', prompt.body)
+        self.assertNotIn('survey', prompt.static_sections)
+
+    def test_merge_builds_one_artifact(self):
+        parts = [
+            {'platform': 'IOS', 'module': 'theme', 'files': {'Theme/ColorPalette.swift': 'import SwiftUI\n'}},
+            {'platform': 'ANDROID', 'module': 'theme', 'files': {'ui/theme/Color.kt': 'package theme\n'}},
+            {'platform': 'ANDROID', 'module': 'screens', 'files': {'ui/theme/Color.kt': 'duplicate\n', 'MainActivity.kt': 'class MainActivity\n'}},
+        ]
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            result = merge_generated_code(parts, str(self.project.id))
+            self.project.refresh_from_db()
+            self.assertEqual(result, str(self.project.id))
+            with zipfile.ZipFile(os.path.join(media_root, self.project.generated_code_path)) as archive:
+                self.assertEqual(
+                    sorted(archive.namelist()),
+                    ['android/MainActivity.kt', 'android/ui/theme/Color.kt', 'ios/Theme/ColorPalette.swift', 'manifest.json'],
+                )
+                # The module that owns a file wins over a later duplicate.
+                self.assertEqual(archive.read('android/ui/theme/Color.kt').decode(), 'package theme\n')
+
+    def test_agent_builds_the_whole_app_in_process(self):
+        with patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'}):
+            agent = CodeGenAgent()
+
+        def screens(project, platform, module):
+            return {'Screens/Home.txt': f'{platform} home\n'}
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                patch.object(agent, 'generate_module', side_effect=screens) as generate_module:
+            path = agent.execute(self.project.id)
+            self.project.refresh_from_db()
+            self.assertEqual(self.project.generated_code_path, path)
+            with zipfile.ZipFile(os.path.join(media_root, path)) as archive:
+                self.assertEqual(archive.read('ios/Screens/Home.txt').decode(), 'IOS home\n')
+                self.assertIn('android/app/src/main/java/com/applaude/app/ui/theme/Color.kt', archive.namelist())
+        # Only the screens went to the model.
+        self.assertEqual(sorted(call.args[1:] for call in generate_module.call_args_list), [('ANDROID', 'screens'), ('IOS', 'screens')])
+
+    def build_previous_artifact(self):
+        parts = [
+            {'platform': platform, 'module': module,
+             'input_hash': module_input_hash(self.project, platform, module),
+             'files': {f'{module}/File.txt': f'{platform} {module}\n'}}
+            for platform, module in plan_code_generation('BOTH')
+        ]
+        self.project.generated_code_path = build_artifact(self.project.id, parts)
+        self.project.save()
+
+    def test_only_modules_with_changed_inputs_are_regenerated(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            self.build_previous_artifact()
+            # A palette change only touches templated modules: no model calls.
+            self.project.brand_palette = {'primary': '#FF0000'}
+            self.project.save()
+            workflow = code_generation_workflow(self.project)
+            self.assertEqual(workflow.name, merge_generated_code.name)
+            self.assertEqual(len(workflow.kwargs['reused_modules']), 2)
+
+            merge_generated_code([], str(self.project.id), **workflow.kwargs)
+            self.project.refresh_from_db()
+            with zipfile.ZipFile(os.path.join(media_root, self.project.generated_code_path)) as archive:
+                self.assertEqual(archive.read('ios/screens/File.txt').decode(), 'IOS screens\n')
+                color_file = archive.read('android/app/src/main/java/com/applaude/app/ui/theme/Color.kt').decode()
+                self.assertIn('val PrimaryColor = Color(0xFFFF0000)', color_file)
+
+            self.project.user_persona_document = 'New persona'
+            self.project.save()
+            workflow = code_generation_workflow(self.project)
+            self.assertEqual(sorted(task.args[1:] for task in workflow.tasks), [('ANDROID', 'screens'), ('IOS', 'screens')])
+
+
+class CodeTemplateTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='templates@applaude.ai', password='password123')
+
+    def test_templates_render_project_data(self):
+        project = Project.objects.create(
+            owner=self.user, name='Shop "$Best"', source_url='https://shop.example.com',
+            brand_palette={'primary': '#0062ff'}, enable_pmf_survey=True,
+        )
+        android = render_module(project, 'ANDROID', 'survey')
+        questions = android['app/src/main/java/com/applaude/app/ui/feedback/SurveyQuestions.kt']
+        self.assertIn('"PMF" to listOf(', questions)
+        self.assertNotIn('"UX" to', questions)
+        self.assertIn('const val UX_ENABLED = false', questions)
+        overlay = android['app/src/main/java/com/applaude/app/ui/feedback/SurveyOverlay.kt']
+        # The name is escaped for a Kotlin string literal, not for HTML.
+        self.assertIn('Help us improve Shop \\"\\$Best\\""', overlay)
+
+        palette = render_module(project, 'IOS', 'theme')['Theme/ColorPalette.swift']
+        self.assertIn('static let primaryBrand = Color(red: 0.000, green: 0.384, blue: 1.000)', palette)
+        api = render_module(project, 'IOS', 'networking')['Services/AppApiService.swift']
+        self.assertIn(f'static let projectId = "{project.id}"', api)
+        self.assertIn('"api/surveys/submit/rating/"', api)
+
+
+class PipelineEngineTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='pipeline@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='Pipeline', source_url='https://pipeline.example.com')
+
+    def start(self, **kwargs):
+        with self.captureOnCommitCallbacks() as callbacks:
+            run = start_pipeline(self.project.id, **kwargs)
+        return run, callbacks
+
+    def complete(self, run, *stages):
+        for stage in stages:
+            mark_stage_started(run.id, stage)
+            mark_stage_completed(run.id, stage, str(self.project.id))
+
+    def test_independent_stages_share_a_level(self):
+        self.assertEqual(
+            PROJECT_PIPELINE.levels(PROJECT_PIPELINE.required_stages('deployment')),
+            [['market_analysis'], ['design'], ['code_generation'], ['qa', 'security_scan'], ['deployment']],
+        )
+        self.assertEqual(PROJECT_PIPELINE.required_stages('design'), ['market_analysis', 'design'])
+
+    def test_invalid_pipelines_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Pipeline('cyclic', [Stage('a', 'a', depends_on=('b',)), Stage('b', 'b', depends_on=('a',))])
+        with self.assertRaises(ValueError):
+            Pipeline('missing', [Stage('a', 'a', depends_on=('nope',))])
+
+    @patch('celery.canvas.Signature.apply_async')
+    def test_run_resumes_at_the_failed_stage(self, apply_async):
+        run, callbacks = self.start(target='design')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(run.stages.count(), 2)
+        self.complete(run, 'market_analysis', 'design')
+        mark_run_completed(run.id)
+
+        # After payment: the analysis is reused, code generation fails.
+        run, _ = self.start()
+        self.assertEqual(
+            dict(run.stages.values_list('stage', 'status')),
+            {'market_analysis': 'SKIPPED', 'design': 'SKIPPED', 'code_generation': 'PENDING',
+             'qa': 'PENDING', 'security_scan': 'PENDING', 'deployment': 'PENDING'},
+        )
+        mark_stage_started(run.id, 'code_generation')
+        mark_stage_failed(run.id, 'code_generation', 'model unavailable')
+        run.refresh_from_db()
+        self.assertEqual(run.status, PipelineRun.RunStatus.FAILED)
+        self.assertEqual(run.error, 'code_generation: model unavailable')
+
+        # The retry picks up at code generation.
+        run, _ = self.start()
+        pending = set(run.stages.filter(status=StageRun.StageStatus.PENDING).values_list('stage', flat=True))
+        self.assertEqual(pending, {'code_generation', 'qa', 'security_scan', 'deployment'})
+
+    @patch('celery.canvas.Signature.apply_async')
+    def test_rerun_of_a_stage_invalidates_downstream_checkpoints(self, apply_async):
+        run, _ = self.start()
+        self.complete(run, *PROJECT_PIPELINE.required_stages('deployment'))
+        run = mark_run_completed(run.id)
+        self.assertEqual(set(run.timing_breakdown()), set(PROJECT_PIPELINE.stages))
+
+        # Nothing to do: the run completes without dispatching anything.
+        run, callbacks = self.start()
+        self.assertEqual(run.status, PipelineRun.RunStatus.COMPLETE)
+        self.assertEqual(len(callbacks), 0)
+
+        # Re-running analysis from scratch makes every later checkpoint stale.
+        self.start(target='design', resume=False)
+        run, _ = self.start()
+        self.assertFalse(run.stages.filter(status=StageRun.StageStatus.SKIPPED).exists())
+
+
+class StepCheckpointTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='steps@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='Steps', source_url='https://steps.example.com')
+
+    @patch('agents.tasks.get_ai_response', return_value='Persona')
+    @patch('agents.tasks.resolve_brand_palette', side_effect=[ConnectionError('palette failed'), {'primary': '#0062FF'}])
+    def test_retry_skips_the_steps_that_succeeded(self, mock_palette, mock_ai):
+        """
+        Ensure a retry after a failed palette reuses the persona it already paid for.
+        """
+        checkpoints = StepCheckpoints(self.project.id, 'market_analysis')
+        with self.assertRaises(ConnectionError):
+            generate_market_assets(self.project.source_url, {'title': 'Steps'}, checkpoints=checkpoints)
+        self.assertEqual(
+            generate_market_assets(self.project.source_url, {'title': 'Steps'}, checkpoints=checkpoints),
+            ('Persona', {'primary': '#0062FF'}),
+        )
+        self.assertEqual(mock_ai.call_count, 1)
+
+        # New site content changes the inputs, so both steps run again.
+        mock_palette.side_effect = None
+        mock_palette.return_value = {'primary': '#111111'}
+        generate_market_assets(self.project.source_url, {'title': 'Changed'}, checkpoints=checkpoints)
+        self.assertEqual(mock_ai.call_count, 2)
+        self.assertEqual(StepCheckpoint.objects.filter(project=self.project).count(), 2)
+
+
+TEST_MODEL_LIMITS = {'test-model': ModelLimits(requests_per_minute=2, tokens_per_minute=1000)}
+
+
+@patch.dict('agents.admission.MODEL_LIMITS', TEST_MODEL_LIMITS)
+class AdmissionControllerTests(TestCase):
+
+    def setUp(self):
+        self.backend = LocalAdmissionBackend()
+
+    def assert_admission_behaviour(self, backend):
+        self.assertTrue(backend.acquire('models/test-model', 100, 'busy', now=1000).allowed)
+        self.assertTrue(backend.acquire('test-model', 100, 'busy', now=1000).allowed)
+        decision = backend.acquire('test-model', 100, 'quiet', now=1001)
+        self.assertFalse(decision.allowed)
+        self.assertAlmostEqual(decision.retry_after, 29, places=0)
+        self.assertFalse(backend.acquire('test-model', 100, 'quiet', now=1029).allowed)
+
+        # Capacity is back, but the project that has not been served yet goes first.
+        self.assertFalse(backend.acquire('test-model', 100, 'busy', now=1031).allowed)
+        self.assertTrue(backend.acquire('test-model', 100, 'quiet', now=1031.5).allowed)
+        self.assertEqual(backend.utilization('test-model', now=1031.5)['waiting'], 1)
+
+        # Calls also draw their estimated tokens from the per-minute budget.
+        decision = backend.acquire('test-model', 900, 'busy', now=1070)
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.tokens_available, 100)
+
+        # A rate limit error halves the rate and pauses every caller.
+        self.assertEqual(backend.throttled('test-model', 10, now=1100), 0.5)
+        decision = backend.acquire('test-model', 10, 'other', now=1101)
+        self.assertFalse(decision.allowed)
+        self.assertAlmostEqual(decision.retry_after, 9, places=0)
+
+    def test_local_backend(self):
+        self.assert_admission_behaviour(LocalAdmissionBackend())
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_backend(self):
+        self.assert_admission_behaviour(RedisAdmissionBackend(client=fakeredis.FakeRedis()))
+
+    def test_rate_limit_errors_slow_every_caller_down(self):
+        class ThrottledModel:
+            model_name = 'models/test-model'
+
+            def generate_content(self, contents):
+                raise google_exceptions.ResourceExhausted('quota exceeded')
+
+        with patch('agents.admission.get_admission_backend', return_value=self.backend):
+            with self.assertRaises(google_exceptions.ResourceExhausted):
+                generate_with_admission(ThrottledModel(), 'prompt', project_id='a')
+
+        state = self.backend.utilization('test-model')
+        self.assertEqual(state['scale'], 0.5)
+        decision = self.backend.acquire('test-model', 10, 'b')
+        self.assertFalse(decision.allowed)
+        self.assertGreater(decision.retry_after, 5)
+
+
+class FakeModelResponse:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModel:
+    """
+    Stands in for a GenerativeModel; each call sleeps for the next delay in
+    `delays` (or fails if it is an exception) and answers with its number.
+    A call slower than its request timeout fails once the timeout passes.
+    """
+    def __init__(self, model_name, delays, calls, timeouts=None):
+        self.model_name = model_name
+        self.delays = delays
+        self.calls = calls
+        self.timeouts = timeouts if timeouts is not None else []
+
+    def generate_content(self, contents, request_options=None):
+        self.calls.append(self.model_name)
+        delay = self.delays[min(len(self.calls) - 1, len(self.delays) - 1)]
+        if isinstance(delay, Exception):
+            raise delay
+        timeout = (request_options or {}).get('timeout')
+        self.timeouts.append((self.model_name, timeout))
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise google_exceptions.DeadlineExceeded('request timed out')
+        time.sleep(delay)
+        return FakeModelResponse(f"{self.model_name} call {len(self.calls)}")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@patch('agents.model_router.MIN_HEDGE_DELAY', 0)
+class ModelRouterTests(TestCase):
+
+    def setUp(self):
+        patcher = patch('agents.admission.get_admission_backend', return_value=LocalAdmissionBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.calls = []
+        self.timeouts = []
+
+    def models(self, delays):
+        return lambda model_name: ScriptedModel(model_name, delays[model_name], self.calls, self.timeouts)
+
+    def test_hedged_request_wins_over_a_slow_primary(self):
+        route = Route('test', ('primary-model',), timeout=5, hedge_delay=0.1)
+        response = route_generate(route, 'prompt', build_model=self.models({'primary-model': [2, 0]}))
+        self.assertEqual(response.text, 'primary-model call 2')
+        self.assertEqual(self.calls, ['primary-model', 'primary-model'])
+
+    def test_timeout_falls_back_to_the_next_tier(self):
+        route = Route('test', ('slow-model', 'fast-model'), timeout=0.3, hedge_delay=0, hedge=False)
+        response = route_generate(route, 'prompt', build_model=self.models({'slow-model': [1], 'fast-model': [0]}))
+        self.assertEqual(response.text, 'fast-model call 2')
+
+        failing = self.models({'slow-model': [ValueError('bad request')], 'fast-model': [ValueError('bad request')]})
+        with self.assertRaises(ModelRouteExhausted):
+            route_generate(route, 'prompt', build_model=failing)
+
+    def test_requests_time_out_at_the_tier_deadline(self):
+        """
+        Ensure a call the tier gives up on is cut off at its deadline instead of holding a worker thread.
+        """
+        route = Route('test', ('slow-model', 'fast-model'), timeout=0.3, hedge_delay=0, hedge=False)
+        started = time.monotonic()
+        response = route_generate(route, 'prompt', build_model=self.models({'slow-model': [5], 'fast-model': [0]}))
+        self.assertEqual(response.text, 'fast-model call 2')
+        timeouts = dict(self.timeouts)
+        self.assertTrue(0 < timeouts['slow-model'] <= 0.3)
+        self.assertTrue(0 < timeouts['fast-model'] <= 0.3)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_hedge_delay_follows_the_observed_p95(self):
+        route = Route('test', ('primary-model',), timeout=60, hedge_delay=10)
+        self.assertEqual(hedge_delay(route, 'primary-model'), 10)
+        for seconds in range(1, 21):
+            record_latency('models/primary-model', seconds)
+        self.assertEqual(hedge_delay(route, 'primary-model'), 19)
+
+    def slow_admission(self, seconds, model_names):
+        real_acquire = admission_acquire
+
+        def acquire(model_name, *args, **kwargs):
+            if model_name in model_names:
+                time.sleep(seconds)
+            return real_acquire(model_name, *args, **kwargs)
+        return patch('agents.admission.acquire', side_effect=acquire)
+
+    def test_latency_excludes_the_admission_wait(self):
+        route = Route('test', ('primary-model',), timeout=5, hedge_delay=0, hedge=False)
+        with self.slow_admission(0.3, {'primary-model'}), patch('agents.model_router.record_latency') as recorded:
+            route_generate(route, 'prompt', build_model=self.models({'primary-model': [0]}))
+        self.assertLess(recorded.call_args.args[1], 0.2)
+
+    def test_no_hedge_while_the_primary_waits_for_admission(self):
+        route = Route('test', ('primary-model',), timeout=5, hedge_delay=0.05)
+        with self.slow_admission(0.3, {'primary-model'}):
+            response = route_generate(route, 'prompt', build_model=self.models({'primary-model': [0]}))
+        self.assertEqual(response.text, 'primary-model call 1')
+        self.assertEqual(self.calls, ['primary-model'])
+
+    @patch.dict('agents.admission.MODEL_LIMITS', {'primary-model': ModelLimits(requests_per_minute=1, tokens_per_minute=100_000)})
+    def test_hedge_is_skipped_without_free_capacity(self):
+        route = Route('test', ('primary-model',), timeout=5, hedge_delay=0.05)
+        response = route_generate(route, 'prompt', build_model=self.models({'primary-model': [0.3]}))
+        self.assertEqual(response.text, 'primary-model call 1')
+        self.assertEqual(self.calls, ['primary-model'])
+
+    def test_abandoned_requests_never_reach_the_model(self):
+        """
+        Ensure a request still waiting for admission when its tier times out is dropped instead of sent.
+        """
+        route = Route('test', ('slow-model', 'fast-model'), timeout=0.1, hedge_delay=0, hedge=False)
+        with self.slow_admission(0.3, {'slow-model'}):
+            response = route_generate(route, 'prompt', build_model=self.models({'slow-model': [0], 'fast-model': [0]}))
+            time.sleep(0.4)
+        self.assertEqual(response.text, 'fast-model call 1')
+        self.assertEqual(self.calls, ['fast-model'])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TelemetryTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(TELEMETRY_EXPORT_PATH=os.path.join(directory.name, 'spans.jsonl'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = patch('agents.admission.get_admission_backend', return_value=LocalAdmissionBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def spans(self):
+        return {entry['name']: entry for entry in get_exporter().load()}
+
+    def test_model_calls_are_traced_under_their_task(self):
+        """
+        Ensure a model call's span records model, tokens and cost, and nests under the task that made it.
+        """
+        route = Route('test', ('gemini-1.5-flash',), timeout=5, hedge_delay=0, hedge=False)
+        build_model = lambda model_name: ScriptedModel(model_name, [0], [])
+        with span('task', task='run_design_analysis', project_id='p-1'):
+            route_generate(route, 'Describe the persona.', project_id='p-1', build_model=build_model)
+
+        spans = self.spans()
+        call, route_span, task = spans['llm.call'], spans['llm.route'], spans['task']
+        self.assertEqual(call['parent_id'], route_span['span_id'])
+        self.assertEqual(route_span['parent_id'], task['span_id'])
+        self.assertEqual({call['trace_id'], route_span['trace_id']}, {task['trace_id']})
+        self.assertEqual(call['attributes']['model'], 'gemini-1.5-flash')
+        self.assertEqual(call['attributes']['task'], 'run_design_analysis')
+        self.assertEqual(call['attributes']['project_id'], 'p-1')
+        self.assertGreater(call['attributes']['response_tokens'], 0)
+        self.assertGreater(call['attributes']['cost_usd'], 0)
+        self.assertIn('admission_wait_ms', call['attributes'])
+
+    def test_failed_work_marks_its_span(self):
+        with self.assertRaises(ValueError):
+            with span('task', task='run_qa_check'):
+                raise ValueError('boom')
+        self.assertEqual(self.spans()['task']['status'], 'error')
+
+    def test_stage_spans_record_queue_wait(self):
+        user = User.objects.create_user(email='telemetry@applaude.ai', password='password123')
+        project = Project.objects.create(owner=user, name='Telemetry', source_url='https://telemetry.example.com')
+        with patch('celery.canvas.Signature.apply_async'):
+            run = start_pipeline(project.id, target='design')
+        mark_stage_started(run.id, 'market_analysis')
+        mark_stage_completed(run.id, 'market_analysis', str(project.id))
+        mark_stage_started(run.id, 'design')
+        mark_stage_failed(run.id, 'design', 'model unavailable')
+
+        stages = {entry['attributes']['stage']: entry for entry in get_exporter().load() if entry['name'] == 'stage'}
+        self.assertEqual(stages['market_analysis']['status'], 'ok')
+        self.assertEqual(stages['design']['error'], 'model unavailable')
+        self.assertEqual(stages['design']['trace_id'], project.id.hex)
+        self.assertGreaterEqual(stages['design']['attributes']['queue_wait_ms'], 0)
+
+    def test_span_file_is_rotated_at_its_size_cap(self):
+        exporter = get_exporter()
+        exporter.max_bytes = 1000
+        self.addCleanup(setattr, exporter, 'max_bytes', None)
+        for i in range(20):
+            with span('task', task=f'task-{i}'):
+                pass
+        self.assertTrue(exporter.rotated_path.exists())
+        self.assertLess(exporter.path.stat().st_size if exporter.path.exists() else 0, 1000)
+        # The spans moved aside still count towards the summary.
+        tasks = [entry['attributes']['task'] for entry in exporter.load()]
+        self.assertEqual(tasks[-1], 'task-19')
+        self.assertGreater(len(tasks), 1)
+
+    def test_summary_finds_the_slowest_stage(self):
+        def entry(name, duration_ms, **attributes):
+            return {'name': name, 'duration_ms': duration_ms, 'status': 'ok', 'attributes': attributes}
+
+        summary = summarize([
+            entry('stage', 500, stage='design'),
+            entry('stage', 9000, stage='code_generation', queue_wait_ms=1200),
+            entry('llm.call', 800, model='gemini-1.5-pro', agent='Design', prompt_tokens=1000, response_tokens=200, cost_usd=0.00225),
+            entry('llm.call', 300, model='gemini-1.5-flash', task='run_market_analysis', prompt_tokens=500, response_tokens=100, cache_hit=True),
+        ])
+        self.assertEqual(summary['slowest_stage'], 'code_generation')
+        self.assertEqual(summary['stages']['code_generation']['queue_wait_p95_ms'], 1200)
+        self.assertEqual(set(summary['agents']), {'Design', 'run_market_analysis'})
+        self.assertEqual(summary['models']['gemini-1.5-flash']['cache_hits'], 1)
+
+        metrics = render_prometheus(summary)
+        self.assertIn('applaude_stage_duration_seconds_count{stage="code_generation"} 1', metrics)
+        self.assertIn('applaude_llm_tokens_total{model="gemini-1.5-pro",direction="prompt"} 1000', metrics)
+
+class TestimonialMailerTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = User.objects.create_user(email='happy@applaude.ai', password='password123', first_name='Ada')
+        self.other = User.objects.create_user(email='quiet@applaude.ai', password='password123')
+        self.recent = self.completed_project(self.user, 'Recent', days_ago=1)
+        self.older = self.completed_project(self.other, 'Older', days_ago=30)
+        self.completed_project(self.user, 'Between', days_ago=10)
+        Project.objects.create(owner=self.user, name='Unfinished', source_url='https://unfinished.example.com')
+
+    def completed_project(self, owner, name, days_ago):
+        project = Project.objects.create(owner=owner, name=name, source_url=f'https://{name.lower()}.example.com')
+        Project.objects.filter(id=project.id).update(
+            status=Project.ProjectStatus.COMPLETED, updated_at=self.now - timedelta(days=days_ago, hours=1),
+        )
+        return project
+
+    def run_mailer(self):
+        with patch('agents.tasks.group') as dispatched, patch('agents.tasks.timezone.now', return_value=self.now):
+            queued = send_testimonial_requests()
+        batches = [signature.args[0] for signature in dispatched.call_args.args[0]] if dispatched.called else []
+        return queued, batches
+
+    def test_requests_are_found_in_one_query_and_sent_over_one_connection(self):
+        """
+        Ensure candidates in every window are logged in two queries, then emailed in one batch over a single connection.
+        """
+        with self.assertNumQueries(2):
+            queued, batches = self.run_mailer()
+        self.assertEqual(queued, 2)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(
+            set(TestimonialRequestLog.objects.values_list('project_id', 'delay_days')),
+            {(self.recent.id, 1), (self.older.id, 30)},
+        )
+
+        with patch('agents.tasks.get_connection', wraps=get_connection) as connections:
+            self.assertEqual(send_testimonial_batch(batches[0]), 2)
+        self.assertEqual(connections.call_count, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['happy@applaude.ai', 'quiet@applaude.ai'])
+        greeting = next(message for message in mail.outbox if message.to == ['happy@applaude.ai']).body.splitlines()[0]
+        self.assertEqual(greeting, 'Hi Ada,')
+        self.assertFalse(TestimonialRequestLog.objects.filter(sent_at__isnull=True).exists())
+
+    def test_requests_are_never_sent_twice(self):
+        queued, batches = self.run_mailer()
+        self.assertEqual(self.run_mailer(), (0, []))
+        send_testimonial_batch(batches[0])
+        send_testimonial_batch(batches[0])
+        self.assertEqual(len(mail.outbox), queued)
+
+class LlmReplayTests(TestCase):
+
+    def test_recorded_responses_replay_without_the_provider(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fixtures = os.path.join(directory, 'fixtures.jsonl.gz')
+            calls = []
+            build_model = lambda model_name: ScriptedModel(model_name, [0], calls)
+            with override_settings(LLM_MODE='record', LLM_FIXTURE_PATH=fixtures):
+                recorded = prepare_model(build_model, 'models/gemini-1.5-pro').generate_content('Describe the persona.')
+            with override_settings(LLM_MODE='replay', LLM_FIXTURE_PATH=fixtures):
+                model = prepare_model(build_model, 'gemini-1.5-pro')
+                self.assertEqual(model.generate_content('Describe the persona.').text, recorded.text)
+                with self.assertRaises(FixtureMissing):
+                    model.generate_content('A prompt that was never recorded.')
+            self.assertEqual(len(calls), 1)
+
+    def test_fake_model_answers_each_agent_prompt(self):
+        model = FakeModel('gemini-1.5-pro', latency=LatencyDistribution(0.001, 0.005))
+        agent = CodeGenAgent.__new__(CodeGenAgent)
+        agent.agent_persona, agent.goal = 'Persona', 'Goal'
+        user = User.objects.create_user(email='fake@applaude.ai', password='password123')
+        project = Project.objects.create(owner=user, name='Fake', source_url='https://fake.example.com')
+        with override_settings(CACHES=LOCMEM_CACHE):
+            prompt = agent.build_prompt(project, platform='IOS', module='screens')
+        files = parse_code_files(model.generate_content(prompt.body).text)
+        self.assertIn('Sources/Views/HomeView.swift', files)
+        self.assertEqual(model.generate_content('Describe the persona.').text, model.generate_content('Describe the persona.').text)
+
+
+class PipelineBenchmarkTests(TransactionTestCase):
+
+    def test_benchmark_runs_every_stage_offline(self):
+        """
+        Ensure the benchmark drives projects through every stage on the in-memory broker.
+        """
+        with tempfile.TemporaryDirectory() as directory, override_settings(TELEMETRY_EXPORT_PATH=os.path.join(directory, 'spans.jsonl')):
+            result = run_benchmark(projects=2, concurrency=1, latency=(0.01, 0.02), timeout=120, keep=True)
+            summary = summarize(get_exporter().load())
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual({name: stage['count'] for name, stage in result['stages'].items()}, dict.fromkeys(PROJECT_PIPELINE.order, 2))
+        self.assertGreater(result['queries_per_project'], 0)
+        # The worker traced every stage and task, with the time each task spent queued.
+        self.assertEqual({name: stage['count'] for name, stage in summary['stages'].items()}, dict.fromkeys(PROJECT_PIPELINE.order, 2))
+        self.assertIsNotNone(summary['tasks']['run_market_analysis']['queue_wait_p95_ms'])
+        self.assertGreater(summary['total_cost_usd'], 0)
@@ -195,6 +195,32 @@ CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Feedback search: embeddings are optional and cost one model call per entry
+FEEDBACK_EMBEDDINGS_ENABLED = os.environ.get('FEEDBACK_EMBEDDINGS_ENABLED', 'False').lower() in ('true', '1', 't')
+
+# Website fetch stage: compressed snapshots of partner sites, revalidated with conditional GETs
+SITE_CACHE_DIR = os.environ.get('SITE_CACHE_DIR', BASE_DIR / 'site_cache')
+# Entries older than this, then the oldest ones beyond the size cap, are evicted
+SITE_CACHE_MAX_BYTES = int(os.environ.get('SITE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+SITE_CACHE_MAX_AGE = int(os.environ.get('SITE_CACHE_MAX_AGE', 60 * 60 * 24 * 30))
+# Sites on loopback, private or link-local addresses are refused unless this is on (local fixture sites only)
+SITE_FETCH_ALLOW_PRIVATE = os.environ.get('SITE_FETCH_ALLOW_PRIVATE', 'False').lower() in ('true', '1', 't')
+
+# Backend the generated mobile apps submit surveys, ratings and feedback to
+GENERATED_APP_API_BASE_URL = os.environ.get('GENERATED_APP_API_BASE_URL', 'https://applaude-backend-x4p6.onrender.com/')
+
+# How agents reach the model: 'live', 'record' or 'replay' (prompt/response fixtures), or 'fake'
+LLM_MODE = os.environ.get('LLM_MODE', 'live')
+LLM_FIXTURE_PATH = os.environ.get('LLM_FIXTURE_PATH', BASE_DIR / 'llm_fixtures' / 'fixtures.jsonl.gz')
+# Median and 95th percentile latency of the fake model, in seconds
+LLM_FAKE_LATENCY = tuple(float(value) for value in os.environ.get('LLM_FAKE_LATENCY', '0.5,2').split(','))
+
+# Spans of stages, tasks and model calls (see agents.telemetry), one JSON line each; off unless set.
+# The file is local to each host, so the telemetry endpoints only summarize the spans of the host serving them.
+TELEMETRY_EXPORT_PATH = os.environ.get('TELEMETRY_EXPORT_PATH', '')
+# Size at which the span file is rotated; one rotated file is kept
+TELEMETRY_EXPORT_MAX_BYTES = int(os.environ.get('TELEMETRY_EXPORT_MAX_BYTES', 64 * 1024 * 1024))
+
 # Cache Configuration
 CACHES = {
     'default': {
@@ -20,6 +20,9 @@ urlpatterns = [
     # API endpoints
     path('api/users/', include('apps.users.urls')),
     path('api/projects/', include('apps.projects.urls')),
+    path('api/surveys/', include('apps.surveys.urls')),
+    path('api/payments/', include('apps.payments.urls')),
+    path('api/partners/', include('apps.api.urls')),
 
     # API Schema (Swagger/Redoc)
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
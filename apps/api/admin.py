@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import APIKey
+from .models import APIKey, ApiClient, ProjectBatch
 
 @admin.register(APIKey)
 class APIKeyAdmin(admin.ModelAdmin):
@@ -10,4 +10,36 @@ class APIKeyAdmin(admin.ModelAdmin):
     fieldsets = (
         ('API Key Information', {'fields': ('user', 'name', 'key', 'is_active')}),
         ('Timestamps', {'fields': ('created_at',)}),
-    )
\ No newline at end of file
+    )
+
+@admin.register(ApiClient)
+class ApiClientAdmin(admin.ModelAdmin):
+    list_display = ('business_name', 'user', 'key_prefix', 'plan', 'is_active', 'apps_created_count', 'created_at')
+    list_filter = ('plan', 'is_active', 'created_at')
+    search_fields = ('business_name', 'user__email', 'key_prefix')
+    readonly_fields = ('key_prefix', 'apps_created_count', 'created_at', 'updated_at')
+    actions = ('issue_new_key', 'deactivate_clients')
+    fieldsets = (
+        ('API Client Information', {'fields': ('user', 'business_name', 'website_link', 'plan', 'is_active')}),
+        ('Key & Usage', {'fields': ('key_prefix', 'apps_created_count')}),
+        ('Timestamps', {'fields': ('created_at', 'updated_at')}),
+    )
+
+    @admin.action(description="Issue a new API key")
+    def issue_new_key(self, request, queryset):
+        for api_client in queryset:
+            key = api_client.issue_key()
+            self.message_user(request, f"New key for {api_client.business_name} (shown once): {key}")
+
+    @admin.action(description="Deactivate selected clients")
+    def deactivate_clients(self, request, queryset):
+        # Saved one by one so every client's cached key is invalidated.
+        for api_client in queryset:
+            api_client.deactivate()
+
+@admin.register(ProjectBatch)
+class ProjectBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'api_client', 'total', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('api_client__business_name',)
+    readonly_fields = ('api_client', 'projects', 'total', 'created_at')
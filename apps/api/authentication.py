@@ -1,23 +1,23 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from .models import ApiClient
+from .keys import resolve_api_key
 
 class APIKeyAuthentication(BaseAuthentication):
     """
     Custom authentication class for API key validation.
-    Authenticates against the `X-API-Key` header.
+    Authenticates against the `X-API-Key` header. The resolved client is
+    cached, so warm requests cost no database queries.
     """
     def authenticate(self, request):
         api_key = request.headers.get('X-API-Key')
         if not api_key:
             return None # No API key provided
 
-        try:
-            api_client = ApiClient.objects.get(api_key=api_key, is_active=True)
-        except ApiClient.DoesNotExist:
+        api_client = resolve_api_key(api_key)
+        if api_client is None or not api_client.user.is_active:
             raise AuthenticationFailed('Invalid API Key or Inactive Client')
 
-        return (api_client.user, None) # Return user and no auth token
+        return (api_client.user, api_client) # The client is exposed as request.auth
 
     def authenticate_header(self, request):
         return 'X-API-Key'
@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import secrets
+import threading
+from cachetools import TTLCache
+from django.core.cache import cache
+
+KEY_SCHEME = 'apl'
+KEY_PREFIX_BYTES = 6
+# In-process entries cannot be invalidated from other workers, so they stay short-lived.
+LOCAL_CACHE_TTL = 15
+SHARED_CACHE_TTL = 300
+# Unknown prefixes are remembered briefly so invalid keys do not hit the database.
+NEGATIVE_CACHE_TTL = 30
+
+_MISSING = 'missing'
+_local_cache = TTLCache(maxsize=4096, ttl=LOCAL_CACHE_TTL)
+_local_lock = threading.Lock()
+
+
+def generate_api_key():
+    """
+    Returns a new (plaintext_key, prefix) pair.
+    Keys look like `apl_<prefix>_<secret>`; the prefix is indexed for lookup.
+    """
+    prefix = secrets.token_hex(KEY_PREFIX_BYTES)
+    return f"{KEY_SCHEME}_{prefix}_{secrets.token_urlsafe(32)}", prefix
+
+
+def hash_api_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def parse_key_prefix(key):
+    parts = key.split('_', 2)
+    if len(parts) != 3 or parts[0] != KEY_SCHEME or len(parts[1]) != KEY_PREFIX_BYTES * 2:
+        return None
+    return parts[1]
+
+
+def _cache_key(prefix):
+    return f"api-client:{prefix}"
+
+
+def invalidate_api_key(prefix):
+    with _local_lock:
+        _local_cache.pop(prefix, None)
+    cache.delete(_cache_key(prefix))
+
+
+def _load_client(prefix):
+    """
+    Returns the active ApiClient (with its user) for a prefix, or the _MISSING marker,
+    looking in process memory, then the shared cache, then the database.
+    """
+    from .models import ApiClient
+
+    with _local_lock:
+        client = _local_cache.get(prefix)
+    if client is not None:
+        return client
+
+    client = cache.get(_cache_key(prefix))
+    if client is None:
+        try:
+            client = ApiClient.objects.select_related('user').get(key_prefix=prefix, is_active=True)
+            cache.set(_cache_key(prefix), client, timeout=SHARED_CACHE_TTL)
+        except ApiClient.DoesNotExist:
+            client = _MISSING
+            cache.set(_cache_key(prefix), client, timeout=NEGATIVE_CACHE_TTL)
+
+    with _local_lock:
+        _local_cache[prefix] = client
+    return client
+
+
+def resolve_api_key(key):
+    """
+    Resolves a plaintext API key to its active ApiClient, or None.
+    Warm lookups are served from memory without touching the database.
+    """
+    prefix = parse_key_prefix(key)
+    if prefix is None:
+        return None
+    client = _load_client(prefix)
+    if isinstance(client, str):
+        return None
+    if not hmac.compare_digest(client.key_hash, hash_api_key(key)):
+        return None
+    return client
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiClient',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('business_name', models.CharField(max_length=255)),
+                ('website_link', models.URLField(max_length=500)),
+                ('key_prefix', models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True)),
+                ('key_hash', models.CharField(blank=True, editable=False, max_length=64)),
+                ('is_active', models.BooleanField(default=False)),
+                ('apps_created_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='api_client', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'API Client',
+                'verbose_name_plural': 'API Clients',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='APIKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(editable=False, max_length=40, unique=True)),
+                ('name', models.CharField(help_text="A descriptive name for the API key, e.g., 'My Production Server'.", max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'API Key',
+                'verbose_name_plural': 'API Keys',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_api_client_plan'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('api_client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='api.apiclient')),
+                ('projects', models.ManyToManyField(related_name='api_batches', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Project Batch',
+                'verbose_name_plural': 'Project Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
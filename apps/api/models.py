@@ -1,7 +1,11 @@
 import uuid
 import secrets
 from django.db import models
+from django.db.models import Count
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.conf import settings
+from .keys import generate_api_key as generate_client_key, hash_api_key, invalidate_api_key
 
 def generate_api_key():
     """
@@ -35,3 +39,112 @@ class APIKey(models.Model):
         verbose_name_plural = "API Keys"
         ordering = ['-created_at']
 
+class ApiClient(models.Model):
+    """
+    A business partner that creates projects through the partner API.
+    Only a short lookup prefix and a SHA-256 hash of the key are stored;
+    the plaintext key is shown once, when it is issued.
+    """
+    class Plan(models.TextChoices):
+        STARTER = 'STARTER', 'Starter'
+        GROWTH = 'GROWTH', 'Growth'
+        ENTERPRISE = 'ENTERPRISE', 'Enterprise'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_client')
+    business_name = models.CharField(max_length=255)
+    website_link = models.URLField(max_length=500)
+    key_prefix = models.CharField(max_length=16, unique=True, blank=True, null=True, editable=False)
+    key_hash = models.CharField(max_length=64, blank=True, editable=False)
+    is_active = models.BooleanField(default=False)
+    plan = models.CharField(max_length=20, choices=Plan.choices, default=Plan.STARTER)
+    apps_created_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Drop cached lookups so deactivation applies immediately.
+        if self.key_prefix:
+            invalidate_api_key(self.key_prefix)
+
+    def issue_key(self):
+        """
+        Generates a new key, replacing any previous one, and returns the
+        plaintext. It cannot be recovered later.
+        """
+        previous_prefix = self.key_prefix
+        plaintext, prefix = generate_client_key()
+        self.key_prefix = prefix
+        self.key_hash = hash_api_key(plaintext)
+        self.save()
+        if previous_prefix:
+            invalidate_api_key(previous_prefix)
+        return plaintext
+
+    def deactivate(self):
+        self.is_active = False
+        self.save()
+
+    def __str__(self):
+        return f"API Client {self.business_name} ({self.user.email})"
+
+    class Meta:
+        verbose_name = "API Client"
+        verbose_name_plural = "API Clients"
+        ordering = ['-created_at']
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_inactive_user_keys(sender, instance, **kwargs):
+    """
+    Cached clients carry their user, so deactivating a user drops their
+    key from the cache rather than leaving it usable until it expires.
+    """
+    if instance.is_active:
+        return
+    prefix = ApiClient.objects.filter(user=instance).values_list('key_prefix', flat=True).first()
+    if prefix:
+        invalidate_api_key(prefix)
+
+class ProjectBatch(models.Model):
+    """
+    A set of projects created by an API partner in one bulk request.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    api_client = models.ForeignKey(ApiClient, on_delete=models.CASCADE, related_name='batches')
+    projects = models.ManyToManyField('projects.Project', related_name='api_batches')
+    total = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def progress(self):
+        """
+        Aggregates the status of every project in the batch with one query.
+        Batches run up to the design analysis, so a project counts as
+        completed once its design is done, or if it has been built since.
+        """
+        from apps.projects.models import Project
+
+        statuses = Project.ProjectStatus
+        finished = statuses.values[statuses.values.index(statuses.DESIGN_COMPLETE):statuses.values.index(statuses.COMPLETED) + 1]
+        status_counts = dict(
+            self.projects.order_by().values_list('status').annotate(count=Count('id'))
+        )
+        completed = sum(status_counts.get(status, 0) for status in finished)
+        failed = status_counts.get(statuses.FAILED, 0)
+        return {
+            'batch_id': str(self.id),
+            'total': self.total,
+            'completed': completed,
+            'failed': failed,
+            'in_progress': self.total - completed - failed,
+            'status_counts': status_counts,
+            'done': completed + failed >= self.total,
+        }
+
+    def __str__(self):
+        return f"Batch {self.id} ({self.total} projects) for {self.api_client.business_name}"
+
+    class Meta:
+        verbose_name = "Project Batch"
+        verbose_name_plural = "Project Batches"
+        ordering = ['-created_at']
@@ -0,0 +1,24 @@
+from agents.pipeline import ANALYSIS_TARGET, start_pipeline, start_pipelines
+
+# Upper bound on pipelines started per second by one bulk request, so a large
+# batch trickles into the AI workers instead of flooding them at once.
+BULK_DISPATCH_RATE = 5
+
+
+def start_project_pipeline(project_id):
+    """
+    Runs the pre-payment stages (market and design analysis) for a new project.
+    """
+    return start_pipeline(project_id, target=ANALYSIS_TARGET)
+
+
+def start_project_pipelines(project_ids, rate=BULK_DISPATCH_RATE):
+    """
+    Dispatches the pipelines of a batch as one Celery group, staggering their
+    start so that at most `rate` begin per second.
+    """
+    project_ids = list(project_ids)
+    return start_pipelines(
+        project_ids, target=ANALYSIS_TARGET,
+        countdowns=[index // rate for index in range(len(project_ids))],
+    )
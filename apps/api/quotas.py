@@ -0,0 +1,339 @@
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from rest_framework.throttling import BaseThrottle
+from .serializers import MAX_BULK_PROJECTS
+
+USAGE_KEY = 'api-usage:pending'
+
+
+@dataclass(frozen=True)
+class PlanLimits:
+    """
+    Limits applied to every client on a plan.
+
+    burst / refill_per_second: token bucket that absorbs short spikes.
+    window_limit / window_seconds: sliding window cap per client.
+    plan_window_limit: sliding window cap shared by all clients on the plan,
+        protecting the AI pipeline from a whole tier at once (None = no cap).
+    """
+    burst: int
+    refill_per_second: float
+    window_limit: int
+    window_seconds: int = 3600
+    plan_window_limit: int = None
+
+
+PLAN_LIMITS = {
+    'STARTER': PlanLimits(burst=5, refill_per_second=5 / 60, window_limit=60, plan_window_limit=2000),
+    'GROWTH': PlanLimits(burst=20, refill_per_second=30 / 60, window_limit=600, plan_window_limit=10000),
+    'ENTERPRISE': PlanLimits(burst=100, refill_per_second=120 / 60, window_limit=5000),
+}
+
+
+@dataclass(frozen=True)
+class QuotaDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int
+    retry_after: int
+
+    def headers(self):
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(self.reset_after),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+# KEYS: token bucket hash, client window zset, plan window zset
+# ARGV: now_ms, burst, refill_per_ms, window_limit, window_ms, plan_window_limit (0 = none), member, cost
+CONSUME_SCRIPT = """
+local now = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local refill = tonumber(ARGV[3])
+local limit = tonumber(ARGV[4])
+local window = tonumber(ARGV[5])
+local plan_limit = tonumber(ARGV[6])
+local cost = tonumber(ARGV[8])
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'ts'))
+if tokens == nil or updated == nil then
+    tokens = burst
+    updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * refill)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+local used = redis.call('ZCARD', KEYS[2])
+local plan_used = 0
+if plan_limit > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - window)
+    plan_used = redis.call('ZCARD', KEYS[3])
+end
+
+local allowed = 0
+local retry = 0
+if tokens >= 1 and used + cost <= limit and (plan_limit <= 0 or plan_used + cost <= plan_limit) then
+    allowed = 1
+    tokens = tokens - 1
+    used = used + cost
+    for i = 1, cost do
+        redis.call('ZADD', KEYS[2], now, ARGV[7] .. ':' .. i)
+        if plan_limit > 0 then
+            redis.call('ZADD', KEYS[3], now, ARGV[7] .. ':' .. i)
+        end
+    end
+    redis.call('PEXPIRE', KEYS[2], window)
+    if plan_limit > 0 then
+        redis.call('PEXPIRE', KEYS[3], window)
+    end
+else
+    if tokens < 1 then
+        retry = math.max(retry, math.ceil((1 - tokens) / refill))
+    end
+    if used + cost > limit then
+        local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+        retry = math.max(retry, oldest[2] and tonumber(oldest[2]) + window - now or window)
+    end
+    if plan_limit > 0 and plan_used + cost > plan_limit then
+        local oldest = redis.call('ZRANGE', KEYS[3], 0, 0, 'WITHSCORES')
+        retry = math.max(retry, oldest[2] and tonumber(oldest[2]) + window - now or window)
+    end
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / refill) + 1000)
+
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, limit - used, reset, retry}
+"""
+
+# Hands back the pending usage counts and clears them in one step.
+DRAIN_SCRIPT = """
+local entries = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return entries
+"""
+
+
+def _seconds(milliseconds):
+    return max(0, math.ceil(milliseconds / 1000))
+
+
+class RedisQuotaBackend:
+    """
+    Enforces quotas with Lua scripts so the check and the update are one
+    atomic step across every web worker.
+    """
+    def __init__(self, client=None):
+        if client is None:
+            from django_redis import get_redis_connection
+            client = get_redis_connection('default')
+        self.client = client
+        self._consume = client.register_script(CONSUME_SCRIPT)
+        self._drain = client.register_script(DRAIN_SCRIPT)
+
+    def consume(self, client_id, plan, limits, now=None, cost=1):
+        now_ms = int((time.time() if now is None else now) * 1000)
+        allowed, remaining, reset, retry = self._consume(
+            keys=[f'api-quota:bucket:{client_id}', f'api-quota:window:{client_id}', f'api-quota:plan:{plan}'],
+            args=[
+                now_ms, limits.burst, limits.refill_per_second / 1000, limits.window_limit,
+                limits.window_seconds * 1000, limits.plan_window_limit or 0, f'{now_ms}:{uuid.uuid4().hex}', cost,
+            ],
+        )
+        return QuotaDecision(
+            allowed=bool(allowed), limit=limits.window_limit, remaining=max(0, remaining),
+            reset_after=_seconds(reset), retry_after=_seconds(retry),
+        )
+
+    def record_usage(self, client_id, amount=1):
+        self.client.hincrby(USAGE_KEY, str(client_id), amount)
+
+    def drain_usage(self):
+        entries = self._drain(keys=[USAGE_KEY])
+        return {
+            (key.decode() if isinstance(key, bytes) else key): int(value)
+            for key, value in zip(entries[::2], entries[1::2])
+        }
+
+
+class LocalQuotaBackend:
+    """
+    Same algorithms in process memory, for local runs without Redis.
+    Limits are only enforced per process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._windows = defaultdict(deque)
+        self._usage = defaultdict(int)
+
+    def _trim(self, window, now, window_seconds):
+        while window and window[0] <= now - window_seconds:
+            window.popleft()
+
+    def consume(self, client_id, plan, limits, now=None, cost=1):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(client_id, (limits.burst, now))
+            tokens = min(limits.burst, tokens + max(0, now - updated) * limits.refill_per_second)
+            window = self._windows[('client', client_id)]
+            plan_window = self._windows[('plan', plan)]
+            self._trim(window, now, limits.window_seconds)
+            self._trim(plan_window, now, limits.window_seconds)
+
+            window_full = len(window) + cost > limits.window_limit
+            plan_full = limits.plan_window_limit and len(plan_window) + cost > limits.plan_window_limit
+            allowed = tokens >= 1 and not window_full and not plan_full
+            retry = 0
+            if allowed:
+                tokens -= 1
+                window.extend([now] * cost)
+                if limits.plan_window_limit:
+                    plan_window.extend([now] * cost)
+            else:
+                if tokens < 1:
+                    retry = max(retry, (1 - tokens) / limits.refill_per_second)
+                if window_full:
+                    retry = max(retry, window[0] + limits.window_seconds - now if window else limits.window_seconds)
+                if plan_full:
+                    retry = max(retry, plan_window[0] + limits.window_seconds - now if plan_window else limits.window_seconds)
+            self._buckets[client_id] = (tokens, now)
+            reset = window[0] + limits.window_seconds - now if window else limits.window_seconds
+
+        return QuotaDecision(
+            allowed=allowed, limit=limits.window_limit, remaining=max(0, limits.window_limit - len(window)),
+            reset_after=math.ceil(max(0, reset)), retry_after=math.ceil(max(0, retry)),
+        )
+
+    def record_usage(self, client_id, amount=1):
+        with self._lock:
+            self._usage[str(client_id)] += amount
+
+    def drain_usage(self):
+        with self._lock:
+            usage, self._usage = dict(self._usage), defaultdict(int)
+        return usage
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_quota_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+                _backend = RedisQuotaBackend()
+            else:
+                _backend = LocalQuotaBackend()
+        return _backend
+
+
+def check_quota(api_client, now=None, cost=1):
+    """
+    Consumes one request from the client's quota. The request takes one
+    token from the burst bucket and `cost` places in the sliding windows,
+    so a bulk request counts once per project it creates.
+
+    Returns:
+        A QuotaDecision describing whether the request may proceed.
+    """
+    limits = PLAN_LIMITS.get(api_client.plan, PLAN_LIMITS['STARTER'])
+    return get_quota_backend().consume(str(api_client.pk), api_client.plan, limits, now=now, cost=cost)
+
+
+def record_usage(api_client, amount=1):
+    """
+    Counts created apps in the quota store; flush_usage() writes them to the DB.
+    """
+    get_quota_backend().record_usage(api_client.pk, amount)
+
+
+def flush_usage():
+    """
+    Adds the pending usage counts to ApiClient.apps_created_count with F()
+    expressions. Counts are put back if the database write fails.
+
+    Returns:
+        The number of clients updated.
+    """
+    from .models import ApiClient
+
+    backend = get_quota_backend()
+    usage = backend.drain_usage()
+    if not usage:
+        return 0
+    try:
+        with transaction.atomic():
+            for client_id, amount in usage.items():
+                ApiClient.objects.filter(pk=client_id).update(apps_created_count=F('apps_created_count') + amount)
+    except Exception:
+        for client_id, amount in usage.items():
+            backend.record_usage(client_id, amount)
+        raise
+    return len(usage)
+
+
+class ApiClientQuotaThrottle(BaseThrottle):
+    """
+    Throttles requests authenticated by an API key according to the client's plan.
+    The decision is kept on the request so the view can emit rate-limit headers.
+    """
+    def allow_request(self, request, view):
+        from .models import ApiClient
+
+        if not isinstance(request.auth, ApiClient):
+            return True
+        self.decision = check_quota(request.auth, cost=self.cost(request))
+        request.quota_decision = self.decision
+        return self.decision.allowed
+
+    def cost(self, request):
+        return 1
+
+    def wait(self):
+        return self.decision.retry_after
+
+
+class BulkProjectQuotaThrottle(ApiClientQuotaThrottle):
+    """
+    Charges a bulk request one quota place per project it asks for, so
+    batching cannot get around the per-client limits.
+    """
+    def cost(self, request):
+        entries = request.data.get('projects') if hasattr(request.data, 'get') else None
+        if not isinstance(entries, list):
+            return 1
+        return min(max(len(entries), 1), MAX_BULK_PROJECTS)
+
+
+class RateLimitHeadersMixin:
+    """
+    Adds X-RateLimit-* (and Retry-After when throttled) headers to responses.
+    """
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        decision = getattr(request, 'quota_decision', None)
+        if decision is not None:
+            for header, value in decision.headers().items():
+                response[header] = value
+        return response
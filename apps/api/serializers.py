@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from apps.projects.models import Project
 
+MAX_BULK_PROJECTS = 500 # Largest batch accepted by the bulk endpoint
+
 class ApiClientCreateSerializer(serializers.Serializer):
     """
     Serializer for validating the creation of a new API Client.
@@ -18,3 +20,22 @@ class APIProjectCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = ['source_url', 'app_type']
+        extra_kwargs = {'source_url': {'required': True, 'allow_null': False, 'allow_blank': False}}
+
+class BulkProjectCreateSerializer(serializers.Serializer):
+    """
+    Validates every entry of a bulk project request in one pass.
+    """
+    projects = APIProjectCreateSerializer(many=True, allow_empty=False, max_length=MAX_BULK_PROJECTS)
+
+    def validate_projects(self, entries):
+        seen = set()
+        duplicates = set()
+        for entry in entries:
+            source_url = entry['source_url']
+            if source_url in seen:
+                duplicates.add(source_url)
+            seen.add(source_url)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate source URLs: {', '.join(sorted(duplicates))}")
+        return entries
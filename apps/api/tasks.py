@@ -0,0 +1,12 @@
+from celery import shared_task
+from .quotas import flush_usage
+
+@shared_task(name="flush_api_usage")
+def flush_api_usage():
+    """
+    A periodic Celery task that writes the partners' pending usage counts
+    to ApiClient.apps_created_count in one batch.
+    """
+    updated = flush_usage()
+    if updated:
+        print(f"Flushed API usage for {updated} client(s).")
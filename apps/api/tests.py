@@ -0,0 +1,291 @@
+from unittest import skipUnless
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from . import quotas
+from .authentication import APIKeyAuthentication
+from apps.projects.models import Project
+from .keys import _local_cache
+from .models import ApiClient, ProjectBatch
+from .quotas import PLAN_LIMITS, PlanLimits, LocalQuotaBackend, RedisQuotaBackend, flush_usage
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class APIKeyAuthenticationTests(TestCase):
+
+    def setUp(self):
+        _local_cache.clear()
+        self.user = User.objects.create_user(email='partner@applaude.ai', password='password123')
+        self.api_client = ApiClient.objects.create(
+            user=self.user,
+            business_name='Partner Inc',
+            website_link='https://partner.example.com',
+            is_active=True
+        )
+        self.key = self.api_client.issue_key()
+        self.factory = APIRequestFactory()
+        self.auth = APIKeyAuthentication()
+
+    def authenticate(self, key):
+        request = self.factory.post('/api/projects/create/', HTTP_X_API_KEY=key)
+        return self.auth.authenticate(request)
+
+    def test_key_is_stored_hashed(self):
+        self.api_client.refresh_from_db()
+        self.assertNotIn(self.key, (self.api_client.key_prefix, self.api_client.key_hash))
+        self.assertTrue(self.key.startswith(f'apl_{self.api_client.key_prefix}_'))
+
+    def test_warm_authentication_needs_no_queries(self):
+        """
+        Ensure only the first request for a key reaches the database.
+        """
+        user, api_client = self.authenticate(self.key)
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):
+            user, api_client = self.authenticate(self.key)
+        self.assertEqual(api_client.pk, self.api_client.pk)
+
+    def test_wrong_secret_is_rejected(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.key[:-4] + 'abcd')
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('not-a-key')
+
+    def test_deactivation_invalidates_cache(self):
+        self.authenticate(self.key)
+        self.api_client.deactivate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.key)
+
+    def test_deactivating_the_user_invalidates_cache(self):
+        self.authenticate(self.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.key)
+
+    def test_rotating_key_revokes_old_key(self):
+        self.authenticate(self.key)
+        new_key = self.api_client.issue_key()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.key)
+        user, _ = self.authenticate(new_key)
+        self.assertEqual(user, self.user)
+
+
+class QuotaBackendTests(TestCase):
+
+    limits = PlanLimits(burst=3, refill_per_second=1, window_limit=5, window_seconds=60, plan_window_limit=5)
+
+    def assert_quota_behaviour(self, backend):
+        decisions = [backend.consume('client-a', 'STARTER', self.limits, now=1000) for _ in range(4)]
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        self.assertEqual(decisions[2].remaining, 2)
+        # The bucket refills at one token per second.
+        self.assertEqual(decisions[3].retry_after, 1)
+
+        allowed = [backend.consume('client-a', 'STARTER', self.limits, now=1000 + t).allowed for t in (2, 3, 4)]
+        self.assertEqual(allowed, [True, True, False])
+        denied = backend.consume('client-a', 'STARTER', self.limits, now=1010)
+        self.assertFalse(denied.allowed)
+        # The sliding window frees a slot once the first request is 60s old.
+        self.assertEqual(denied.retry_after, 50)
+        self.assertTrue(backend.consume('client-a', 'STARTER', self.limits, now=1061).allowed)
+
+        # The plan-wide cap is shared with other clients on the same plan.
+        results = [backend.consume('client-b', 'STARTER', self.limits, now=1061).allowed for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+    def assert_cost_behaviour(self, backend):
+        # A request of cost 4 takes one burst token but four window places.
+        self.assertTrue(backend.consume('client-c', 'GROWTH', self.limits, now=1000, cost=4).allowed)
+        denied = backend.consume('client-c', 'GROWTH', self.limits, now=1000, cost=2)
+        self.assertFalse(denied.allowed)
+        self.assertEqual(denied.retry_after, 60)
+        self.assertTrue(backend.consume('client-c', 'GROWTH', self.limits, now=1000).allowed)
+        self.assertFalse(backend.consume('client-d', 'GROWTH', self.limits, now=1000, cost=6).allowed)
+
+    def test_local_backend(self):
+        self.assert_quota_behaviour(LocalQuotaBackend())
+        self.assert_cost_behaviour(LocalQuotaBackend())
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_backend(self):
+        self.assert_quota_behaviour(RedisQuotaBackend(client=fakeredis.FakeRedis()))
+        self.assert_cost_behaviour(RedisQuotaBackend(client=fakeredis.FakeRedis()))
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_usage_is_drained_once(self):
+        backend = RedisQuotaBackend(client=fakeredis.FakeRedis())
+        backend.record_usage('client-a')
+        backend.record_usage('client-a', 2)
+        self.assertEqual(backend.drain_usage(), {'client-a': 3})
+        self.assertEqual(backend.drain_usage(), {})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class APIProjectCreateQuotaTests(TestCase):
+
+    def setUp(self):
+        _local_cache.clear()
+        quotas._backend = LocalQuotaBackend()
+        self.user = User.objects.create_user(email='quota@applaude.ai', password='password123')
+        self.api_client = ApiClient.objects.create(
+            user=self.user, business_name='Quota Inc', website_link='https://quota.example.com', is_active=True
+        )
+        self.key = self.api_client.issue_key()
+        self.url = reverse('api:api-project-create')
+
+    def tearDown(self):
+        quotas._backend = None
+
+    def create_project(self, index):
+        return self.client.post(
+            self.url, {'source_url': f'https://site{index}.example.com', 'app_type': 'ANDROID'},
+            HTTP_X_API_KEY=self.key,
+        )
+
+    @patch('apps.api.views.start_project_pipeline')
+    def test_burst_is_throttled_with_headers(self, mock_start):
+        """
+        Ensure the starter burst is enforced and usage is flushed to the DB in one batch.
+        """
+        burst = PLAN_LIMITS['STARTER'].burst
+        for index in range(burst):
+            response = self.create_project(index)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertIn('X-RateLimit-Remaining', response)
+
+        response = self.create_project(burst)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response['X-RateLimit-Limit'], str(PLAN_LIMITS['STARTER'].window_limit))
+
+        self.api_client.refresh_from_db()
+        self.assertEqual(self.api_client.apps_created_count, 0)
+        self.assertEqual(flush_usage(), 1)
+        self.api_client.refresh_from_db()
+        self.assertEqual(self.api_client.apps_created_count, burst)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class APIBulkProjectCreateTests(TestCase):
+
+    def setUp(self):
+        _local_cache.clear()
+        quotas._backend = LocalQuotaBackend()
+        self.user = User.objects.create_user(email='bulk@applaude.ai', password='password123')
+        self.api_client = ApiClient.objects.create(
+            user=self.user, business_name='Bulk Inc', website_link='https://bulk.example.com', is_active=True
+        )
+        self.key = self.api_client.issue_key()
+        self.url = reverse('api:api-project-bulk-create')
+
+    def tearDown(self):
+        quotas._backend = None
+
+    def post_bulk(self, entries):
+        return self.client.post(self.url, {'projects': entries}, content_type='application/json', HTTP_X_API_KEY=self.key)
+
+    @patch('apps.api.views.start_project_pipelines')
+    def test_bulk_create_dispatches_one_group(self, mock_start):
+        """
+        Ensure a batch is inserted in bulk and its pipelines are dispatched once, after commit.
+        """
+        entries = [{'source_url': f'https://shop{i}.example.com', 'app_type': 'ANDROID'} for i in range(30)]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_bulk(entries)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['total'], 30)
+        self.assertEqual(Project.objects.filter(owner=self.user).count(), 30)
+
+        mock_start.assert_called_once()
+        self.assertEqual(len(mock_start.call_args.args[0]), 30)
+
+        progress = self.client.get(
+            reverse('api:api-project-batch-detail', args=[response.data['batch_id']]), HTTP_X_API_KEY=self.key
+        )
+        self.assertEqual(progress.data['in_progress'], 30)
+        self.assertFalse(progress.data['done'])
+
+    @patch('apps.api.views.start_project_pipelines')
+    def test_invalid_batches_are_rejected_whole(self, mock_start):
+        duplicate = [{'source_url': 'https://same.example.com', 'app_type': 'ANDROID'}] * 2
+        self.assertEqual(self.post_bulk(duplicate).status_code, status.HTTP_400_BAD_REQUEST)
+
+        invalid = [{'source_url': 'https://ok.example.com', 'app_type': 'ANDROID'}, {'source_url': 'not-a-url', 'app_type': 'ANDROID'}]
+        self.assertEqual(self.post_bulk(invalid).status_code, status.HTTP_400_BAD_REQUEST)
+
+        Project.objects.create(owner=self.user, name='App for https://taken.example.com', source_url='https://taken.example.com')
+        response = self.post_bulk([{'source_url': 'https://taken.example.com', 'app_type': 'ANDROID'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['source_urls'], ['https://taken.example.com'])
+
+        self.assertEqual(Project.objects.filter(owner=self.user).count(), 1)
+        mock_start.assert_not_called()
+
+    @patch('apps.api.views.start_project_pipelines')
+    def test_concurrent_duplicates_are_a_conflict(self, mock_start):
+        """
+        Ensure a project created by another request after the duplicate check is reported, not a server error.
+        """
+        Project.objects.create(owner=self.user, name='App for https://raced.example.com', source_url='https://raced.example.com')
+        entries = [{'source_url': 'https://raced.example.com', 'app_type': 'ANDROID'}, {'source_url': 'https://new.example.com'}]
+        with patch('apps.api.views.existing_source_urls', side_effect=[[], ['https://raced.example.com']]):
+            response = self.post_bulk(entries)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['source_urls'], ['https://raced.example.com'])
+        self.assertFalse(Project.objects.filter(source_url='https://new.example.com').exists())
+        self.assertFalse(ProjectBatch.objects.exists())
+        mock_start.assert_not_called()
+
+    @patch('apps.api.views.start_project_pipelines')
+    def test_app_type_is_optional(self, mock_start):
+        response = self.post_bulk([{'source_url': 'https://plain.example.com'}])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Project.objects.get(owner=self.user).app_type, Project.AppType.ANDROID)
+
+    @patch('apps.api.views.start_project_pipelines')
+    def test_every_project_counts_against_the_quota(self, mock_start):
+        """
+        Ensure a bulk request is charged per project, so batching cannot exceed the client's window.
+        """
+        window_limit = PLAN_LIMITS[self.api_client.plan].window_limit
+        entries = [{'source_url': f'https://quota{i}.example.com'} for i in range(window_limit - 1)]
+        self.assertEqual(self.post_bulk(entries).status_code, status.HTTP_202_ACCEPTED)
+
+        response = self.post_bulk([{'source_url': 'https://one.example.com'}, {'source_url': 'https://two.example.com'}])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Project.objects.filter(owner=self.user).count(), window_limit - 1)
+
+    def test_batch_progress_aggregates_statuses(self):
+        batch = ProjectBatch.objects.create(api_client=self.api_client, total=4)
+        statuses = [
+            Project.ProjectStatus.DESIGN_COMPLETE, Project.ProjectStatus.COMPLETED,
+            Project.ProjectStatus.FAILED, Project.ProjectStatus.DESIGN_PENDING,
+        ]
+        projects = [
+            Project.objects.create(owner=self.user, name=f'Project {i}', status=project_status)
+            for i, project_status in enumerate(statuses)
+        ]
+        batch.projects.add(*projects)
+        with self.assertNumQueries(1):
+            progress = batch.progress()
+        self.assertEqual((progress['completed'], progress['failed'], progress['in_progress']), (2, 1, 1))
+        self.assertFalse(progress['done'])
+
+        # Batches stop after design analysis, so a finished design completes the batch.
+        Project.objects.filter(id=projects[3].id).update(status=Project.ProjectStatus.DESIGN_COMPLETE)
+        self.assertTrue(batch.progress()['done'])
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import InitializeAPIPaymentView, APIProjectCreateView
+from .views import InitializeAPIPaymentView, APIProjectCreateView, APIBulkProjectCreateView, APIProjectBatchDetailView
 
 app_name = 'api'
 
 urlpatterns = [
     path('initialize-payment/', InitializeAPIPaymentView.as_view(), name='api-initialize-payment'),
     path('projects/create/', APIProjectCreateView.as_view(), name='api-project-create'),
+    path('projects/bulk/', APIBulkProjectCreateView.as_view(), name='api-project-bulk-create'),
+    path('projects/batches/<uuid:pk>/', APIProjectBatchDetailView.as_view(), name='api-project-batch-detail'),
 ]
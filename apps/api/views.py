@@ -3,16 +3,16 @@ import requests
 import uuid
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 
 from .authentication import APIKeyAuthentication
-from .models import ApiClient
-from .serializers import ApiClientCreateSerializer, APIProjectCreateSerializer
+from .models import ApiClient, ProjectBatch
+from .pipelines import start_project_pipeline, start_project_pipelines
+from .quotas import ApiClientQuotaThrottle, BulkProjectQuotaThrottle, RateLimitHeadersMixin, record_usage
+from .serializers import ApiClientCreateSerializer, APIProjectCreateSerializer, BulkProjectCreateSerializer
 from apps.projects.models import Project
-from agents.tasks import run_market_analysis, run_design_analysis
-from celery import chain
 
 User = get_user_model()
 API_CLIENT_SETUP_FEE = Decimal('99.00') # One-time setup fee for API access
@@ -83,21 +83,23 @@ class InitializeAPIPaymentView(generics.CreateAPIView):
             return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class APIProjectCreateView(generics.CreateAPIView):
+class APIProjectCreateView(RateLimitHeadersMixin, generics.CreateAPIView):
     """
     Allows authenticated API partners to create a new project.
+    Requests are limited by the partner's plan quota.
     """
     serializer_class = APIProjectCreateSerializer
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ApiClientQuotaThrottle]
 
     def perform_create(self, serializer):
         """
         Assigns the owner from the authenticated API client, starts the
         AI pipeline, and increments the usage counter.
         """
-        api_client = self.request.user.api_client
-        
+        api_client = self.request.auth # Resolved (and cached) by APIKeyAuthentication
+
         # Create the project instance
         project = serializer.save(
             owner=self.request.user,
@@ -105,12 +107,73 @@ class APIProjectCreateView(generics.CreateAPIView):
         )
 
         # Start the AI agent workflow
-        pipeline = chain(
-            run_market_analysis.s(project.id),
-            run_design_analysis.s(project.id)
-        )
-        pipeline.delay()
+        start_project_pipeline(project.id)
+
+        # Counted atomically in the quota store and flushed to the DB in batches
+        record_usage(api_client)
+
+
+def existing_source_urls(owner, names):
+    """
+    The source URLs of the owner's projects that already use one of `names`.
+    """
+    return list(Project.objects.filter(owner=owner, name__in=names).values_list('source_url', flat=True))
+
+
+class APIBulkProjectCreateView(RateLimitHeadersMixin, generics.CreateAPIView):
+    """
+    Allows authenticated API partners to create many projects in one request.
+    Returns a batch id whose aggregate progress can be polled. Each project counts against the partner's quota.
+    """
+    serializer_class = BulkProjectCreateSerializer
+    authentication_classes = [APIKeyAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [BulkProjectQuotaThrottle]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.validated_data['projects']
+        api_client = request.auth
+
+        names = {f"App for {entry['source_url']}": entry for entry in entries}
+        existing = existing_source_urls(request.user, names)
+        if existing:
+            return self.conflict(existing)
+
+        projects = [
+            Project(owner=request.user, name=name, **entry)
+            for name, entry in names.items()
+        ]
+        try:
+            with transaction.atomic():
+                Project.objects.bulk_create(projects)
+                batch = ProjectBatch.objects.create(api_client=api_client, total=len(projects))
+                batch.projects.add(*projects)
+                # Start the pipelines only once the projects are visible to the workers
+                project_ids = [project.id for project in projects]
+                transaction.on_commit(lambda: start_project_pipelines(project_ids))
+        except IntegrityError:
+            # A concurrent request created some of the same projects after the check above
+            return self.conflict(existing_source_urls(request.user, names))
+
+        record_usage(api_client, len(projects))
+        return Response(batch.progress(), status=status.HTTP_202_ACCEPTED)
+
+    def conflict(self, source_urls):
+        return Response({'error': 'Projects already exist for these source URLs.', 'source_urls': source_urls}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class APIProjectBatchDetailView(RateLimitHeadersMixin, generics.RetrieveAPIView):
+    """
+    Reports the aggregate progress of a bulk project batch.
+    """
+    queryset = ProjectBatch.objects.all()
+    authentication_classes = [APIKeyAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
-        # Increment the usage counter
-        api_client.apps_created_count += 1
-        api_client.save()
+    def get(self, request, *args, **kwargs):
+        batch = self.get_object()
+        if batch.api_client_id != request.auth.pk:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        return Response(batch.progress())
@@ -12,8 +12,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from apps.projects.models import Project
 from .models import Payment
-from agents.tasks import run_code_generation, run_qa_check, run_deployment
-from celery import chain
+from agents.pipeline import BUILD_TARGET, start_pipeline
 
 # Base prices in USD
 BASE_PLAN_PRICES_USD = {
@@ -120,3 +119,32 @@ class InitializePaymentView(APIView):
                 return Response({'error': f"Failed to initialize payment: {response_data.get('message')}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except requests.exceptions.RequestException as e:
             return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class PaystackWebhookView(APIView):
+    """
+    Receives Paystack events. A successful charge marks the payment as paid
+    and starts the build stages of the project's pipeline; the analysis
+    stages already completed are reused from their checkpoints.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        secret = os.getenv('PAYSTACK_SECRET_KEY', '')
+        signature = request.headers.get('X-Paystack-Signature', '')
+        expected = hmac.new(secret.encode('utf-8'), request.body, hashlib.sha512).hexdigest()
+        if not secret or not hmac.compare_digest(expected, signature):
+            return Response({'error': 'Invalid signature.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        event = json.loads(request.body)
+        if event.get('event') == 'charge.success':
+            reference = event.get('data', {}).get('reference')
+            with transaction.atomic():
+                payment = Payment.objects.select_for_update().filter(paystack_reference=reference).first()
+                # Paystack may deliver the same event more than once.
+                if payment and payment.status != Payment.PaymentStatus.SUCCESSFUL:
+                    payment.status = Payment.PaymentStatus.SUCCESSFUL
+                    payment.save(update_fields=['status', 'updated_at'])
+                    start_pipeline(payment.project_id, target=BUILD_TARGET)
+        return Response(status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project
+from .models import Project, PipelineRun, StageRun
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
@@ -14,3 +14,20 @@ class ProjectAdmin(admin.ModelAdmin):
         ('AI Generated Assets', {'fields': ('user_persona_document', 'brand_palette')}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
+
+
+class StageRunInline(admin.TabularInline):
+    model = StageRun
+    fields = ('stage', 'status', 'started_at', 'finished_at', 'error')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(PipelineRun)
+class PipelineRunAdmin(admin.ModelAdmin):
+    list_display = ('project', 'pipeline', 'target_stage', 'status', 'started_at', 'finished_at')
+    list_filter = ('status', 'pipeline', 'target_stage')
+    search_fields = ('project__name',)
+    readonly_fields = ('project', 'pipeline', 'target_stage', 'status', 'error', 'started_at', 'finished_at')
+    inlines = [StageRunInline]
@@ -0,0 +1,130 @@
+import hashlib
+import re
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Project, SiteAnalysis
+
+# A completed analysis is reused for this long unless the site's content changes.
+SITE_ANALYSIS_TTL = timedelta(days=7)
+# How long a worker may hold an analysis before another one may take it over.
+ANALYSIS_LEASE = timedelta(minutes=10)
+
+# Query parameters that only track the visitor. Other parameters can select
+# different content, so only utm_* is matched by prefix.
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref'})
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_source_url(url):
+    """
+    Reduces equivalent spellings of a site URL to one canonical form, e.g.
+    `HTTPS://www.Example.com:443/shop/?utm_source=x` -> `https://example.com/shop`.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/')
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def content_fingerprint(html):
+    """
+    Hashes the visible text of a page, ignoring scripts, styles and markup so
+    per-request noise like nonces does not count as a content change.
+    """
+    text = re.sub(r'(?is)<(script|style|noscript)\b.*?</\1>|<!--.*?-->', ' ', html)
+    text = re.sub(r'(?s)<[^>]+>', ' ', text)
+    text = ' '.join(text.split()).lower()
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_site_analysis(source_url):
+    """
+    Returns the canonical SiteAnalysis for a source URL, creating it if needed.
+    """
+    normalized_url = normalize_source_url(source_url)
+    try:
+        with transaction.atomic():
+            analysis, _ = SiteAnalysis.objects.get_or_create(normalized_url=normalized_url)
+    except IntegrityError:
+        # Another request created it between our lookup and insert.
+        analysis = SiteAnalysis.objects.get(normalized_url=normalized_url)
+    return analysis
+
+
+def is_fresh(analysis, fingerprint=None, now=None):
+    """
+    A completed analysis is fresh while it is younger than SITE_ANALYSIS_TTL
+    and, when a fingerprint is known, the site's content is unchanged.
+    """
+    now = now or timezone.now()
+    if analysis.status != SiteAnalysis.AnalysisStatus.COMPLETE or not analysis.analyzed_at:
+        return False
+    if now - analysis.analyzed_at > SITE_ANALYSIS_TTL:
+        return False
+    return not fingerprint or not analysis.content_hash or fingerprint == analysis.content_hash
+
+
+def claim_site_analysis(analysis, now=None):
+    """
+    Takes the lease on an analysis with one conditional UPDATE. Only one
+    worker succeeds; the others should wait for its result.
+
+    Returns:
+        True if this caller now owns the analysis run.
+    """
+    now = now or timezone.now()
+    claimed = (
+        SiteAnalysis.objects.filter(pk=analysis.pk)
+        .filter(~Q(status=SiteAnalysis.AnalysisStatus.RUNNING) | Q(lease_expires_at__lt=now))
+        .update(status=SiteAnalysis.AnalysisStatus.RUNNING, lease_expires_at=now + ANALYSIS_LEASE, updated_at=now)
+    )
+    return claimed == 1
+
+
+def complete_site_analysis(analysis, user_persona_document, brand_palette, fingerprint=None, site_extract=None):
+    analysis.user_persona_document = user_persona_document
+    analysis.brand_palette = brand_palette
+    analysis.content_hash = fingerprint or ''
+    analysis.site_extract = site_extract
+    analysis.status = SiteAnalysis.AnalysisStatus.COMPLETE
+    analysis.lease_expires_at = None
+    analysis.analyzed_at = timezone.now()
+    analysis.save()
+
+
+def fail_site_analysis(analysis):
+    """
+    Releases the lease so a waiting or retrying worker can take over.
+    """
+    SiteAnalysis.objects.filter(pk=analysis.pk).update(
+        status=SiteAnalysis.AnalysisStatus.FAILED, lease_expires_at=None, updated_at=timezone.now()
+    )
+
+
+def attach_site_analysis(project_id, analysis):
+    """
+    Copies a completed analysis onto a project and links the two.
+    """
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(id=project_id)
+        project.site_analysis = analysis
+        # Points at the analysis's blob; the document itself is not read.
+        project.user_persona_blob_id = analysis.user_persona_blob_id
+        project.brand_palette = analysis.brand_palette
+        project.status = Project.ProjectStatus.ANALYSIS_COMPLETE
+        project.status_message = "Market analysis complete. Ready for design."
+        project.save()
+    return project
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from agents.benchmark import run_benchmark
+
+class Command(BaseCommand):
+    help = 'Run projects through the whole agent pipeline with faked or replayed model calls and report timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10, help='Number of projects to run at once')
+        parser.add_argument('--concurrency', type=int, default=4, help='Worker threads')
+        parser.add_argument('--mode', choices=['fake', 'replay'], default='fake', help='How model calls are answered')
+        parser.add_argument('--latency', type=str, default='0.5,2', help='Fake model p50,p95 latency in seconds')
+        parser.add_argument('--fixtures', type=str, help='Recorded fixtures to replay (defaults to LLM_FIXTURE_PATH)')
+        parser.add_argument('--timeout', type=int, default=600, help='Seconds to wait for every run to finish')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark projects and their runs')
+
+    def handle(self, *args, **options):
+        try:
+            latency = tuple(float(value) for value in options['latency'].split(','))
+        except ValueError:
+            raise CommandError('--latency must be two numbers, e.g. 0.5,2')
+        if len(latency) != 2:
+            raise CommandError('--latency must be two numbers, e.g. 0.5,2')
+
+        result = run_benchmark(
+            projects=options['projects'], concurrency=options['concurrency'], mode=options['mode'],
+            latency=latency, fixture_path=options['fixtures'], timeout=options['timeout'], keep=options['keep'],
+        )
+        self.stdout.write(
+            f"{result['projects']} projects in {result['seconds']}s ({result['projects_per_minute']} per minute), "
+            f"{result['failed']} failed, {result['queries_per_project']} queries per project"
+        )
+        for stage, timings in result['stages'].items():
+            if not timings['count']:
+                continue
+            self.stdout.write(
+                f"  {stage:<16} p50 {timings['p50']:.2f}s  p95 {timings['p95']:.2f}s  p99 {timings['p99']:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
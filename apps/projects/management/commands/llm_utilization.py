@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from agents.admission import utilization
+
+class Command(BaseCommand):
+    help = 'Show how much of each model\'s shared rate limit is in use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Model names (defaults to every configured model)')
+
+    def handle(self, *args, **options):
+        for model_name, state in utilization(options['models'] or None).items():
+            self.stdout.write(
+                f"{model_name}: {state['utilization']:.0%} used, "
+                f"{state['requests_available']}/{state['requests_per_minute']} requests and "
+                f"{state['tokens_available']}/{state['tokens_per_minute']} tokens available, "
+                f"rate scale {state['scale']:.0%}, {state['waiting']} waiting"
+            )
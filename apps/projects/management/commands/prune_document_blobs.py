@@ -0,0 +1,8 @@
+from django.core.management.base import BaseCommand
+from apps.projects.models import DocumentBlob
+
+class Command(BaseCommand):
+    help = 'Delete stored documents that no project or site analysis refers to any more'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {DocumentBlob.prune()} unreferenced document(s).")
@@ -0,0 +1,8 @@
+from django.core.management.base import BaseCommand
+from agents.site_crawler import HttpCache
+
+class Command(BaseCommand):
+    help = 'Evict expired and least recently fetched entries from the on-disk site cache'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {HttpCache().prune()} cached response(s).")
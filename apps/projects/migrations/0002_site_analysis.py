@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:57
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteAnalysis',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('normalized_url', models.CharField(max_length=1024, unique=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETE', 'Complete'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('user_persona_document', models.TextField(blank=True, null=True)),
+                ('brand_palette', models.JSONField(blank=True, null=True)),
+                ('analyzed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'site analyses',
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='site_analysis',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='projects', to='projects.siteanalysis'),
+        ),
+    ]
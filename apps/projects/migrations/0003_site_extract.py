@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_site_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteanalysis',
+            name='site_extract',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
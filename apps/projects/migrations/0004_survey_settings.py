@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_site_extract'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='enable_pmf_survey',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='enable_ux_survey',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='pmf_survey_questions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='ux_survey_questions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
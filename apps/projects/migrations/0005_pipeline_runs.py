@@ -0,0 +1,55 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:13
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_survey_settings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deployment_option',
+            field=models.CharField(choices=[('NOT_CHOSEN', 'Not Chosen'), ('GOOGLE_PLAY', 'Google Play'), ('APP_STORE', 'App Store'), ('BOTH_STORES', 'Google Play & App Store')], default='NOT_CHOSEN', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PipelineRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('pipeline', models.CharField(max_length=50)),
+                ('target_stage', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETE', 'Complete'), ('FAILED', 'Failed')], default='RUNNING', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pipeline_runs', to='projects.project')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StageRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('stage', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETE', 'Complete'), ('SKIPPED', 'Skipped (checkpoint)'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('output', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_runs', to='projects.project')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='projects.pipelinerun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'stage', 'status', 'finished_at'], name='stage_run_checkpoint_idx')],
+                'unique_together': {('run', 'stage')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:17
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_pipeline_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StepCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('stage', models.CharField(max_length=50)),
+                ('step', models.CharField(max_length=100)),
+                ('input_hash', models.CharField(max_length=64)),
+                ('output', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='step_checkpoints', to='projects.project')),
+            ],
+            options={
+                'unique_together': {('project', 'stage', 'step')},
+            },
+        ),
+    ]
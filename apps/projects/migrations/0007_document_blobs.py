@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:50
+
+import gzip
+import hashlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_personas_to_blobs(apps, schema_editor):
+    DocumentBlob = apps.get_model('projects', 'DocumentBlob')
+    for model_name in ('Project', 'SiteAnalysis'):
+        model = apps.get_model('projects', model_name)
+        rows = model.objects.exclude(user_persona_document__isnull=True).exclude(user_persona_document='')
+        for pk, text in rows.values_list('pk', 'user_persona_document').iterator():
+            raw = text.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            DocumentBlob.objects.bulk_create(
+                [DocumentBlob(digest=digest, data=gzip.compress(raw), size=len(raw))], ignore_conflicts=True,
+            )
+            model.objects.filter(pk=pk).update(user_persona_blob_id=digest)
+
+
+def restore_personas_from_blobs(apps, schema_editor):
+    DocumentBlob = apps.get_model('projects', 'DocumentBlob')
+    for model_name in ('Project', 'SiteAnalysis'):
+        model = apps.get_model('projects', model_name)
+        for pk, digest in model.objects.filter(user_persona_blob__isnull=False).values_list('pk', 'user_persona_blob_id').iterator():
+            data = DocumentBlob.objects.values_list('data', flat=True).get(digest=digest)
+            model.objects.filter(pk=pk).update(user_persona_document=gzip.decompress(data).decode('utf-8'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_step_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='user_persona_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='persona_projects', to='projects.documentblob'),
+        ),
+        migrations.AddField(
+            model_name='siteanalysis',
+            name='user_persona_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='persona_site_analyses', to='projects.documentblob'),
+        ),
+        migrations.RunPython(move_personas_to_blobs, restore_personas_from_blobs),
+        migrations.RemoveField(
+            model_name='project',
+            name='user_persona_document',
+        ),
+        migrations.RemoveField(
+            model_name='siteanalysis',
+            name='user_persona_document',
+        ),
+    ]
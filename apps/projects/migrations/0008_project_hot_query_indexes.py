@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_document_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='project_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status', 'COMPLETED')), fields=['updated_at'], name='project_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status', 'DESIGN_COMPLETE')), fields=['updated_at'], name='project_awaiting_payment_idx'),
+        ),
+    ]
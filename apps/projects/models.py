@@ -1,8 +1,105 @@
+import gzip
+import hashlib
 import uuid
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
+class DocumentBlob(models.Model):
+    """
+    A large generated document, kept out of the rows that refer to it.
+    Blobs are addressed by the SHA-256 of their text, so a document shared
+    by many projects is stored once, and are gzip-compressed.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(help_text='Uncompressed size in bytes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest
+
+    @classmethod
+    def store(cls, text):
+        """
+        Stores `text` unless a blob with the same content exists, and
+        returns its digest.
+        """
+        raw = text.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        cls.objects.bulk_create([cls(digest=digest, data=gzip.compress(raw), size=len(raw))], ignore_conflicts=True)
+        return digest
+
+    @classmethod
+    def load(cls, digest):
+        return gzip.decompress(cls.objects.values_list('data', flat=True).get(digest=digest)).decode('utf-8')
+
+    @classmethod
+    def prune(cls):
+        """
+        Deletes the blobs nothing refers to any more, e.g. replaced personas.
+        """
+        deleted, _ = cls.objects.filter(persona_projects__isnull=True, persona_site_analyses__isnull=True).delete()
+        return deleted
+
+
+def blob_text(field_name):
+    """
+    A text attribute stored in the DocumentBlob that the foreign key
+    `field_name` points to. The text is only loaded when first read, and
+    assigning stores the blob and points the key at it.
+    """
+    cache_name = f"_{field_name}_text"
+    key_name = f"{field_name}_id"
+
+    def get_text(instance):
+        digest = getattr(instance, key_name)
+        cached = instance.__dict__.get(cache_name)
+        if cached is None or cached[0] != digest:
+            cached = instance.__dict__[cache_name] = (digest, DocumentBlob.load(digest) if digest else None)
+        return cached[1]
+
+    def set_text(instance, text):
+        digest = DocumentBlob.store(text) if text else None
+        setattr(instance, key_name, digest)
+        instance.__dict__[cache_name] = (digest, text or None)
+
+    return property(get_text, set_text)
+
+class SiteAnalysis(models.Model):
+    """
+    Market analysis results for one website, shared by every project built
+    from the same normalized source URL.
+    """
+    class AnalysisStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETE = 'COMPLETE', _('Complete')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    normalized_url = models.CharField(max_length=1024, unique=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=AnalysisStatus.choices, default=AnalysisStatus.PENDING)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    user_persona_blob = models.ForeignKey(
+        DocumentBlob, on_delete=models.PROTECT, blank=True, null=True, related_name='persona_site_analyses',
+    )
+    brand_palette = models.JSONField(blank=True, null=True)
+    site_extract = models.JSONField(blank=True, null=True)
+    analyzed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    user_persona_document = blob_text('user_persona_blob')
+
+    class Meta:
+        verbose_name_plural = 'site analyses'
+
+    def __str__(self):
+        return self.normalized_url
+
 class Project(models.Model):
     class AppType(models.TextChoices):
         ANDROID = 'ANDROID', _('Android')
@@ -22,6 +119,12 @@ class Project(models.Model):
         COMPLETED = 'COMPLETED', _('Completed')
         FAILED = 'FAILED', _('Failed')
 
+    class DeploymentOption(models.TextChoices):
+        NOT_CHOSEN = 'NOT_CHOSEN', _('Not Chosen')
+        GOOGLE_PLAY = 'GOOGLE_PLAY', _('Google Play')
+        APP_STORE = 'APP_STORE', _('App Store')
+        BOTH_STORES = 'BOTH_STORES', _('Google Play & App Store')
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(max_length=255)
@@ -29,15 +132,130 @@ class Project(models.Model):
     app_type = models.CharField(max_length=10, choices=AppType.choices, default=AppType.ANDROID)
     status = models.CharField(max_length=20, choices=ProjectStatus.choices, default=ProjectStatus.PENDING)
     status_message = models.CharField(max_length=255, blank=True, null=True)
-    user_persona_document = models.TextField(blank=True, null=True)
+    # The persona is read by a few stages only; status updates leave it alone.
+    user_persona_blob = models.ForeignKey(
+        DocumentBlob, on_delete=models.PROTECT, blank=True, null=True, related_name='persona_projects',
+    )
     brand_palette = models.JSONField(blank=True, null=True)
     generated_code_path = models.CharField(max_length=1024, blank=True, null=True)
+    enable_ux_survey = models.BooleanField(default=False)
+    ux_survey_questions = models.JSONField(blank=True, null=True)
+    enable_pmf_survey = models.BooleanField(default=False)
+    pmf_survey_questions = models.JSONField(blank=True, null=True)
+    deployment_option = models.CharField(max_length=20, choices=DeploymentOption.choices, default=DeploymentOption.NOT_CHOSEN)
+    site_analysis = models.ForeignKey(SiteAnalysis, on_delete=models.SET_NULL, blank=True, null=True, related_name='projects')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    user_persona_document = blob_text('user_persona_blob')
+
     class Meta:
         ordering = ['-created_at']
         unique_together = ('owner', 'name')
+        # Each serves one hot query (see apps.projects.queries). The partial
+        # ones only hold projects in the status their query filters on.
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='project_owner_created_idx'),
+            models.Index(
+                fields=['updated_at'], condition=models.Q(status='COMPLETED'), name='project_completed_idx',
+            ),
+            models.Index(
+                fields=['updated_at'], condition=models.Q(status='DESIGN_COMPLETE'), name='project_awaiting_payment_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class PipelineRun(models.Model):
+    """
+    One execution of the agent pipeline for a project, up to a target stage.
+    """
+    class RunStatus(models.TextChoices):
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETE = 'COMPLETE', _('Complete')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='pipeline_runs')
+    pipeline = models.CharField(max_length=50)
+    target_stage = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=RunStatus.choices, default=RunStatus.RUNNING)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.pipeline} -> {self.target_stage} for {self.project_id} ({self.status})"
+
+    def timing_breakdown(self):
+        """
+        Seconds spent in each stage that ran, in execution order.
+        """
+        return {
+            stage.stage: stage.duration.total_seconds()
+            for stage in self.stages.order_by('started_at')
+            if stage.duration is not None
+        }
+
+class StageRun(models.Model):
+    """
+    A stage within a pipeline run. Completed stages are checkpoints: a later
+    run for the same project reuses their output instead of running them again.
+    """
+    class StageStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETE = 'COMPLETE', _('Complete')
+        SKIPPED = 'SKIPPED', _('Skipped (checkpoint)')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    run = models.ForeignKey(PipelineRun, on_delete=models.CASCADE, related_name='stages')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='stage_runs')
+    stage = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=StageStatus.choices, default=StageStatus.PENDING)
+    output = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('run', 'stage')
+        indexes = [
+            # Checkpoint lookup: latest completed run of a stage for a project.
+            models.Index(fields=['project', 'stage', 'status', 'finished_at'], name='stage_run_checkpoint_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stage} ({self.status})"
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+
+class StepCheckpoint(models.Model):
+    """
+    The result of one step inside a stage (a single model call, say), kept
+    so a retried stage skips the steps that already succeeded. It is only
+    reused while the step's inputs hash to the same value.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='step_checkpoints')
+    stage = models.CharField(max_length=50)
+    step = models.CharField(max_length=100)
+    input_hash = models.CharField(max_length=64)
+    output = models.JSONField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('project', 'stage', 'step')
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.stage}/{self.step}"
@@ -0,0 +1,107 @@
+import re
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+from apps.testimonials.models import TestimonialRequestLog
+from .models import Project
+
+# The intervals the periodic mailers look back over.
+TESTIMONIAL_DELAYS = (timedelta(days=1), timedelta(days=30), timedelta(days=90))
+TESTIMONIAL_WINDOW = timedelta(hours=24)
+REMINDER_DELAY = timedelta(days=1)
+REMINDER_WINDOW = timedelta(hours=24)
+
+
+def testimonial_candidates(now=None):
+    """
+    Completed projects due a testimonial request, found in one query: those
+    completed a day, a month or three months ago, each within a one-day
+    window, whose request for that delay has not been logged yet. Each
+    project is annotated with `delay_days` and comes with its owner.
+    """
+    now = now or timezone.now()
+    windows = {delay.days: (now - delay - TESTIMONIAL_WINDOW, now - delay) for delay in TESTIMONIAL_DELAYS}
+    already_requested = TestimonialRequestLog.objects.filter(project=OuterRef('pk'), delay_days=OuterRef('delay_days'))
+    return (
+        Project.objects.filter(status=Project.ProjectStatus.COMPLETED)
+        .filter(reduce(or_, (Q(updated_at__range=window) for window in windows.values())))
+        .annotate(delay_days=Case(
+            *(When(updated_at__range=window, then=Value(days)) for days, window in windows.items()),
+            output_field=IntegerField(),
+        ))
+        .exclude(Exists(already_requested))
+        .select_related('owner')
+    )
+
+
+def awaiting_payment(now=None):
+    """
+    Projects whose analysis finished a day ago, within a one-day window,
+    and that have not been paid for. Run daily, this reminds each owner
+    once.
+    """
+    now = now or timezone.now()
+    return Project.objects.filter(
+        status=Project.ProjectStatus.DESIGN_COMPLETE,
+        updated_at__range=(now - REMINDER_DELAY - REMINDER_WINDOW, now - REMINDER_DELAY),
+    )
+
+
+def hot_queries(owner_id, now=None):
+    """
+    The most frequent Project queries (the project list and the periodic
+    mailers), with the index each one should use.
+
+    Returns:
+        A dict of name -> (queryset, index name).
+    """
+    return {
+        'project_list': (
+            Project.objects.filter(owner_id=owner_id).order_by('-created_at', '-id')[:51], 'project_owner_created_idx',
+        ),
+        'testimonial_candidates': (testimonial_candidates(now), 'project_completed_idx'),
+        'payment_reminders': (awaiting_payment(now), 'project_awaiting_payment_idx'),
+    }
+
+
+def sequential_scans(plan, table=Project._meta.db_table):
+    """
+    Returns the lines of a query plan that read `table` in full.
+    SQLite reports these as `SCAN <table>` (without an index) and
+    PostgreSQL as `Seq Scan on <table>`.
+    """
+    pattern = re.compile(rf'(\bSCAN {table}\b(?! USING (COVERING )?INDEX))|(Seq Scan on {table}\b)')
+    return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+
+
+def check_query_plans(owner_id, now=None):
+    """
+    Explains every hot query on the current database.
+
+    Returns:
+        A dict of name -> (plan, problem), where problem is None when the
+        query uses its index.
+    """
+    results = {}
+    for name, (queryset, index) in hot_queries(owner_id, now).items():
+        plan = queryset.explain()
+        if sequential_scans(plan):
+            problem = 'sequential scan'
+        elif index not in plan:
+            problem = f'does not use {index}'
+        else:
+            problem = None
+        results[name] = (plan, problem)
+    return results
+
+
+def analyze():
+    """
+    Refreshes the planner's statistics, as the database does on its own
+    after large writes.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {Project._meta.db_table}')
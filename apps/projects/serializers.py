@@ -9,13 +9,34 @@ class TestimonialSerializer(serializers.ModelSerializer):
         model = Testimonial
         fields = '__all__'
 
-class ProjectSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Lets clients request a subset of fields on reads, e.g. ?fields=id,name,status.
+    Unknown names are ignored.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+        allowed = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Project model.
     Optimizes database lookups.
     """
     owner = UserDetailSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    # Kept in a DocumentBlob; reading it costs one query.
+    user_persona_document = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
     class Meta:
         model = Project
@@ -43,3 +64,32 @@ class ProjectSerializer(serializers.ModelSerializer):
         """
         project = Project.objects.create(**validated_data)
         return project
+
+class ProjectListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Lightweight serializer for project lists.
+    Leaves out the persona document and palette and returns the owner as an ID,
+    so list queries skip the blob lookup, defer the palette and skip the user join.
+    """
+    owner = serializers.PrimaryKeyRelatedField(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    # Large columns the list query does not need to load.
+    deferred_fields = ('brand_palette',)
+
+    class Meta:
+        model = Project
+        fields = (
+            'id',
+            'owner',
+            'name',
+            'source_url',
+            'app_type',
+            'status',
+            'status_display',
+            'status_message',
+            'generated_code_path',
+            'created_at',
+            'updated_at'
+        )
+        read_only_fields = fields
@@ -1,9 +1,21 @@
+import os
+import random
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model
-from .models import Project
+from agents.telemetry import span
+from .models import DocumentBlob, Project
+from .queries import analyze, awaiting_payment, check_query_plans, sequential_scans
+from .analysis import (
+    ANALYSIS_LEASE, SITE_ANALYSIS_TTL, normalize_source_url, content_fingerprint, get_site_analysis,
+    claim_site_analysis, complete_site_analysis, is_fresh, attach_site_analysis,
+)
 
 User = get_user_model()
 
@@ -52,8 +64,8 @@ class ProjectAPITests(APITestCase):
 
         response = self.client.get(self.list_url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], self.project_data['name'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], self.project_data['name'])
 
     def test_list_projects_isolates_data(self):
         """
@@ -69,5 +81,205 @@ class ProjectAPITests(APITestCase):
         # The main user should only see their own project
         response = self.client.get(self.list_url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertNotEqual(response.data[0]['name'], 'Other Project')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertNotEqual(response.data['results'][0]['name'], 'Other Project')
+
+
+class ProjectListPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='partner@applaude.ai', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('project-list')
+        for i in range(5):
+            Project.objects.create(
+                owner=self.user,
+                name=f'Project {i}',
+                source_url=f'https://example{i}.com',
+                user_persona_document='# Persona\n' * 100,
+            )
+
+    def test_keyset_pages_cover_every_project_once(self):
+        """
+        Ensure following the next links returns every project exactly once, newest first.
+        """
+        names = []
+        url = f'{self.list_url}?page_size=2'
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names.extend(project['name'] for project in response.data['results'])
+            url = response.data['next']
+        expected = list(Project.objects.order_by('-created_at', '-id').values_list('name', flat=True))
+        self.assertEqual(names, expected)
+
+    def test_list_is_lightweight(self):
+        response = self.client.get(self.list_url, format='json')
+        project = response.data['results'][0]
+        self.assertNotIn('user_persona_document', project)
+        self.assertEqual(str(project['owner']), str(self.user.id))
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(f'{self.list_url}?fields=id,name', format='json')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.list_url}?cursor=not-a-cursor', format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SiteAnalysisStoreTests(TestCase):
+
+    def test_equivalent_urls_share_one_analysis(self):
+        variants = [
+            'https://www.Example.com/shop/',
+            'HTTPS://example.com:443/shop?utm_source=newsletter',
+            'https://example.com//shop#pricing',
+        ]
+        self.assertEqual({normalize_source_url(url) for url in variants}, {'https://example.com/shop'})
+        analyses = {get_site_analysis(url).pk for url in variants}
+        self.assertEqual(len(analyses), 1)
+
+    def test_only_tracking_parameters_are_dropped(self):
+        self.assertEqual(normalize_source_url('https://example.com/?ref=ad&utm_medium=email&gclid=1'), 'https://example.com')
+        self.assertEqual(
+            normalize_source_url('https://example.com/docs?reference=api&refresh=1'),
+            'https://example.com/docs?reference=api&refresh=1',
+        )
+
+    def test_fingerprint_ignores_markup_noise(self):
+        page = '<html><body><h1>Fresh   Bakes</h1><script>var nonce = "%s";</script></body></html>'
+        self.assertEqual(content_fingerprint(page % 'abc'), content_fingerprint(page % 'xyz'))
+        self.assertNotEqual(content_fingerprint(page % 'abc'), content_fingerprint('<h1>Stale bakes</h1>'))
+
+    def test_only_one_worker_claims_an_analysis(self):
+        analysis = get_site_analysis('https://example.com')
+        self.assertTrue(claim_site_analysis(analysis))
+        self.assertFalse(claim_site_analysis(analysis))
+        # An abandoned lease can be taken over once it expires.
+        self.assertTrue(claim_site_analysis(analysis, now=timezone.now() + ANALYSIS_LEASE + timedelta(seconds=1)))
+
+    def test_staleness_by_ttl_and_content(self):
+        analysis = get_site_analysis('https://example.com')
+        self.assertFalse(is_fresh(analysis))
+        complete_site_analysis(analysis, 'Persona', {'primary': '#000000'}, fingerprint='a' * 64)
+        self.assertTrue(is_fresh(analysis, 'a' * 64))
+        self.assertFalse(is_fresh(analysis, 'b' * 64))
+        self.assertFalse(is_fresh(analysis, now=timezone.now() + SITE_ANALYSIS_TTL + timedelta(seconds=1)))
+
+
+class DocumentBlobTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='blobs@applaude.ai', password='password123')
+        self.persona = '# Persona: Ada\n\n' + 'Wants fast checkout on mobile. ' * 200
+
+    def test_personas_are_stored_once_and_compressed(self):
+        """
+        Ensure identical documents share one compressed blob outside the project row.
+        """
+        first = Project.objects.create(owner=self.user, name='First', user_persona_document=self.persona)
+        second = Project.objects.create(owner=self.user, name='Second', user_persona_document=self.persona)
+        self.assertEqual(first.user_persona_blob_id, second.user_persona_blob_id)
+        blob = DocumentBlob.objects.get()
+        self.assertEqual(blob.size, len(self.persona))
+        self.assertLess(len(blob.data), blob.size // 10)
+
+    def test_persona_is_loaded_only_when_read(self):
+        project_id = Project.objects.create(owner=self.user, name='Lazy', user_persona_document=self.persona).id
+        with self.assertNumQueries(2):
+            project = Project.objects.get(id=project_id)
+            project.status = Project.ProjectStatus.DESIGN_PENDING
+            project.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(project.user_persona_document, self.persona)
+            self.assertEqual(project.user_persona_document, self.persona)
+
+    def test_projects_share_the_site_analysis_blob(self):
+        analysis = get_site_analysis('https://blobs.example.com')
+        complete_site_analysis(analysis, self.persona, {'primary': '#000000'})
+        project = Project.objects.create(owner=self.user, name='Shared')
+        project = attach_site_analysis(project.id, analysis)
+        self.assertEqual(project.user_persona_blob_id, analysis.user_persona_blob_id)
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+
+        # A replaced persona leaves its old blob to be pruned.
+        project.user_persona_document = 'A new persona'
+        project.save()
+        analysis.user_persona_document = None
+        analysis.save()
+        self.assertEqual(DocumentBlob.prune(), 1)
+        self.assertEqual(Project.objects.get(id=project.id).user_persona_document, 'A new persona')
+
+class QueryPlanTests(TestCase):
+    PROJECTS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        owners = User.objects.bulk_create([User(email=f'owner{index}@applaude.ai') for index in range(50)])
+        statuses = Project.ProjectStatus.values
+        rng = random.Random(0)
+        Project.objects.bulk_create([
+            Project(owner=owners[index % len(owners)], name=f'Project {index}', status=rng.choice(statuses))
+            for index in range(cls.PROJECTS)
+        ])
+        analyze()
+        cls.owner = owners[0]
+
+    def test_hot_queries_use_their_indexes(self):
+        """
+        Ensure no hot Project query falls back to a sequential scan on a large table.
+        """
+        for name, (plan, problem) in check_query_plans(self.owner.id).items():
+            with self.subTest(query=name):
+                self.assertIsNone(problem, plan)
+
+    def test_sequential_scans_are_detected(self):
+        plan = Project.objects.filter(name__contains='7').explain()
+        self.assertTrue(sequential_scans(plan), plan)
+        self.assertEqual(sequential_scans('Seq Scan on projects_project  (cost=0.00..155.00 rows=5000 width=16)'), [
+            'Seq Scan on projects_project  (cost=0.00..155.00 rows=5000 width=16)',
+        ])
+
+    def test_payment_reminders_cover_one_day(self):
+        """
+        Ensure a project awaiting payment is reminded about on one daily run only.
+        """
+        now = timezone.now()
+        project = Project.objects.create(owner=self.owner, name='Unpaid', status=Project.ProjectStatus.DESIGN_COMPLETE)
+        Project.objects.filter(id=project.id).update(updated_at=now - timedelta(days=1, hours=1))
+        due = [run for run in range(3) if awaiting_payment(now + timedelta(days=run)).filter(id=project.id).exists()]
+        self.assertEqual(due, [0])
+
+class TelemetryEndpointTests(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(TELEMETRY_EXPORT_PATH=os.path.join(directory.name, 'spans.jsonl'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with span('llm.call', model='gemini-1.5-flash', agent='Design', prompt_tokens=400, response_tokens=100, cost_usd=0.00006):
+            pass
+
+    def test_only_operators_see_the_summary(self):
+        """
+        Ensure the telemetry summary is limited to staff users.
+        """
+        self.client.force_authenticate(user=User.objects.create_user(email='owner@applaude.ai', password='password123'))
+        self.assertEqual(self.client.get(reverse('telemetry-summary')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=User.objects.create_superuser(email='ops@applaude.ai', password='password123'))
+        response = self.client.get(reverse('telemetry-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['models']['gemini-1.5-flash']['prompt_tokens'], 400)
+
+        metrics = self.client.get(reverse('telemetry-metrics'))
+        self.assertIn(b'applaude_llm_calls_total{model="gemini-1.5-flash"} 1', metrics.content)
+
+    def test_out_of_range_windows_are_clamped(self):
+        self.client.force_authenticate(user=User.objects.create_superuser(email='ops@applaude.ai', password='password123'))
+        for hours in ('1e10', 'nan', '-5', 'soon'):
+            response = self.client.get(reverse('telemetry-summary'), {'hours': hours})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, hours)
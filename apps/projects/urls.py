@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet
+from .views import ProjectViewSet, TelemetrySummaryView, TelemetryMetricsView
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -9,5 +9,7 @@ router.register(r'', ProjectViewSet, basename='project')
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     path('new/', ProjectViewSet.as_view({'post': 'create'}), name='project-create'),
+    path('telemetry/', TelemetrySummaryView.as_view(), name='telemetry-summary'),
+    path('telemetry/metrics/', TelemetryMetricsView.as_view(), name='telemetry-metrics'),
     path('', include(router.urls)),
 ]
@@ -1,7 +1,15 @@
+import math
+from datetime import timedelta
+from django.http import HttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from agents.telemetry import get_exporter, render_prometheus, summarize
 from .models import Project
 from apps.testimonials.models import Testimonial
-from .serializers import ProjectSerializer, TestimonialSerializer
+from .serializers import ProjectSerializer, ProjectListSerializer, TestimonialSerializer
+from .pagination import ProjectKeysetPagination
 from django_ratelimit.decorators import ratelimit
 
 class IsOwner(permissions.BasePermission):
@@ -23,6 +31,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    pagination_class = ProjectKeysetPagination
 
     def get_permissions(self):
         """
@@ -39,17 +48,24 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProjectListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         """
         This view should return a list of all the projects
-        for the currently authenticated user, prefetching related apps
-        to optimize database queries.
+        for the currently authenticated user. List requests defer the
+        large columns the list serializer never renders.
         If user is not authenticated, return empty queryset.
         """
         if self.request.user.is_authenticated:
             user = self.request.user
-            return Project.objects.filter(owner=user).prefetch_related('testimonials')
+            queryset = Project.objects.filter(owner=user)
+            if self.action == 'list':
+                queryset = queryset.defer(*ProjectListSerializer.deferred_fields)
+            return queryset
         return Project.objects.none()
 
     def perform_create(self, serializer):
@@ -75,3 +91,40 @@ class TestimonialViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 
+
+
+# Longest window the telemetry summary covers
+TELEMETRY_MAX_HOURS = 24 * 30
+
+
+class TelemetrySummaryView(APIView):
+    """
+    Operator view of where pipeline time and model spend go: per-stage and
+    per-task timings and queue waits, and per-agent and per-model latency,
+    tokens and cost, over the spans this host exported in the last `hours`
+    (24 by default, at most TELEMETRY_MAX_HOURS).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def load_summary(self, request):
+        try:
+            hours = float(request.query_params.get('hours', 24))
+        except ValueError:
+            hours = 24
+        if not math.isfinite(hours):
+            hours = 24
+        hours = min(max(hours, 0), TELEMETRY_MAX_HOURS)
+        exporter = get_exporter()
+        spans = exporter.load(since=timezone.now() - timedelta(hours=hours)) if exporter else []
+        return summarize(spans)
+
+    def get(self, request):
+        return Response(self.load_summary(request))
+
+
+class TelemetryMetricsView(TelemetrySummaryView):
+    """
+    The telemetry summary in the Prometheus text format, for scraping.
+    """
+    def get(self, request):
+        return HttpResponse(render_prometheus(self.load_summary(request)), content_type='text/plain; version=0.0.4')
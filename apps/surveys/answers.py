@@ -0,0 +1,137 @@
+import json
+from django.db import transaction
+from django.db.models import Count
+from .models import SurveyResponse, SurveyAnswer
+
+VALUE_TEXT_MAX_LENGTH = SurveyAnswer._meta.get_field('value_text').max_length
+
+
+def _typed_values(value):
+    """
+    Maps one raw answer onto (value_text, value_number, value_bool) tuples.
+    Multi-select answers produce one tuple per selected option.
+    """
+    if isinstance(value, list):
+        typed = []
+        for item in value:
+            typed.extend(_typed_values(item))
+        return typed
+    if value is None:
+        return [(None, None, None)]
+    if isinstance(value, bool):
+        return [(str(value).lower(), None, value)]
+    if isinstance(value, (int, float)):
+        return [(str(value), float(value), None)]
+    if isinstance(value, dict):
+        return [(json.dumps(value, separators=(',', ':'))[:VALUE_TEXT_MAX_LENGTH], None, None)]
+
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        number = None
+    return [(text[:VALUE_TEXT_MAX_LENGTH], number, None)]
+
+
+def flatten_responses(survey_response):
+    """
+    Builds unsaved SurveyAnswer rows for every question in a response.
+
+    Args:
+        survey_response (SurveyResponse): The response to flatten.
+
+    Returns:
+        A list of SurveyAnswer instances ready for bulk_create.
+    """
+    responses = survey_response.responses
+    if isinstance(responses, list):
+        # Tolerate the list form [{"id": 1, "answer": ...}] sent by some clients.
+        responses = {str(item.get('id')): item.get('answer') for item in responses if isinstance(item, dict)}
+    if not isinstance(responses, dict):
+        return []
+
+    answers = []
+    for question_id, value in responses.items():
+        for value_text, value_number, value_bool in _typed_values(value):
+            answers.append(SurveyAnswer(
+                response_id=survey_response.id,
+                project_id=survey_response.project_id,
+                survey_type=survey_response.survey_type,
+                question_id=str(question_id),
+                user_identifier=survey_response.user_identifier,
+                value_text=value_text,
+                value_number=value_number,
+                value_bool=value_bool,
+                created_at=survey_response.created_at,
+            ))
+    return answers
+
+
+def index_survey_responses(survey_responses, batch_size=1000):
+    """
+    Replaces the flattened answers for the given responses.
+
+    Args:
+        survey_responses (list): SurveyResponse instances to (re)index.
+        batch_size (int): Rows per INSERT statement.
+
+    Returns:
+        The number of answer rows written.
+    """
+    answers = []
+    for survey_response in survey_responses:
+        answers.extend(flatten_responses(survey_response))
+
+    with transaction.atomic():
+        SurveyAnswer.objects.filter(response__in=[r.id for r in survey_responses]).delete()
+        SurveyAnswer.objects.bulk_create(answers, batch_size=batch_size)
+    return len(answers)
+
+
+def index_survey_response(survey_response):
+    return index_survey_responses([survey_response])
+
+
+def respondents(project, survey_type, question_id, value):
+    """
+    Returns the distinct user identifiers who gave `value` to a question,
+    e.g. everyone who answered 'Very disappointed' on PMF question 1.
+    """
+    return (
+        SurveyAnswer.objects.filter(
+            project=project,
+            survey_type=survey_type,
+            question_id=str(question_id),
+            value_text=str(value),
+        )
+        .values_list('user_identifier', flat=True)
+        .distinct()
+    )
+
+
+def answer_crosstab(project, survey_type, row_question_id, column_question_id):
+    """
+    Counts responses for every combination of answers to two questions.
+
+    Returns:
+        A list of dicts: {'row': ..., 'column': ..., 'count': ...}.
+    """
+    rows = (
+        SurveyAnswer.objects.filter(
+            project=project,
+            survey_type=survey_type,
+            question_id=str(column_question_id),
+            response__answers__question_id=str(row_question_id),
+        )
+        .values('response__answers__value_text', 'value_text')
+        .annotate(count=Count('response', distinct=True))
+        .order_by('response__answers__value_text', 'value_text')
+    )
+    return [
+        {'row': row['response__answers__value_text'], 'column': row['value_text'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def unindexed_survey_responses():
+    return SurveyResponse.objects.filter(answers__isnull=True)
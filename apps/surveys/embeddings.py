@@ -0,0 +1,85 @@
+import array
+import math
+import os
+from django.conf import settings
+from .models import FeedbackEmbedding
+
+EMBEDDING_MODEL = 'models/text-embedding-004'
+
+
+def embeddings_enabled():
+    return getattr(settings, 'FEEDBACK_EMBEDDINGS_ENABLED', False)
+
+
+def pack_vector(values):
+    """
+    L2-normalises a vector and packs it as float32 bytes, so cosine
+    similarity later reduces to a plain dot product.
+    """
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return array.array('f', (v / norm for v in values)).tobytes()
+
+
+def unpack_vector(data):
+    vector = array.array('f')
+    vector.frombytes(bytes(data))
+    return vector
+
+
+def embed_text(text):
+    """
+    Requests an embedding for a single text from the Gemini embedding model.
+    """
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+    result = genai.embed_content(model=EMBEDDING_MODEL, content=text, task_type='clustering')
+    return result['embedding']
+
+
+def store_embedding(project_id, source, source_id, values, model_name=EMBEDDING_MODEL):
+    FeedbackEmbedding.objects.update_or_create(
+        source=source,
+        source_id=source_id,
+        defaults={'project_id': project_id, 'model_name': model_name, 'vector': pack_vector(values)},
+    )
+
+
+def cluster_feedback(project, threshold=0.82, limit=5000):
+    """
+    Groups a project's feedback embeddings with single-pass leader clustering.
+
+    Args:
+        project: The project whose feedback should be clustered.
+        threshold (float): Minimum cosine similarity to join a cluster.
+        limit (int): Maximum number of most recent embeddings considered.
+
+    Returns:
+        A list of clusters, largest first: {'size', 'representative', 'members'}.
+    """
+    rows = (
+        FeedbackEmbedding.objects.filter(project=project)
+        .order_by('-created_at')
+        .values_list('source', 'source_id', 'vector')[:limit]
+    )
+    clusters = []
+    for source, source_id, data in rows:
+        vector = unpack_vector(data)
+        best, best_score = None, threshold
+        for cluster in clusters:
+            centroid = cluster['centroid']
+            score = sum(a * b for a, b in zip(vector, centroid)) / cluster['norm']
+            if score >= best_score:
+                best, best_score = cluster, score
+        member = {'source': source, 'source_id': str(source_id)}
+        if best is None:
+            clusters.append({'centroid': list(vector), 'norm': 1.0, 'members': [member]})
+            continue
+        best['members'].append(member)
+        best['centroid'] = [c + v for c, v in zip(best['centroid'], vector)]
+        best['norm'] = math.sqrt(sum(c * c for c in best['centroid'])) or 1.0
+
+    clusters.sort(key=lambda cluster: len(cluster['members']), reverse=True)
+    return [
+        {'size': len(cluster['members']), 'representative': cluster['members'][0], 'members': cluster['members']}
+        for cluster in clusters
+    ]
@@ -0,0 +1,125 @@
+import csv
+import json
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import SurveyResponse, AppRating, UserFeedback
+
+# Rows fetched per round-trip from the server-side cursor.
+EXPORT_CHUNK_SIZE = 2000
+# Approximate number of bytes buffered before a chunk is handed to the response.
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+EXPORT_DATASETS = {
+    'survey_responses': (SurveyResponse, ('id', 'user_identifier', 'survey_type', 'responses', 'created_at')),
+    'app_ratings': (AppRating, ('id', 'user_identifier', 'rating', 'comment', 'created_at')),
+    'user_feedback': (UserFeedback, ('id', 'user_identifier', 'feedback_text', 'created_at')),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the value straight back,
+    so csv.writer can be used without an intermediate buffer.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(project, dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields raw value tuples for a project's dataset using a server-side cursor.
+
+    Args:
+        project: The project whose rows should be exported.
+        dataset (str): One of the keys of EXPORT_DATASETS.
+        chunk_size (int): Rows fetched per cursor round-trip.
+    """
+    model, fields = EXPORT_DATASETS[dataset]
+    queryset = (
+        model.objects.filter(project=project)
+        .order_by('created_at', 'id')
+        .values_list(*fields)
+    )
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _buffered(lines):
+    """
+    Groups small text lines into larger encoded chunks to keep the number of
+    writes to the socket low.
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compresses a byte stream incrementally into a single gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(project, dataset, export_format='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Builds the byte generator for an export. Nothing is read from the
+    database until the first chunk is requested, and at most one cursor
+    chunk plus one output buffer is held in memory at any time.
+
+    Args:
+        project: The project being exported.
+        dataset (str): One of the keys of EXPORT_DATASETS.
+        export_format (str): 'csv' or 'ndjson'.
+        compress (bool): Whether to gzip the output.
+        chunk_size (int): Rows fetched per cursor round-trip.
+    """
+    _, fields = EXPORT_DATASETS[dataset]
+    rows = iter_export_rows(project, dataset, chunk_size=chunk_size)
+    if export_format == 'ndjson':
+        lines = ndjson_lines(rows, fields)
+    else:
+        lines = csv_lines(rows, fields)
+    chunks = _buffered(lines)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
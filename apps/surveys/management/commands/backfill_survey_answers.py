@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from apps.surveys.models import SurveyResponse
+from apps.surveys.answers import index_survey_responses
+
+class Command(BaseCommand):
+    help = 'Flatten SurveyResponse JSON into the indexed SurveyAnswer table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=str, help='Only backfill responses for this project ID')
+        parser.add_argument('--batch-size', type=int, default=500, help='Responses processed per transaction')
+        parser.add_argument('--all', action='store_true', help='Re-index responses that already have answers')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = SurveyResponse.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(answers__isnull=True)
+        if options.get('project'):
+            queryset = queryset.filter(project_id=options['project'])
+
+        responses_done = 0
+        answers_written = 0
+        batch = []
+        for survey_response in queryset.order_by().distinct().iterator(chunk_size=batch_size):
+            batch.append(survey_response)
+            if len(batch) >= batch_size:
+                answers_written += index_survey_responses(batch)
+                responses_done += len(batch)
+                batch = []
+                self.stdout.write(f'Indexed {responses_done} responses...')
+        if batch:
+            answers_written += index_survey_responses(batch)
+            responses_done += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {answers_written} answers from {responses_done} responses'))
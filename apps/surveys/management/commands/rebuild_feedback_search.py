@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.projects.models import Project
+from apps.surveys.search import rebuild_feedback_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for user feedback and rating comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=str, help='Only rebuild the index for this project ID')
+
+    def handle(self, *args, **options):
+        project = None
+        if options.get('project'):
+            project = Project.objects.get(id=options['project'])
+        indexed = rebuild_feedback_index(project=project)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} feedback entries'))
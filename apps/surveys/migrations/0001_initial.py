@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppRating',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_identifier', models.CharField(max_length=255)),
+                ('rating', models.IntegerField()),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='app_ratings', to='projects.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyResponse',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_identifier', models.CharField(max_length=255)),
+                ('survey_type', models.CharField(max_length=50)),
+                ('responses', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='survey_responses', to='projects.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserFeedback',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_identifier', models.CharField(max_length=255)),
+                ('feedback_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_feedback', to='projects.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_type', models.CharField(max_length=50)),
+                ('question_id', models.CharField(max_length=64)),
+                ('user_identifier', models.CharField(max_length=255)),
+                ('value_text', models.CharField(blank=True, max_length=255, null=True)),
+                ('value_number', models.FloatField(blank=True, null=True)),
+                ('value_bool', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='survey_answers', to='projects.project')),
+                ('response', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='surveys.surveyresponse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'survey_type', 'question_id', 'value_text', 'user_identifier'], name='survey_answer_text_idx'), models.Index(fields=['project', 'survey_type', 'question_id', 'value_number'], name='survey_answer_number_idx'), models.Index(fields=['project', 'question_id', 'created_at'], name='survey_answer_time_idx')],
+            },
+        ),
+    ]
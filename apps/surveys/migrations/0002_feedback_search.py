@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:07
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('feedback', 'User Feedback'), ('rating', 'App Rating')], max_length=20)),
+                ('source_id', models.UUIDField()),
+                ('model_name', models.CharField(max_length=100)),
+                ('vector', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_embeddings', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'model_name'], name='feedback_embedding_project_idx')],
+                'unique_together': {('source', 'source_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedbackSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('feedback', 'User Feedback'), ('rating', 'App Rating')], max_length=20)),
+                ('source_id', models.UUIDField()),
+                ('body', models.TextField()),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('created_at', models.DateTimeField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_search_documents', to='projects.project')),
+            ],
+            options={
+                'required_db_vendor': 'postgresql',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='feedback_search_vector_idx'), models.Index(fields=['project', '-created_at'], name='feedback_search_project_idx')],
+                'unique_together': {('source', 'source_id')},
+            },
+        ),
+    ]
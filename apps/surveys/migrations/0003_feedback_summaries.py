@@ -0,0 +1,63 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('surveys', '0002_feedback_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('summary', models.TextField(blank=True)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_digest', to='projects.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedbackSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(default=0)),
+                ('summary', models.TextField()),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('token_estimate', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('merged_into', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='surveys.feedbacksummary')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_summaries', to='projects.project')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='apprating',
+            name='summary_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ratings', to='surveys.feedbacksummary'),
+        ),
+        migrations.AddField(
+            model_name='userfeedback',
+            name='summary_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='feedback_entries', to='surveys.feedbacksummary'),
+        ),
+        migrations.AddIndex(
+            model_name='apprating',
+            index=models.Index(fields=['project', 'summary_batch', 'created_at'], name='app_rating_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfeedback',
+            index=models.Index(fields=['project', 'summary_batch', 'created_at'], name='user_feedback_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbacksummary',
+            index=models.Index(fields=['project', 'merged_into', 'level'], name='feedback_summary_open_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# The FTS5 table behind apps.surveys.search.SQLiteSearchBackend. Only SQLite
+# has one; PostgreSQL searches FeedbackSearchDocument instead.
+CREATE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS surveys_feedback_fts USING fts5("
+    "body, project_id UNINDEXED, source UNINDEXED, source_id UNINDEXED, "
+    "created_at UNINDEXED, tokenize='porter unicode61')"
+)
+DROP_FTS_TABLE = "DROP TABLE IF EXISTS surveys_feedback_fts"
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_FTS_TABLE)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_feedback_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
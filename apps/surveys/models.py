@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from apps.projects.models import Project
 import uuid
 
@@ -14,14 +16,81 @@ class SurveyResponse(models.Model):
     def __str__(self):
         return f"Response for {self.project.name} ({self.survey_type}) at {self.created_at}"
 
+class SurveyAnswer(models.Model):
+    """
+    A single answered question, flattened out of SurveyResponse.responses so
+    segment filters and cross-tabs can run as indexed SQL instead of JSON scans.
+    """
+    response = models.ForeignKey(SurveyResponse, on_delete=models.CASCADE, related_name='answers')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='survey_answers')
+    survey_type = models.CharField(max_length=50)
+    question_id = models.CharField(max_length=64)
+    user_identifier = models.CharField(max_length=255)
+    value_text = models.CharField(max_length=255, blank=True, null=True)
+    value_number = models.FloatField(blank=True, null=True)
+    value_bool = models.BooleanField(blank=True, null=True)
+    created_at = models.DateTimeField() # Copied from the response for time-bounded segments
+
+    class Meta:
+        indexes = [
+            # "Who answered X to question Q": equality on every column, users read from the index.
+            models.Index(fields=['project', 'survey_type', 'question_id', 'value_text', 'user_identifier'], name='survey_answer_text_idx'),
+            # Range filters on scale/NPS answers, e.g. NPS >= 9.
+            models.Index(fields=['project', 'survey_type', 'question_id', 'value_number'], name='survey_answer_number_idx'),
+            models.Index(fields=['project', 'question_id', 'created_at'], name='survey_answer_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Answer to {self.question_id} ({self.survey_type}) for {self.project_id}"
+
+class FeedbackSummary(models.Model):
+    """
+    LLM summary of one token-budgeted batch of feedback (level 0), or of
+    several lower-level summaries merged together (level > 0).
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='feedback_summaries')
+    level = models.PositiveSmallIntegerField(default=0)
+    summary = models.TextField()
+    item_count = models.PositiveIntegerField(default=0) # Raw feedback entries covered
+    token_estimate = models.PositiveIntegerField(default=0)
+    merged_into = models.ForeignKey('self', on_delete=models.SET_NULL, blank=True, null=True, related_name='children')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['project', 'merged_into', 'level'], name='feedback_summary_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"Level {self.level} feedback summary for {self.project_id}"
+
+class FeedbackDigest(models.Model):
+    """
+    Rolling per-project digest built from the unmerged FeedbackSummary rows.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='feedback_digest')
+    summary = models.TextField(blank=True)
+    item_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Feedback digest for {self.project_id}"
+
 class AppRating(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='app_ratings')
     user_identifier = models.CharField(max_length=255)
     rating = models.IntegerField() # 1-5
     comment = models.TextField(blank=True, null=True)
+    summary_batch = models.ForeignKey(FeedbackSummary, on_delete=models.SET_NULL, blank=True, null=True, related_name='ratings')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'summary_batch', 'created_at'], name='app_rating_pending_idx'),
+        ]
+
     def __str__(self):
         return f"{self.rating}-star rating for {self.project.name}"
 
@@ -30,7 +99,56 @@ class UserFeedback(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='user_feedback')
     user_identifier = models.CharField(max_length=255)
     feedback_text = models.TextField()
+    summary_batch = models.ForeignKey(FeedbackSummary, on_delete=models.SET_NULL, blank=True, null=True, related_name='feedback_entries')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'summary_batch', 'created_at'], name='user_feedback_pending_idx'),
+        ]
+
     def __str__(self):
         return f"Feedback for {self.project.name}"
+
+class FeedbackSearchDocument(models.Model):
+    """
+    Precomputed tsvector for a UserFeedback entry or an AppRating comment.
+    Only created on PostgreSQL; other databases use the FTS5 table managed
+    by apps.surveys.search.
+    """
+    class Source(models.TextChoices):
+        FEEDBACK = 'feedback', 'User Feedback'
+        RATING = 'rating', 'App Rating'
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='feedback_search_documents')
+    source = models.CharField(max_length=20, choices=Source.choices)
+    source_id = models.UUIDField()
+    body = models.TextField()
+    search_vector = SearchVectorField(null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        required_db_vendor = 'postgresql'
+        unique_together = ('source', 'source_id')
+        indexes = [
+            GinIndex(fields=['search_vector'], name='feedback_search_vector_idx'),
+            models.Index(fields=['project', '-created_at'], name='feedback_search_project_idx'),
+        ]
+
+class FeedbackEmbedding(models.Model):
+    """
+    Optional embedding of a feedback text, used to cluster similar complaints.
+    Vectors are stored as packed float32 and L2-normalised on write.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='feedback_embeddings')
+    source = models.CharField(max_length=20, choices=FeedbackSearchDocument.Source.choices)
+    source_id = models.UUIDField()
+    model_name = models.CharField(max_length=100)
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source', 'source_id')
+        indexes = [
+            models.Index(fields=['project', 'model_name'], name='feedback_embedding_project_idx'),
+        ]
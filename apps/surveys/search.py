@@ -0,0 +1,186 @@
+import re
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from .models import UserFeedback, AppRating, FeedbackSearchDocument
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'surveys_feedback_fts'
+MAX_PAGE_SIZE = 100
+
+Source = FeedbackSearchDocument.Source
+
+# Where the searchable text of each source lives.
+SEARCH_SOURCES = {
+    Source.FEEDBACK: (UserFeedback, 'feedback_text'),
+    Source.RATING: (AppRating, 'comment'),
+}
+
+
+class PostgresSearchBackend:
+    """
+    Keeps one FeedbackSearchDocument per entry with a GIN-indexed tsvector.
+    """
+    def index(self, project_id, source, source_id, text, created_at):
+        FeedbackSearchDocument.objects.update_or_create(
+            source=source,
+            source_id=source_id,
+            defaults={'project_id': project_id, 'body': text, 'created_at': created_at},
+        )
+        FeedbackSearchDocument.objects.filter(source=source, source_id=source_id).update(
+            search_vector=SearchVector('body', config=SEARCH_CONFIG)
+        )
+
+    def remove(self, source, source_id):
+        FeedbackSearchDocument.objects.filter(source=source, source_id=source_id).delete()
+
+    def search(self, project_id, query, offset=0, limit=20):
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        matches = FeedbackSearchDocument.objects.filter(project_id=project_id, search_vector=search_query)
+        total = matches.count()
+        rows = (
+            matches.annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-created_at')
+            .values('source', 'source_id', 'body', 'created_at', 'rank')[offset:offset + limit]
+        )
+        return total, [
+            {
+                'source': row['source'],
+                'source_id': str(row['source_id']),
+                'text': row['body'],
+                'created_at': row['created_at'],
+                'rank': row['rank'],
+            }
+            for row in rows
+        ]
+
+
+class SQLiteSearchBackend:
+    """
+    Local fallback backed by an FTS5 virtual table (created by migration
+    0004_feedback_fts) ranked with bm25().
+    """
+
+    def _match_expression(self, query):
+        # Quote every term so user input can never be parsed as FTS5 syntax.
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def index(self, project_id, source, source_id, text, created_at):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE source = %s AND source_id = %s", [source, str(source_id)])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (body, project_id, source, source_id, created_at) VALUES (%s, %s, %s, %s, %s)",
+                [text, str(project_id), source, str(source_id), created_at.isoformat()],
+            )
+
+    def remove(self, source, source_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE source = %s AND source_id = %s", [source, str(source_id)])
+
+    def search(self, project_id, query, offset=0, limit=20):
+        expression = self._match_expression(query)
+        if not expression:
+            return 0, []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND project_id = %s",
+                [expression, str(project_id)],
+            )
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT source, source_id, body, created_at, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND project_id = %s ORDER BY rank, created_at DESC LIMIT %s OFFSET %s",
+                [expression, str(project_id), limit, offset],
+            )
+            rows = cursor.fetchall()
+        # bm25() is lower-is-better; flip the sign so callers always sort descending.
+        return total, [
+            {'source': source, 'source_id': source_id, 'text': body, 'created_at': created_at, 'rank': -rank}
+            for source, source_id, body, created_at, rank in rows
+        ]
+
+
+class ContainsSearchBackend:
+    """
+    Fallback for other databases: nothing is indexed, and a search scans the
+    entries themselves for every query term, newest first and unranked.
+    """
+    def index(self, project_id, source, source_id, text, created_at):
+        pass
+
+    def remove(self, source, source_id):
+        pass
+
+    def search(self, project_id, query, offset=0, limit=20):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return 0, []
+        matches = [
+            model.objects.filter(Q(*(Q(**{f'{text_field}__icontains': term}) for term in terms)), project_id=project_id)
+            .annotate(source=Value(source), text=F(text_field))
+            .values('id', 'created_at', 'source', 'text')
+            for source, (model, text_field) in SEARCH_SOURCES.items()
+        ]
+        combined = matches[0].union(*matches[1:], all=True)
+        total = combined.count()
+        rows = combined.order_by('-created_at')[offset:offset + limit]
+        return total, [
+            {
+                'source': row['source'],
+                'source_id': str(row['id']),
+                'text': row['text'],
+                'created_at': row['created_at'],
+                'rank': None,
+            }
+            for row in rows
+        ]
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return ContainsSearchBackend()
+
+
+def index_feedback_entry(entry):
+    """
+    Adds or refreshes the search document for a UserFeedback or AppRating.
+    Ratings without a comment are removed from the index.
+    """
+    source = Source.RATING if isinstance(entry, AppRating) else Source.FEEDBACK
+    _, text_field = SEARCH_SOURCES[source]
+    text = getattr(entry, text_field)
+    backend = get_search_backend()
+    if not text:
+        backend.remove(source, entry.id)
+        return
+    backend.index(entry.project_id, source, entry.id, text, entry.created_at)
+
+
+def search_feedback(project, query, offset=0, limit=20):
+    """
+    Ranked full-text search over a project's feedback and rating comments.
+
+    Returns:
+        A (total, results) tuple where results is a list of dicts.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return get_search_backend().search(project.id, query, offset=max(0, offset), limit=limit)
+
+
+def rebuild_feedback_index(project=None, chunk_size=2000):
+    """
+    Re-indexes every feedback entry and rating comment, optionally for one project.
+    """
+    indexed = 0
+    for source, (model, text_field) in SEARCH_SOURCES.items():
+        queryset = model.objects.exclude(**{f'{text_field}__isnull': True}).exclude(**{text_field: ''})
+        if project is not None:
+            queryset = queryset.filter(project=project)
+        for entry in queryset.iterator(chunk_size=chunk_size):
+            index_feedback_entry(entry)
+            indexed += 1
+    return indexed
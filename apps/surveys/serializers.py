@@ -9,9 +9,9 @@ class SurveyResponseSerializer(serializers.ModelSerializer):
 class AppRatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppRating
-        fields = '__all__'
+        exclude = ('summary_batch',)
 
 class UserFeedbackSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserFeedback
-        fields = '__all__'
+        exclude = ('summary_batch',)
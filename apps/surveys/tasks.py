@@ -0,0 +1,23 @@
+from celery import shared_task
+from .models import FeedbackSearchDocument
+from .search import SEARCH_SOURCES
+from .embeddings import embed_text, store_embedding
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def embed_feedback_entry(self, source, source_id):
+    """
+    Computes and stores the embedding for a single feedback entry or rating comment.
+    """
+    model, text_field = SEARCH_SOURCES[FeedbackSearchDocument.Source(source)]
+    try:
+        entry = model.objects.get(id=source_id)
+    except model.DoesNotExist:
+        return
+    text = getattr(entry, text_field)
+    if not text:
+        return
+    try:
+        store_embedding(entry.project_id, source, entry.id, embed_text(text))
+    except Exception as e:
+        print(f"Embedding failed for {source} {source_id}: {e}")
+        self.retry(exc=e)
@@ -0,0 +1,178 @@
+import csv
+import gzip
+import io
+import json
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.projects.models import Project
+from django.core.management import call_command
+from .models import SurveyResponse, AppRating, UserFeedback, SurveyAnswer
+from .exports import stream_export
+from .answers import index_survey_response, respondents, answer_crosstab
+from .search import ContainsSearchBackend, index_feedback_entry, search_feedback, rebuild_feedback_index
+from .embeddings import store_embedding, cluster_feedback
+
+User = get_user_model()
+
+class FeedbackExportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='Export Project', source_url='https://example.com')
+        for i in range(5):
+            SurveyResponse.objects.create(
+                project=self.project,
+                user_identifier=f'device-{i}',
+                survey_type='PMF',
+                responses={'1': 'Very disappointed', '3': i}
+            )
+        AppRating.objects.create(project=self.project, user_identifier='device-0', rating=4, comment='Nice, "really" nice')
+
+    def test_csv_export(self):
+        """
+        Ensure the CSV export has a header row and one line per response.
+        """
+        body = b''.join(stream_export(self.project, 'survey_responses', export_format='csv', chunk_size=2))
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+        self.assertEqual(rows[0], ['id', 'user_identifier', 'survey_type', 'responses', 'created_at'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(json.loads(rows[1][3])['1'], 'Very disappointed')
+
+    def test_ndjson_gzip_export(self):
+        """
+        Ensure gzipped NDJSON output decompresses into one JSON object per row.
+        """
+        body = b''.join(stream_export(self.project, 'app_ratings', export_format='ndjson', compress=True))
+        lines = gzip.decompress(body).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['comment'], 'Nice, "really" nice')
+
+    def test_export_is_lazy(self):
+        """
+        Ensure no query is issued until the stream is consumed.
+        """
+        with self.assertNumQueries(0):
+            chunks = stream_export(self.project, 'user_feedback')
+        self.assertEqual(b''.join(chunks).decode('utf-8').strip(), 'id,user_identifier,feedback_text,created_at')
+
+
+class SurveyAnswerIndexTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='PMF Project', source_url='https://example.com')
+        answers = [
+            ('a', 'Very disappointed', 'Promoter'),
+            ('b', 'Very disappointed', 'Detractor'),
+            ('c', 'Somewhat disappointed', 'Promoter'),
+        ]
+        self.responses = [
+            SurveyResponse.objects.create(
+                project=self.project,
+                user_identifier=user_identifier,
+                survey_type='PMF',
+                responses={'1': pmf_answer, '3': 9, '5': segment, '6': ['Speed', 'Design']}
+            )
+            for user_identifier, pmf_answer, segment in answers
+        ]
+
+    def test_flatten_typed_values(self):
+        """
+        Ensure each answer becomes a typed row, with one row per selected option.
+        """
+        index_survey_response(self.responses[0])
+        answers = SurveyAnswer.objects.filter(response=self.responses[0])
+        self.assertEqual(answers.count(), 5)
+        self.assertEqual(answers.get(question_id='3').value_number, 9.0)
+        self.assertEqual(set(answers.filter(question_id='6').values_list('value_text', flat=True)), {'Speed', 'Design'})
+
+    def test_reindex_replaces_rows(self):
+        index_survey_response(self.responses[0])
+        index_survey_response(self.responses[0])
+        self.assertEqual(SurveyAnswer.objects.filter(response=self.responses[0]).count(), 5)
+
+    def test_backfill_and_segment_queries(self):
+        """
+        Ensure the backfill command indexes every response and the segment
+        helpers answer filters and cross-tabs from the answer table.
+        """
+        call_command('backfill_survey_answers', '--batch-size', '2', stdout=io.StringIO())
+        self.assertEqual(SurveyAnswer.objects.values('response').distinct().count(), 3)
+
+        users = set(respondents(self.project, 'PMF', 1, 'Very disappointed'))
+        self.assertEqual(users, {'a', 'b'})
+
+        crosstab = answer_crosstab(self.project, 'PMF', 1, 5)
+        self.assertIn({'row': 'Very disappointed', 'column': 'Promoter', 'count': 1}, crosstab)
+        self.assertIn({'row': 'Somewhat disappointed', 'column': 'Promoter', 'count': 1}, crosstab)
+        self.assertEqual(sum(cell['count'] for cell in crosstab), 3)
+
+
+class FeedbackSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@applaude.ai', password='password123')
+        self.project = Project.objects.create(owner=self.user, name='Search Project', source_url='https://example.com')
+        self.other_project = Project.objects.create(owner=self.user, name='Other Project', source_url='https://other.com')
+        texts = [
+            'The app crashes every time I open the checkout screen',
+            'Checkout crashes again, crashes constantly',
+            'Love the new dark mode',
+        ]
+        self.entries = [
+            UserFeedback.objects.create(project=self.project, user_identifier=f'u{i}', feedback_text=text)
+            for i, text in enumerate(texts)
+        ]
+        self.rating = AppRating.objects.create(project=self.project, user_identifier='u9', rating=1, comment='Checkout is broken')
+        UserFeedback.objects.create(project=self.other_project, user_identifier='x', feedback_text='checkout crashes')
+        rebuild_feedback_index()
+
+    def test_ranked_search_is_scoped_to_project(self):
+        """
+        Ensure matches come from both feedback and ratings of one project only,
+        with the most relevant entry first.
+        """
+        total, results = search_feedback(self.project, 'checkout crashes')
+        self.assertEqual(total, 2)
+        self.assertEqual(results[0]['source_id'], str(self.entries[1].id))
+
+        total, results = search_feedback(self.project, 'checkout')
+        self.assertEqual(total, 3)
+        self.assertIn('rating', {result['source'] for result in results})
+
+    def test_pagination_and_reindex(self):
+        total, results = search_feedback(self.project, 'checkout', offset=2, limit=2)
+        self.assertEqual((total, len(results)), (3, 1))
+
+        self.rating.comment = ''
+        self.rating.save()
+        index_feedback_entry(self.rating)
+        total, _ = search_feedback(self.project, 'checkout')
+        self.assertEqual(total, 2)
+
+    def test_query_syntax_is_escaped(self):
+        total, results = search_feedback(self.project, 'dark" mode*')
+        self.assertEqual(total, 1)
+
+    def test_other_databases_fall_back_to_contains(self):
+        """
+        Ensure databases without a full-text backend still search, scoped to the project.
+        """
+        total, results = ContainsSearchBackend().search(self.project.id, 'checkout crashes')
+        self.assertEqual(total, 2)
+        self.assertEqual({result['source_id'] for result in results}, {str(self.entries[0].id), str(self.entries[1].id)})
+
+        total, results = ContainsSearchBackend().search(self.project.id, 'CHECKOUT', limit=2)
+        self.assertEqual(total, 3)
+        self.assertEqual(len(results), 2)
+        self.assertIn('rating', {result['source'] for result in ContainsSearchBackend().search(self.project.id, 'broken')[1]})
+
+    def test_cluster_similar_feedback(self):
+        """
+        Ensure entries with similar embeddings end up in the same cluster.
+        """
+        store_embedding(self.project.id, 'feedback', self.entries[0].id, [1.0, 0.1, 0.0])
+        store_embedding(self.project.id, 'feedback', self.entries[1].id, [0.9, 0.2, 0.0])
+        store_embedding(self.project.id, 'feedback', self.entries[2].id, [0.0, 0.1, 1.0])
+        clusters = cluster_feedback(self.project)
+        self.assertEqual([cluster['size'] for cluster in clusters], [2, 1])
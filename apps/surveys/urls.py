@@ -3,7 +3,10 @@ from .views import (
     SubmitSurveyResponseView, 
     SubmitAppRatingView, 
     SubmitUserFeedbackView,
-    ProjectAnalyticsView
+    ProjectAnalyticsView,
+    ProjectFeedbackExportView,
+    FeedbackSearchView,
+    FeedbackClusterView
 )
 
 app_name = 'surveys'
@@ -12,5 +15,8 @@ urlpatterns = [
     path('submit/survey/', SubmitSurveyResponseView.as_view(), name='submit-survey'),
     path('submit/rating/', SubmitAppRatingView.as_view(), name='submit-rating'),
     path('submit/feedback/', SubmitUserFeedbackView.as_view(), name='submit-feedback'),
-    path('analytics/<int:pk>/', ProjectAnalyticsView.as_view(), name='project-analytics'),
+    path('analytics/<uuid:pk>/', ProjectAnalyticsView.as_view(), name='project-analytics'),
+    path('export/<uuid:pk>/', ProjectFeedbackExportView.as_view(), name='project-feedback-export'),
+    path('search/<uuid:pk>/', FeedbackSearchView.as_view(), name='feedback-search'),
+    path('clusters/<uuid:pk>/', FeedbackClusterView.as_view(), name='feedback-clusters'),
 ]
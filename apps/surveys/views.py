@@ -1,7 +1,15 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
-from .models import SurveyResponse, AppRating, UserFeedback
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.http import StreamingHttpResponse
+from .models import SurveyResponse, AppRating, UserFeedback, FeedbackDigest
 from .serializers import SurveyResponseSerializer, AppRatingSerializer, UserFeedbackSerializer
+from .answers import index_survey_response
+from .exports import EXPORT_DATASETS, EXPORT_FORMATS, stream_export
+from .search import index_feedback_entry, search_feedback
+from .embeddings import embeddings_enabled, cluster_feedback
+from .tasks import embed_feedback_entry
 from apps.projects.models import Project
 from agents.tasks import process_feedback_data
 
@@ -11,10 +19,10 @@ class SubmitSurveyResponseView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
     def perform_create(self, serializer):
-        project_id = self.request.data.get('project')
-        # Trigger async task to process this new feedback
-        process_feedback_data.delay(project_id)
-        serializer.save()
+        with transaction.atomic():
+            survey_response = serializer.save()
+            # Keep the flattened answer table in step with the raw JSON
+            index_survey_response(survey_response)
 
 class SubmitAppRatingView(generics.CreateAPIView):
     queryset = AppRating.objects.all()
@@ -22,9 +30,13 @@ class SubmitAppRatingView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
     
     def perform_create(self, serializer):
-        project_id = self.request.data.get('project')
-        process_feedback_data.delay(project_id)
-        serializer.save()
+        with transaction.atomic():
+            entry = serializer.save()
+            index_feedback_entry(entry)
+            # Summarize once the entry is committed and visible to the worker
+            transaction.on_commit(lambda: process_feedback_data.delay(str(entry.project_id)))
+        if embeddings_enabled() and entry.comment:
+            embed_feedback_entry.delay('rating', str(entry.id))
 
 class SubmitUserFeedbackView(generics.CreateAPIView):
     queryset = UserFeedback.objects.all()
@@ -32,9 +44,13 @@ class SubmitUserFeedbackView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
     def perform_create(self, serializer):
-        project_id = self.request.data.get('project')
-        process_feedback_data.delay(project_id)
-        serializer.save()
+        with transaction.atomic():
+            entry = serializer.save()
+            index_feedback_entry(entry)
+            # Summarize once the entry is committed and visible to the worker
+            transaction.on_commit(lambda: process_feedback_data.delay(str(entry.project_id)))
+        if embeddings_enabled():
+            embed_feedback_entry.delay('feedback', str(entry.id))
 
 class ProjectAnalyticsView(generics.RetrieveAPIView):
     queryset = Project.objects.all()
@@ -45,9 +61,90 @@ class ProjectAnalyticsView(generics.RetrieveAPIView):
         if project.owner != request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
             
+        digest = FeedbackDigest.objects.filter(project=project).first()
         analytics_data = {
-            'app_ratings_summary': project.app_ratings_summary,
-            'user_feedback_summary': project.user_feedback_summary,
-            'survey_response_analytics': project.survey_response_analytics,
+            'app_ratings_summary': project.app_ratings.aggregate(count=Count('id'), average=Avg('rating')),
+            'user_feedback_summary': digest.summary if digest else '',
+            'survey_response_analytics': list(
+                project.survey_responses.values('survey_type').annotate(count=Count('id')).order_by('survey_type')
+            ),
         }
         return Response(analytics_data)
+
+class ProjectFeedbackExportView(generics.RetrieveAPIView):
+    """
+    Streams every survey response, rating or feedback row of a project as
+    CSV or NDJSON, optionally gzipped. Rows are read through a server-side
+    cursor so memory stays flat regardless of the export size.
+    """
+    queryset = Project.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_object()
+        if project.owner != request.user:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        dataset = request.query_params.get('dataset', 'survey_responses')
+        export_format = request.query_params.get('export_format', 'csv')
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        if dataset not in EXPORT_DATASETS:
+            return Response({'error': f'Unknown dataset. Choose one of: {", ".join(EXPORT_DATASETS)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'Unknown format. Choose one of: {", ".join(EXPORT_FORMATS)}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"{dataset}-{project.id}.{export_format}"
+        content_type = EXPORT_FORMATS[export_format]
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(
+            stream_export(project, dataset, export_format=export_format, compress=compress),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Stop reverse proxies from buffering the whole body before sending it on.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class FeedbackSearchView(generics.RetrieveAPIView):
+    """
+    Ranked full-text search over a project's user feedback and rating comments.
+    Paginated with `limit` and `offset`.
+    """
+    queryset = Project.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_object()
+        if project.owner != request.user:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'The q parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        total, results = search_feedback(project, query, offset=offset, limit=limit)
+        return Response({'count': total, 'offset': offset, 'results': results})
+
+class FeedbackClusterView(generics.RetrieveAPIView):
+    """
+    Groups similar complaints using the optional embedding index.
+    """
+    queryset = Project.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_object()
+        if project.owner != request.user:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        if not embeddings_enabled():
+            return Response({'error': 'Feedback embeddings are not enabled.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'clusters': cluster_feedback(project)})
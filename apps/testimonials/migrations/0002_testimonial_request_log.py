@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:55
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_hot_query_indexes'),
+        ('testimonials', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestimonialRequestLog',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('delay_days', models.PositiveSmallIntegerField(help_text='Days after completion the request is for.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='testimonial_requests', to='projects.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='testimonial_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('project', 'delay_days')},
+            },
+        ),
+    ]
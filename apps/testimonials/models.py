@@ -19,3 +19,23 @@ class Testimonial(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+
+
+class TestimonialRequestLog(models.Model):
+    """
+    Records the testimonial request sent for a project at each delay after
+    completion, so that a request is never sent twice. A row is written when
+    the request is queued; `sent_at` is set once the email has gone out.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='testimonial_requests')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='testimonial_requests')
+    delay_days = models.PositiveSmallIntegerField(help_text="Days after completion the request is for.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Testimonial request for {self.project.name} ({self.delay_days} days)"
+
+    class Meta:
+        unique_together = ('project', 'delay_days')
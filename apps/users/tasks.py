@@ -1,27 +1,18 @@
 from celery import shared_task
 from django.core.mail import send_mail
-from django.utils import timezone
-from datetime import timedelta
-from apps.projects.models import Project
+from apps.projects.queries import awaiting_payment
 
 @shared_task
 def send_project_reminder_emails():
     """
     Sends reminder emails to users with unfinished projects.
     """
-    yesterday = timezone.now() - timedelta(days=1)
-    three_days_ago = timezone.now() - timedelta(days=3)
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    
-    # Reminder after 24 hours
-    projects_24h = Project.objects.filter(
-        last_completed_step=Project.LastCompletedStep.CREATED,
-        updated_at__lt=yesterday
-    )
+    # Reminder after 24 hours: the analysis is done and the build awaits payment
+    projects_24h = awaiting_payment().select_related('owner')
     for project in projects_24h:
         send_mail(
             'Complete your Applause project',
-            f'Hi {project.owner.username},\n\nYour project "{project.name}" is waiting for you. Complete the payment to start the build process!',
+            f'Hi {project.owner.first_name or project.owner.email},\n\nYour project "{project.name}" is waiting for you. Complete the payment to start the build process!',
             'noreply@applause.ai',
             [project.owner.email],
             fail_silently=False,